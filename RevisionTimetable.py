@@ -7,8 +7,12 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, current_user, login_required
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
-from sqlalchemy.pool import NullPool
-import json
+from sqlalchemy import Integer, cast, func
+from utils.analytics import analyze_log_rows
+from utils.curriculum import get_curriculum
+from utils.database import DEFAULT_SQLITE_PROFILE, apply_sqlite_profile, engine_options
+from utils.log_store import store_logs
+from utils.migrations import LATEST_VERSION, migrate
 
 def verify_dependencies():
     """Verify all required packages are installed"""
@@ -105,12 +109,16 @@ verify_dependencies()
 # Initialize Flask app and configure it
 app = Flask(__name__)
 app.config["SECRET_KEY"] = "your_secret_key_here"
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///site.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///site.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"poolclass": NullPool}
+app.config["SQLITE_PROFILE"] = os.environ.get("SQLITE_PROFILE", DEFAULT_SQLITE_PROFILE)
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"],
+                                                         int(os.environ.get("DB_POOL_SIZE", 8)))
 
 # Initialize extensions
 db = SQLAlchemy(app)
+with app.app_context():
+    apply_sqlite_profile(db.engine, app.config["SQLITE_PROFILE"])
 login_manager = LoginManager(app)
 login_manager.login_view = "login"
 
@@ -585,30 +593,22 @@ def study_analytics():
     # Get UpLearn logs for the current user
     uplearn_logs = UplearnLog.query.filter_by(user_id=current_user.id).order_by(UplearnLog.date.desc()).all()
     
+    # All metrics come from one pass of the analytics kernel
+    analytics = analyze_logs(current_user.id)
+    
     # Calculate weekly statistics
-    week_stats = calculate_week_stats(task_logs, uplearn_logs)
+    week_stats = calculate_week_stats(analytics)
     
     # Calculate efficiency and productivity metrics
-    avg_duration_by_subject = {}
-    avg_difficulty_by_subject = {}
-    productivity = 0
-    
-    if task_logs:
-        for subject in ['Chemistry', 'Biology Y13', 'Biology Y12', 'Psychology']:
-            subject_logs = [log for log in task_logs if log.subject == subject]
-            if subject_logs:
-                avg_duration_by_subject[subject] = sum(log.duration for log in subject_logs) / len(subject_logs)
-                avg_difficulty_by_subject[subject] = sum(log.difficulty for log in subject_logs) / len(subject_logs)
-        
-        # Calculate productivity score (tasks completed per hour of study)
-        total_hours = sum(log.duration for log in task_logs) / 60.0
-        productivity = len(task_logs) / total_hours if total_hours > 0 else 0
+    avg_duration_by_subject = analytics.avg_duration_by_subject
+    avg_difficulty_by_subject = analytics.avg_difficulty_by_subject
+    productivity = analytics.productivity
     
     # Calculate time distribution and productivity metrics
-    time_distribution, productivity_by_day, day_productivity = calculate_time_distribution(task_logs, uplearn_logs)
+    time_distribution, productivity_by_day, day_productivity = calculate_time_distribution(analytics)
     
     # Get streak information
-    current_streak, max_streak = calculate_streak_stats(task_logs)
+    current_streak, max_streak = calculate_streak_stats(analytics)
     
     return render_template(
         "study_analytics.html",
@@ -629,13 +629,10 @@ def study_analytics():
 @app.route("/time_analysis")
 @login_required
 def time_analysis():
-    # Get logs for the current user
-    task_logs = TaskLog.query.filter_by(user_id=current_user.id).all()
-    uplearn_logs = UplearnLog.query.filter_by(user_id=current_user.id).all()
-    
     # Use helper functions for calculations
-    time_distribution, productivity_by_day, _ = calculate_time_distribution(task_logs, uplearn_logs)
-    current_streak, max_streak = calculate_streak_stats(task_logs)
+    analytics = analyze_logs(current_user.id)
+    time_distribution, productivity_by_day, _ = calculate_time_distribution(analytics)
+    current_streak, max_streak = calculate_streak_stats(analytics)
     
     return render_template(
         "time_analysis.html",
@@ -656,30 +653,31 @@ def progress_log():
     }
     
     if request.method == "POST":
+        # Logs go through the shared store so rollups, streaks and reviews stay in step with app.py
         if "log_task" in request.form:
             # Log a completed task
-            new_task = TaskLog(
-                user_id=current_user.id,
-                task=request.form.get("task"),
-                subject=request.form.get("subject"),
-                duration=int(request.form.get("duration", 30)),
-                difficulty=int(request.form.get("difficulty", 3)),
-                notes=request.form.get("notes", "")
-            )
-            db.session.add(new_task)
+            store_logs(db.session, [('task', {
+                'user_id': current_user.id,
+                'task': request.form.get("task"),
+                'subject': request.form.get("subject"),
+                'duration': int(request.form.get("duration", 30)),
+                'difficulty': int(request.form.get("difficulty", 3)),
+                'notes': request.form.get("notes", ""),
+                'date_completed': datetime.now()
+            })])
             db.session.commit()
             flash("Task logged successfully!")
             
         elif "log_uplearn" in request.form:
             # Log UpLearn progress
-            new_uplearn = UplearnLog(
-                user_id=current_user.id,
-                subject=request.form.get("subject"),
-                lessons_completed=int(request.form.get("lessons_completed", 0)),
-                time_spent=int(request.form.get("time_spent", 0)),
-                comprehension=int(request.form.get("comprehension", 3))
-            )
-            db.session.add(new_uplearn)
+            store_logs(db.session, [('uplearn', {
+                'user_id': current_user.id,
+                'subject': request.form.get("subject"),
+                'lessons_completed': int(request.form.get("lessons_completed", 0)),
+                'time_spent': int(request.form.get("time_spent", 0)),
+                'comprehension': int(request.form.get("comprehension", 3)),
+                'date': datetime.now().date()
+            })])
             db.session.commit()
             flash("UpLearn progress logged successfully!")
             
@@ -690,7 +688,7 @@ def progress_log():
     uplearn_logs = UplearnLog.query.filter_by(user_id=current_user.id).order_by(UplearnLog.date.desc()).all()
     
     # Calculate UpLearn statistics
-    uplearn_stats = calculate_uplearn_stats(uplearn_logs)
+    uplearn_stats = calculate_uplearn_stats(analyze_logs(current_user.id))
     
     return render_template(
         "progress_log.html",
@@ -717,16 +715,16 @@ def complete_task():
         flash("Missing task information.")
         return redirect(url_for("dashboard"))
     
-    # Create new task log
-    new_task = TaskLog(
-        user_id=current_user.id,
-        task=task,
-        subject=subject,
-        duration=duration,
-        difficulty=difficulty,
-        notes="Completed via quick action"
-    )
-    db.session.add(new_task)
+    # Create new task log (with its rollup, streak and review updates)
+    store_logs(db.session, [('task', {
+        'user_id': current_user.id,
+        'task': task,
+        'subject': subject,
+        'duration': duration,
+        'difficulty': difficulty,
+        'notes': "Completed via quick action",
+        'date_completed': datetime.now()
+    })])
     db.session.commit()
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -736,204 +734,59 @@ def complete_task():
     return redirect(url_for("dashboard"))
 
 def init_db():
-    """Initialize the database"""
+    """Bring the database schema up to date (shared migrations with app.py)"""
     with app.app_context():
-        # Check if tables exist before creating them
-        from sqlalchemy import inspect
-        inspector = inspect(db.engine)
-        
-        # Create all tables that don't exist yet
-        db.create_all()
-        
-        # Log which tables were checked
-        existing_tables = inspector.get_table_names()
-        print(f"Database tables initialized. Found {len(existing_tables)} existing tables.")
-        
-        # Verify required tables are present
-        required_tables = ['user', 'user_subjects', 'task_log', 'uplearn_log', 'topic_preference']
-        missing = [table for table in required_tables if table not in existing_tables]
-        if missing:
-            print(f"Warning: Some required tables were missing and have been created: {', '.join(missing)}")
-        else:
-            print("All required tables are present.")
-
-def calculate_week_stats(task_logs, uplearn_logs):
+        for migration in migrate(db.engine):
+            print(f"Applied migration {migration.version}: {migration.name}")
+        print(f"Database schema at version {LATEST_VERSION}.")
+
+def day_ordinal(column):
+    """SQL expression for a date/datetime column as a Python date ordinal"""
+    return cast(func.julianday(func.date(column)) - 1721424.5, Integer)
+
+def analyze_logs(user_id):
+    """Shared analytics for a user, fetched as plain tuples (columnar NumPy engine for long histories)"""
+    task_rows = db.session.query(
+        day_ordinal(TaskLog.date_completed),
+        cast(func.strftime('%H', TaskLog.date_completed), Integer),
+        TaskLog.subject,
+        TaskLog.duration,
+        TaskLog.difficulty
+    ).filter(TaskLog.user_id == user_id).all()
+    uplearn_rows = db.session.query(
+        day_ordinal(UplearnLog.date),
+        UplearnLog.subject,
+        UplearnLog.lessons_completed,
+        UplearnLog.time_spent,
+        UplearnLog.comprehension
+    ).filter(UplearnLog.user_id == user_id).all()
+    return analyze_log_rows(task_rows, uplearn_rows, datetime.now().date())
+
+def calculate_week_stats(analytics):
     """Calculate weekly study statistics"""
-    stats = {
-        'total_study_time': 0,
-        'tasks_completed': 0,
-        'avg_difficulty': 0,
-        'uplearn_lessons': 0,
-        'uplearn_time': 0,
-        'subjects': {}
-    }
-    
-    # Calculate one week ago
-    week_ago = datetime.now() - timedelta(days=7)
-    
-    # Process task logs
-    recent_tasks = [log for log in task_logs if log.date_completed >= week_ago]
-    if recent_tasks:
-        stats['tasks_completed'] = len(recent_tasks)
-        stats['total_study_time'] = sum(log.duration for log in recent_tasks)
-        stats['avg_difficulty'] = sum(log.difficulty for log in recent_tasks) / len(recent_tasks)
-        
-        # Calculate per-subject stats
-        for log in recent_tasks:
-            if log.subject not in stats['subjects']:
-                stats['subjects'][log.subject] = {
-                    'time': 0,
-                    'tasks': 0,
-                    'avg_difficulty': 0
-                }
-            subj_stats = stats['subjects'][log.subject]
-            subj_stats['time'] += log.duration
-            subj_stats['tasks'] += 1
-            subj_stats['avg_difficulty'] = (
-                (subj_stats['avg_difficulty'] * (subj_stats['tasks'] - 1) + log.difficulty)
-                / subj_stats['tasks']
-            )
-    
-    # Process UpLearn logs
-    recent_uplearn = [log for log in uplearn_logs if log.date >= week_ago.date()]
-    if recent_uplearn:
-        stats['uplearn_lessons'] = sum(log.lessons_completed for log in recent_uplearn)
-        stats['uplearn_time'] = sum(log.time_spent for log in recent_uplearn)
-    
-    return stats
+    return analytics.recent_week
 
-def calculate_time_distribution(task_logs, uplearn_logs):
+def calculate_time_distribution(analytics):
     """Calculate time distribution and productivity metrics"""
-    time_dist = {
-        'morning': 0,   # 6-12
-        'afternoon': 0, # 12-18
-        'evening': 0,   # 18-24
-        'night': 0      # 0-6
-    }
-    
-    productivity = {
-        'Monday': 0,
-        'Tuesday': 0,
-        'Wednesday': 0,
-        'Thursday': 0,
-        'Friday': 0,
-        'Saturday': 0,
-        'Sunday': 0
-    }
-    
     day_prod = {
         'tasks_by_day': {},
         'time_by_day': {},
         'efficiency_by_day': {}
     }
-    
-    # Process task logs
-    for log in task_logs:
-        hour = log.date_completed.hour
-        day = log.date_completed.strftime('%A')
-        
-        # Time distribution
-        if 6 <= hour < 12:
-            time_dist['morning'] += log.duration
-        elif 12 <= hour < 18:
-            time_dist['afternoon'] += log.duration
-        elif 18 <= hour < 24:
-            time_dist['evening'] += log.duration
-        else:
-            time_dist['night'] += log.duration
-        
-        # Day productivity
-        if day not in day_prod['tasks_by_day']:
-            day_prod['tasks_by_day'][day] = 0
-            day_prod['time_by_day'][day] = 0
-            
-        day_prod['tasks_by_day'][day] += 1
-        day_prod['time_by_day'][day] += log.duration
-        
-    # Calculate efficiency (tasks per hour)
-    for day in day_prod['tasks_by_day'].keys():
-        hours = day_prod['time_by_day'][day] / 60.0  # Convert minutes to hours
-        if hours > 0:
-            day_prod['efficiency_by_day'][day] = day_prod['tasks_by_day'][day] / hours
-            productivity[day] = day_prod['efficiency_by_day'][day]
-        else:
-            day_prod['efficiency_by_day'][day] = 0
-            productivity[day] = 0
-            
-    return time_dist, productivity, day_prod
-
-def calculate_streak_stats(task_logs):
+    for day, data in analytics.day_productivity.items():
+        if data['tasks']:
+            day_prod['tasks_by_day'][day] = data['tasks']
+            day_prod['time_by_day'][day] = data['time']
+            day_prod['efficiency_by_day'][day] = analytics.productivity_by_day[day]
+    return analytics.time_of_day, analytics.productivity_by_day, day_prod
+
+def calculate_streak_stats(analytics):
     """Calculate current and maximum study streaks"""
-    if not task_logs:
-        return 0, 0
-        
-    # Get unique dates of task completion
-    dates = sorted(set(log.date_completed.date() for log in task_logs))
-    if not dates:
-        return 0, 0
-        
-    current_streak = 0
-    max_streak = 0
-    temp_streak = 0
-    today = datetime.now().date()
-    
-    # Calculate current streak (must include today or yesterday)
-    if dates[-1] >= today - timedelta(days=1):
-        current_date = dates[-1]
-        i = len(dates) - 1
-        while i >= 0 and current_date - dates[i] <= timedelta(days=current_date - dates[i].date()):
-            current_streak += 1
-            if i > 0:
-                current_date = dates[i] - timedelta(days=1)
-            i -= 1
-            
-    # Calculate max streak
-    for i in range(len(dates)):
-        if i == 0 or (dates[i] - dates[i-1]) == timedelta(days=1):
-            temp_streak += 1
-        else:
-            temp_streak = 1
-        max_streak = max(max_streak, temp_streak)
-        
-    return current_streak, max_streak
+    return analytics.current_streak, analytics.max_streak
 
-def calculate_uplearn_stats(uplearn_logs):
+def calculate_uplearn_stats(analytics):
     """Calculate UpLearn statistics"""
-    stats = {
-        'total_lessons': 0,
-        'total_time': 0,
-        'avg_comprehension': 0,
-        'by_subject': {}
-    }
-    
-    if not uplearn_logs:
-        return stats
-        
-    # Calculate overall stats
-    stats['total_lessons'] = sum(log.lessons_completed for log in uplearn_logs)
-    stats['total_time'] = sum(log.time_spent for log in uplearn_logs)
-    stats['avg_comprehension'] = sum(log.comprehension for log in uplearn_logs) / len(uplearn_logs)
-    
-    # Calculate per-subject stats
-    for log in uplearn_logs:
-        if log.subject not in stats['by_subject']:
-            stats['by_subject'][log.subject] = {
-                'lessons': 0,
-                'time': 0,
-                'avg_comprehension': 0,
-                'logs_count': 0
-            }
-        
-        subj_stats = stats['by_subject'][log.subject]
-        subj_stats['lessons'] += log.lessons_completed
-        subj_stats['time'] += log.time_spent
-        subj_stats['logs_count'] += 1
-        subj_stats['avg_comprehension'] = (
-            (subj_stats['avg_comprehension'] * (subj_stats['logs_count'] - 1) + log.comprehension)
-            / subj_stats['logs_count']
-        )
-    
-    return stats
+    return analytics.uplearn_totals
 
 def get_calendar_data():
     """Get calendar data for the current month"""
@@ -996,31 +849,30 @@ def get_uplearn_link(subject):
 def load_curriculum():
     """Load curriculum data from static/data/curriculum.json"""
     try:
-        with open('static/data/curriculum.json', 'r') as f:
-            data = json.load(f)
-            # Use the simplified Curriculum section from the JSON
-            if 'Curriculum' in data:
-                return data['Curriculum']
-            else:
-                # Return a minimal default curriculum if the Curriculum section is missing
-                return {
-                    "Psychology": [
-                        "Research Methods",
-                        "Memory",
-                        "Social Influence",
-                        "Attachment"
-                    ],
-                    "Chemistry": [
-                        "Atomic Structure",
-                        "Chemical Bonding",
-                        "Energetics"
-                    ],
-                    "Biology": [
-                        "Cell Structure",
-                        "Transport Systems",
-                        "Cell Division"
-                    ]
-                }
+        data = get_curriculum()
+        # Use the simplified Curriculum section from the JSON
+        if 'Curriculum' in data:
+            return data['Curriculum']
+        else:
+            # Return a minimal default curriculum if the Curriculum section is missing
+            return {
+                "Psychology": [
+                    "Research Methods",
+                    "Memory",
+                    "Social Influence",
+                    "Attachment"
+                ],
+                "Chemistry": [
+                    "Atomic Structure",
+                    "Chemical Bonding",
+                    "Energetics"
+                ],
+                "Biology": [
+                    "Cell Structure",
+                    "Transport Systems",
+                    "Cell Division"
+                ]
+            }
     except Exception as e:
         print(f"Error loading curriculum data: {e}")
         # Return the same minimal default curriculum if file can't be loaded
@@ -1092,7 +944,7 @@ def generate_daily_tasks(curriculum, user_subjects, uplearn_subjects, count=3):
     return tasks[:count]
 
 if __name__ == "__main__":
-    # Create database only if it doesn't exist
+    # Apply any pending schema migrations
     init_db()
     
     # Handle Python 3.13 compatibility
@@ -1,22 +1,73 @@
 import os
 import sys
+import time
 import subprocess
-from flask import Flask, render_template, redirect, url_for, request, flash, jsonify
+from concurrent.futures import ProcessPoolExecutor
+import click
+from flask import Flask, render_template, redirect, url_for, request, flash, jsonify, abort
+from flask.cli import AppGroup
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import configure_mappers
+from jinja2 import TemplateError
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import json
-import random
+import hashlib
+from utils.analytics import active_streak, compute_analytics, rollup_activity, streak_state
+from utils.cache import make_cache
+from utils.curriculum import get_curriculum, get_curriculum_index
+from utils.database import DEFAULT_SQLITE_PROFILE, apply_sqlite_profile, engine_options, sqlite_settings
+from utils.daily_plan import build_daily_plan, build_plan_chunk, init_plan_worker
+from utils.idempotency import IdempotencyStore
+from utils import log_store
+from utils.log_store import bump_data_version, rollup_value, store_logs, upsert_rollups
+from utils.history import PAGE_SIZE, decode_cursor, keyset_page, page_size, parse_date, parse_datetime
+from utils.migrations import LATEST_VERSION, MIGRATIONS, current_version, migrate, schema_drift
+from utils.sampler import PREFERENCE_MULTIPLIERS, sampler_cache
+from utils.scheduler import HORIZON_DAYS, SESSION_MINUTES, StudySchedule, plan_period_start, schedule_cache
+from utils.spaced_repetition import DEFAULT_EASE
+from utils.task_generator import topic_from_task
+from utils.templates import cache_status, compile_templates, enable_bytecode_cache
+from utils.write_behind import WriteBehindQueue
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config["SECRET_KEY"] = "your_secret_key_here" 
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///site.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///site.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# SQLite connection PRAGMAs (see utils/database.py) and connections kept per worker process
+app.config["SQLITE_PROFILE"] = os.environ.get("SQLITE_PROFILE", DEFAULT_SQLITE_PROFILE)
+app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 8))
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"],
+                                                         app.config["DB_POOL_SIZE"])
+# Task/UpLearn log writes: "sync" commits on the request thread, "write_behind" queues them
+# for a background thread that commits every WRITE_BEHIND_INTERVAL seconds or MAX_BATCH logs
+app.config["LOG_WRITE_MODE"] = os.environ.get("LOG_WRITE_MODE", "sync")
+app.config["WRITE_BEHIND_INTERVAL"] = float(os.environ.get("WRITE_BEHIND_INTERVAL", 0.05))
+app.config["WRITE_BEHIND_MAX_BATCH"] = int(os.environ.get("WRITE_BEHIND_MAX_BATCH", 200))
+app.config["WRITE_BEHIND_MAX_QUEUE"] = int(os.environ.get("WRITE_BEHIND_MAX_QUEUE", 10000))
+# Cache for analytics and calendar data (utils/cache.py): "lru" keeps it in each worker,
+# "sqlite" shares it between the workers on this host through CACHE_PATH and survives recycling
+app.config["CACHE_BACKEND"] = os.environ.get("CACHE_BACKEND", "lru")
+app.config["CACHE_PATH"] = os.environ.get("CACHE_PATH", os.path.join(app.instance_path, "cache.db"))
+app.config["CACHE_TTL"] = int(os.environ.get("CACHE_TTL", 3600))
+app.config["CACHE_MAX_ENTRIES"] = int(os.environ.get("CACHE_MAX_ENTRIES", 4096))
+# Operational counters (/api/analytics/cache_stats, /api/ingest/stats) are off unless EXPOSE_STATS=1,
+# since any logged-in student could otherwise read them
+app.config["EXPOSE_STATS"] = os.environ.get("EXPOSE_STATS", "0").lower() in ("1", "true", "yes")
+# Compiled template bytecode shared by all workers (an empty TEMPLATE_CACHE_DIR disables it)
+app.config["TEMPLATE_CACHE_DIR"] = os.environ.get("TEMPLATE_CACHE_DIR", os.path.join(app.instance_path, "jinja_cache"))
 
 # Initialize extensions
 db = SQLAlchemy(app)
+with app.app_context():
+    apply_sqlite_profile(db.engine, app.config["SQLITE_PROFILE"])
+data_cache = make_cache(app.config["CACHE_BACKEND"], path=app.config["CACHE_PATH"],
+                        ttl=app.config["CACHE_TTL"], max_entries=app.config["CACHE_MAX_ENTRIES"])
 login_manager = LoginManager(app)
 login_manager.login_view = "login"
 
@@ -41,6 +92,8 @@ def format_date_filter(date_str, format_str):
 # Register custom filters
 app.jinja_env.filters['days_until'] = days_until_filter
 app.jinja_env.filters['format_date'] = format_date_filter
+if app.config["TEMPLATE_CACHE_DIR"]:
+    enable_bytecode_cache(app.jinja_env, app.config["TEMPLATE_CACHE_DIR"])
 
 # -------------------------
 # Database Models
@@ -52,18 +105,25 @@ class User(UserMixin, db.Model):
     chem_progress = db.Column(db.Integer, default=0)
     bio_y13_progress = db.Column(db.Integer, default=0)
     bio_y12_progress = db.Column(db.Integer, default=0)
-    onboarding_step = db.Column(db.Integer, default=0)
+    welcome_completed = db.Column(db.Boolean, default=False)  # Used by RevisionTimetable.py
     daily_study_hours = db.Column(db.Float, default=4.0)
+    study_start_date = db.Column(db.Date)
+    study_end_date = db.Column(db.Date)
+    onboarding_step = db.Column(db.Integer, default=0)
+    last_welcome_shown = db.Column(db.DateTime)
     subjects = db.relationship('UserSubjects', backref='user', uselist=False)
     task_logs = db.relationship('TaskLog', backref='user', lazy=True)
     uplearn_logs = db.relationship('UplearnLog', backref='user', lazy=True)
     topic_proficiencies = db.relationship('TopicProficiency', backref='user', lazy=True)
+    topic_preferences = db.relationship('TopicPreference', backref='user', lazy=True)
 
 class UserSubjects(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     chemistry = db.Column(db.Boolean, default=False)
     biology = db.Column(db.Boolean, default=False)
+    # Loaded through current_user.subjects on every page
+    __table_args__ = (db.Index('ix_user_subjects_user', 'user_id'),)
 
 class TaskLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -74,6 +134,8 @@ class TaskLog(db.Model):
     duration = db.Column(db.Integer)  # Duration in minutes
     difficulty = db.Column(db.Integer)  # Scale of 1-5
     notes = db.Column(db.Text)
+    # Keyset pagination order for the history pages (newest first)
+    __table_args__ = (db.Index('ix_task_log_user_completed', 'user_id', 'date_completed', 'id'),)
     
 class UplearnLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -83,6 +145,7 @@ class UplearnLog(db.Model):
     lessons_completed = db.Column(db.Integer, default=0)
     time_spent = db.Column(db.Integer)  # Time in minutes
     comprehension = db.Column(db.Integer)  # Scale of 1-5
+    __table_args__ = (db.Index('ix_uplearn_log_user_date', 'user_id', 'date', 'id'),)
 
 class TopicProficiency(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -92,9 +155,86 @@ class TopicProficiency(db.Model):
     proficiency = db.Column(db.Integer, nullable=False)  # Scale of 1-5
     last_updated = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     notes = db.Column(db.Text)  # Optional notes about proficiency
+    # User data version of the write that last set this rating (commit order, unlike last_updated)
+    data_version = db.Column(db.Integer, nullable=False, default=0)
     
     # Add a composite unique constraint to ensure one rating per user/subject/topic
-    __table_args__ = (db.UniqueConstraint('user_id', 'subject', 'topic', name='uix_user_subject_topic'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'subject', 'topic', name='uix_user_subject_topic'),
+        # Delta sync for /api/ratings/get?since=
+        db.Index('ix_topic_proficiency_user_version', 'user_id', 'data_version'),
+    )
+
+class TopicPreference(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    subject = db.Column(db.String(50), nullable=False)
+    topic = db.Column(db.String(200), nullable=False)
+    frequency = db.Column(db.Integer, default=0)  # -1 for less frequent, 0 for default, 1 for more frequent
+    last_modified = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    __table_args__ = (db.UniqueConstraint('user_id', 'subject', 'topic', name='unique_topic_pref'),)
+
+class DailyPlan(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    plan_date = db.Column(db.Date, nullable=False)
+    tasks = db.Column(db.Text, nullable=False)  # JSON-encoded list of task dicts
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    
+    # One materialized plan per user per day
+    __table_args__ = (db.UniqueConstraint('user_id', 'plan_date', name='uix_user_plan_date'),)
+
+class TopicReview(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Keyed by topic title, not CurriculumIndex position, so edits to curriculum.json never move review state
+    subject = db.Column(db.String(50), nullable=False)
+    topic = db.Column(db.String(100), nullable=False)
+    interval = db.Column(db.Integer, default=0)  # Days until the next review
+    ease = db.Column(db.Integer, default=DEFAULT_EASE)  # SM-2 ease factor in thousandths
+    repetitions = db.Column(db.Integer, default=0)
+    due = db.Column(db.Integer, nullable=False)  # Date ordinal of the next review
+    last_reviewed = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    # One review state per user per topic; (user_id, due) serves the "what's due" lookup in due order
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'subject', 'topic', name='uix_user_topic_review'),
+        db.Index('ix_topic_review_user_due', 'user_id', 'due'),
+    )
+
+class DailyRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    subject = db.Column(db.String(50), nullable=False)
+    task_count = db.Column(db.Integer, nullable=False, default=0)
+    task_minutes = db.Column(db.Integer, nullable=False, default=0)
+    difficulty_sum = db.Column(db.Integer, nullable=False, default=0)
+    uplearn_sessions = db.Column(db.Integer, nullable=False, default=0)
+    uplearn_lessons = db.Column(db.Integer, nullable=False, default=0)
+    uplearn_minutes = db.Column(db.Integer, nullable=False, default=0)
+    comprehension_sum = db.Column(db.Integer, nullable=False, default=0)
+    
+    # One row per user per day per subject, summing that day's TaskLog and UplearnLog rows
+    __table_args__ = (db.UniqueConstraint('user_id', 'day', 'subject', name='uix_user_day_subject'),)
+
+class UserDataVersion(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)  # Bumped on every log/rating write
+
+class SubmissionKey(db.Model):
+    # Idempotency key of a recent /complete_task or /progress_log submission (see IdempotencyStore)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    key = db.Column(db.String(128), primary_key=True)
+    expires_at = db.Column(db.Float, nullable=False)  # time.time() after which the key may be reused
+    
+    __table_args__ = (db.Index('ix_submission_key_expires', 'expires_at'),)
+
+class UserStreak(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)  # Consecutive task days ending on last_study_date
+    max_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_study_date = db.Column(db.Date)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -104,208 +244,226 @@ def load_user(user_id):
 # Helper Functions
 # -------------------------
 def load_curriculum():
-    """Load curriculum data from JSON file"""
-    file_path = os.path.join(app.static_folder, 'data', 'curriculum.json')
+    """Load curriculum data (cached, read-only view of static/data/curriculum.json)"""
+    return get_curriculum()
+
+def get_subject_lists(subjects, curriculum_data):
+    """Return (user_subjects, uplearn_subjects) for a UserSubjects row"""
+    user_subjects = []
+    uplearn_subjects = []
+    if subjects:
+        if subjects.biology:
+            user_subjects.append("Biology")
+            uplearn_subjects.append("Biology")
+        if subjects.chemistry:
+            user_subjects.append("Chemistry")
+            uplearn_subjects.append("Chemistry")
+    # Always include Psychology
+    if "Psychology" in curriculum_data:
+        user_subjects.append("Psychology")
+    return user_subjects, uplearn_subjects
+
+def get_plan_inputs(user, curriculum_data, plan_date=None):
+    """Collect the subjects, ratings and study hours that a user's daily plan depends on"""
+    # Get user's selected subjects for task filtering
+    user_subjects, uplearn_subjects = get_subject_lists(user.subjects, curriculum_data)
     
-    # Create directories if they don't exist
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    # Get user's topic proficiencies for personalized task generation
+    user_proficiencies = {}
+    try:
+        for proficiency in TopicProficiency.query.filter_by(user_id=user.id).all():
+            user_proficiencies.setdefault(proficiency.subject, {})[proficiency.topic] = proficiency.proficiency
+    except Exception as e:
+        # If table doesn't exist yet, proceed without proficiencies
+        print(f"Note: Unable to load topic proficiencies: {e}")
     
+    # Get user's topic frequency preferences from onboarding
+    user_preferences = {}
     try:
-        with open(file_path, 'r') as file:
-            return json.load(file)
-    except FileNotFoundError:
-        print(f"Error: Could not find curriculum.json at {file_path}")
-        # Return empty curriculum structure as fallback
-        return {
-            "Biology": {"Years": []},
-            "Chemistry": {"Modules": []},
-            "Psychology": {"Papers": []}
-        }
-
-def generate_task_for_topic(subject, topic, duration_minutes):
-    """Generate a study task for a specific topic"""
-    task_templates = [
-        {"type": "Review", "template": "Review and create summary notes on {topic}", "min_duration": 30},
-        {"type": "Practice", "template": "Complete practice questions on {topic}", "min_duration": 45},
-        {"type": "Quiz", "template": "Create and answer quiz questions for {topic}", "min_duration": 20},
-        {"type": "Mind Map", "template": "Create a detailed mind map for {topic}", "min_duration": 25},
-        {"type": "Flash Cards", "template": "Make flash cards covering {topic}", "min_duration": 30},
-        {"type": "Essay Plan", "template": "Create essay plans related to {topic}", "min_duration": 40},
-        {"type": "Uplearn", "template": "Complete Uplearn session on {topic}", "min_duration": 45}
-    ]
+        for preference in TopicPreference.query.filter_by(user_id=user.id).all():
+            user_preferences.setdefault(preference.subject, {})[preference.topic] = preference.frequency
+    except Exception as e:
+        print(f"Note: Unable to load topic preferences: {e}")
     
-    suitable_templates = [t for t in task_templates if t["min_duration"] <= duration_minutes]
-    if not suitable_templates:
-        suitable_templates = task_templates
+    # Reviews due by the plan date, most overdue first, so they are revised before new topics are sampled
+    due_reviews = []
+    try:
+        due_reviews = [tuple(row) for row in db.session.execute(
+            select(TopicReview.due, TopicReview.subject, TopicReview.topic)
+            .where(TopicReview.user_id == user.id, TopicReview.due <= (plan_date or datetime.now().date()).toordinal())
+            .order_by(TopicReview.due, TopicReview.id))]
+    except Exception as e:
+        print(f"Note: Unable to load topic reviews: {e}")
+        db.session.rollback()
     
-    template = random.choice(suitable_templates)
     return {
-        "subject": subject,
-        "task": template["template"].format(topic=topic["Title"]),
-        "duration": duration_minutes,
-        "type": template["type"]
+        "user_subjects": user_subjects,
+        "uplearn_subjects": uplearn_subjects,
+        "proficiencies": user_proficiencies,
+        "preferences": user_preferences,
+        "daily_study_hours": user.daily_study_hours,
+        "due_reviews": due_reviews
     }
 
-def generate_daily_tasks(curriculum_data, user_subjects=None, uplearn_subjects=None, user_proficiencies=None):
-    """Generate daily study tasks based on user preferences and curriculum"""
-    total_daily_minutes = random.randint(180, 240)  # 3-4 hours
-    minutes_remaining = total_daily_minutes
-    tasks = []
-    
-    # Select subjects based on user preference or randomly
-    if user_subjects and len(user_subjects) > 0:
-        daily_subjects = [s for s in user_subjects if s in curriculum_data]
-        if not daily_subjects and curriculum_data:
-            daily_subjects = [list(curriculum_data.keys())[0]]
-    else:
-        subjects = list(curriculum_data.keys())
-        daily_subjects = random.sample(subjects, min(random.randint(2, 3), len(subjects)))
-    
-    # Weight topics based on proficiency if available
-    weighted_topics = {}
-    if user_proficiencies:
-        # Dictionary to store topic weights by subject
-        # Lower proficiency means higher weight (more likely to be selected)
-        for subject in daily_subjects:
-            if subject in user_proficiencies:
-                subject_proficiencies = user_proficiencies[subject]
-                weighted_topics[subject] = {}
-                for topic, proficiency in subject_proficiencies.items():
-                    # Invert proficiency: lower proficiency = higher weight
-                    # 1 (beginner) = weight 5
-                    # 5 (expert) = weight 1
-                    weighted_topics[subject][topic] = 6 - proficiency  # Invert the scale
-    
-    for subject in daily_subjects:
-        # Allocate time based on remaining minutes
-        subject_minutes = minutes_remaining // len(daily_subjects)
-        
-        # Skip if subject is not in curriculum data
-        if subject not in curriculum_data:
-            continue
-            
-        subject_data = curriculum_data[subject]
-        
-        # Determine if this subject should be Uplearn-oriented
-        is_uplearn_task = False
-        if uplearn_subjects and subject in uplearn_subjects and subject != "Psychology" and random.random() < 0.9:
-            is_uplearn_task = True
-        
-        if subject == "Biology":
-            # Handle Biology's special structure with Years
-            for year in subject_data["Years"]:
-                for module in year["Modules"]:
-                    if module["Topics"]:
-                        # Select topic with weighting if available
-                        if subject in weighted_topics and weighted_topics[subject]:
-                            # Find topics from this module that have proficiency ratings
-                            module_topics = {}
-                            for topic in module["Topics"]:
-                                topic_title = topic["Title"]
-                                if topic_title in weighted_topics[subject]:
-                                    module_topics[topic_title] = weighted_topics[subject][topic_title]
-                            
-                            if module_topics:
-                                # Use weighted selection
-                                topics = list(module_topics.keys())
-                                weights = list(module_topics.values())
-                                selected_title = random.choices(topics, weights=weights, k=1)[0]
-                                topic = next((t for t in module["Topics"] if t["Title"] == selected_title), None)
-                                if not topic:  # Fallback if topic not found
-                                    topic = random.choice(module["Topics"])
-                            else:
-                                # No weights available for this module's topics
-                                topic = random.choice(module["Topics"])
-                        else:
-                            # No weights available for this subject
-                            topic = random.choice(module["Topics"])
-                            
-                        # Force Uplearn task type if this is an uplearn subject
-                        if is_uplearn_task:
-                            task = {
-                                "subject": f"{subject} ({year['Name']})",
-                                "task": f"Complete Uplearn session on {topic['Title']}",
-                                "duration": subject_minutes // 2,
-                                "type": "Uplearn"
-                            }
-                        else:
-                            task = generate_task_for_topic(f"{subject} ({year['Name']})", 
-                                                        topic, 
-                                                        subject_minutes // 2)
-                        tasks.append(task)
-        else:
-            # Handle other subjects
-            if "Papers" in subject_data:  # Psychology
-                paper = random.choice(subject_data["Papers"])
-                
-                # Select topic with weighting if available for Psychology
-                if subject in weighted_topics and weighted_topics[subject]:
-                    # Find topics from this paper that have proficiency ratings
-                    paper_topics = {}
-                    for topic in paper["Topics"]:
-                        topic_title = topic["Title"]
-                        if topic_title in weighted_topics[subject]:
-                            paper_topics[topic_title] = weighted_topics[subject][topic_title]
-                    
-                    if paper_topics:
-                        # Use weighted selection
-                        topics = list(paper_topics.keys())
-                        weights = list(paper_topics.values())
-                        selected_title = random.choices(topics, weights=weights, k=1)[0]
-                        topic = next((t for t in paper["Topics"] if t["Title"] == selected_title), None)
-                        if not topic:  # Fallback if topic not found
-                            topic = random.choice(paper["Topics"])
-                    else:
-                        # No weights available for this paper's topics
-                        topic = random.choice(paper["Topics"])
-                else:
-                    # No weights available for Psychology
-                    topic = random.choice(paper["Topics"])
-                
-                task = generate_task_for_topic(subject, topic, subject_minutes)
-                tasks.append(task)
-                
-            elif "Modules" in subject_data:  # Chemistry
-                module = random.choice(subject_data["Modules"])
-                if module["Topics"]:
-                    # Select topic with weighting if available for Chemistry
-                    if subject in weighted_topics and weighted_topics[subject]:
-                        # Find topics from this module that have proficiency ratings
-                        module_topics = {}
-                        for topic in module["Topics"]:
-                            topic_title = topic["Title"]
-                            if topic_title in weighted_topics[subject]:
-                                module_topics[topic_title] = weighted_topics[subject][topic_title]
-                        
-                        if module_topics:
-                            # Use weighted selection
-                            topics = list(module_topics.keys())
-                            weights = list(module_topics.values())
-                            selected_title = random.choices(topics, weights=weights, k=1)[0]
-                            topic = next((t for t in module["Topics"] if t["Title"] == selected_title), None)
-                            if not topic:  # Fallback if topic not found
-                                topic = random.choice(module["Topics"])
-                        else:
-                            # No weights available for this module's topics
-                            topic = random.choice(module["Topics"])
-                    else:
-                        # No weights available for Chemistry
-                        topic = random.choice(module["Topics"])
-                    
-                    # Force Uplearn task type if this is an uplearn subject
-                    if is_uplearn_task:
-                        task = {
-                            "subject": subject,
-                            "task": f"Complete Uplearn session on {topic['Title']}",
-                            "duration": subject_minutes,
-                            "type": "Uplearn"
-                        }
-                    else:
-                        task = generate_task_for_topic(subject, topic, subject_minutes)
-                    tasks.append(task)
+def get_daily_plan(user, plan_date=None):
+    """Return the user's plan for a day, generating and storing it on first request"""
+    if plan_date is None:
+        plan_date = datetime.now().date()
+    
+    try:
+        plan = DailyPlan.query.filter_by(user_id=user.id, plan_date=plan_date).first()
+        if plan:
+            return json.loads(plan.tasks)
+    except Exception as e:
+        # If table doesn't exist yet, fall back to generating without storing
+        print(f"Note: Unable to load daily plan: {e}")
+        db.session.rollback()
+    
+    curriculum_data = load_curriculum()
+    inputs = get_plan_inputs(user, curriculum_data, plan_date)
+    
+    # Per-user alias-table sampler, kept in sync with the ratings loaded above
+    sampler = sampler_cache.get(user.id, inputs["proficiencies"], inputs["preferences"])
+    tasks = build_daily_plan(user.id, plan_date, sampler=sampler, curriculum_data=curriculum_data, **inputs)
     
+    try:
+        db.session.add(DailyPlan(user_id=user.id, plan_date=plan_date, tasks=json.dumps(tasks)))
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored today's plan first; use theirs so every worker agrees
+        db.session.rollback()
+        plan = DailyPlan.query.filter_by(user_id=user.id, plan_date=plan_date).first()
+        if plan:
+            return json.loads(plan.tasks)
+    except Exception as e:
+        print(f"Note: Unable to store daily plan: {e}")
+        db.session.rollback()
     return tasks
 
+def invalidate_daily_plans(user_id, first_date=None):
+    """Drop today's and future stored plans after subjects, ratings or study hours change"""
+    log_store.invalidate_daily_plans(db.session, user_id, first_date)
+
+def load_schedule_logs(user_id, since_day, after_id=0):
+    """(log id, day, (subject, topic title), minutes) for the user's task logs from since_day with id > after_id"""
+    index = get_curriculum_index()
+    logs = []
+    try:
+        for log_id, completed, task, subject, duration in db.session.execute(
+                select(TaskLog.id, TaskLog.date_completed, TaskLog.task, TaskLog.subject, TaskLog.duration).where(
+                    TaskLog.user_id == user_id,
+                    TaskLog.date_completed >= datetime.combine(since_day, datetime.min.time()),
+                    TaskLog.id > after_id)):
+            topic = topic_from_task(task)
+            # "Biology (Year 12)" -> "Biology"
+            entry = index.find(topic, subject.split(' ')[0]) if topic and subject else None
+            if entry is not None:
+                logs.append((log_id, completed.date(), (entry.subject, entry.title),
+                             rollup_value(duration) or SESSION_MINUTES))
+    except Exception as e:
+        print(f"Note: Unable to load logged tasks: {e}")
+        db.session.rollback()
+    return logs
+
+def get_study_schedule(user):
+    """Return the user's exam-aware study schedule, re-planning the remaining days as tasks are logged.
+
+    The schedule covers the current planning period up to 15 weeks past
+    today and is rebuilt when the day, subjects, study hours or ratings
+    change. New task logs (from any worker) are folded into the cached
+    schedule incrementally, so other writes leave it untouched.
+    """
+    today = datetime.now().date()
+    period_start = plan_period_start(today)
+    user_subjects, _ = get_subject_lists(user.subjects, load_curriculum())
+    ratings_version = db.session.execute(
+        select(func.max(TopicProficiency.data_version)).where(TopicProficiency.user_id == user.id)).scalar()
+    key = (today, ratings_version, json.dumps([user_subjects, user.daily_study_hours]))
+
+    def build():
+        proficiencies = {}
+        for subject, topic, proficiency in db.session.execute(
+                select(TopicProficiency.subject, TopicProficiency.topic, TopicProficiency.proficiency)
+                .where(TopicProficiency.user_id == user.id)):
+            proficiencies.setdefault(subject, {})[topic] = proficiency
+        return StudySchedule(
+            period_start,
+            user_subjects,
+            proficiencies,
+            user.daily_study_hours,
+            SUBJECT_END_DATES,
+            horizon_days=(today - period_start).days + HORIZON_DAYS,
+            logs=load_schedule_logs(user.id, period_start)
+        )
+
+    schedule = schedule_cache.get(user.id, key, build)
+    schedule.apply_logs(load_schedule_logs(user.id, period_start, schedule.log_watermark))
+    return schedule
+
+# Upper bound on /api/ratings/save_batch (the whole curriculum is a few hundred topics)
+MAX_RATINGS_BATCH = 500
+
+def resolve_rating_topic(topic_id):
+    """Map a front-end topic_id to (subject, topic title); None if the subject cannot be determined"""
+    # Resolve the topic_id slug to its canonical title and subject via the curriculum index
+    entry = get_curriculum_index().find(topic_id)
+    if entry:
+        return entry.subject, entry.title
+    
+    # Convert topic_id to actual topic name (remove underscores, etc.)
+    topic_name = topic_id.replace('_', ' ')
+    # Fallback: check if the topic_id contains the subject name
+    for subject in ('Biology', 'Chemistry', 'Psychology'):
+        if subject.lower() in topic_id.lower():
+            return subject, topic_name
+    return None
+
+def upsert_ratings(user_id, ratings):
+    """Write {(subject, topic): proficiency} ratings with one INSERT ... ON CONFLICT DO UPDATE (caller commits)"""
+    if not ratings:
+        return
+    # Bump first and stamp the rows with the new version: SQLite serializes writers, so
+    # versions follow commit order and /api/ratings/get?since= never skips a rating
+    bump_data_version(db.session, user_id)
+    version = db.session.execute(
+        select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+    ).scalar()
+    now = datetime.now()
+    statement = sqlite_insert(TopicProficiency)
+    statement = statement.on_conflict_do_update(
+        index_elements=['user_id', 'subject', 'topic'],
+        set_={'proficiency': statement.excluded.proficiency, 'last_updated': now,
+              'data_version': statement.excluded.data_version}
+    )
+    db.session.execute(statement, [
+        {'user_id': user_id, 'subject': subject, 'topic': topic, 'proficiency': proficiency, 'last_updated': now,
+         'data_version': version}
+        for (subject, topic), proficiency in ratings.items()
+    ])
+    invalidate_daily_plans(user_id)
+
+def upsert_preferences(user_id, preferences):
+    """Write {(subject, topic): frequency} preferences with one INSERT ... ON CONFLICT DO UPDATE (caller commits)"""
+    if not preferences:
+        return
+    now = datetime.now()
+    statement = sqlite_insert(TopicPreference)
+    statement = statement.on_conflict_do_update(
+        index_elements=['user_id', 'subject', 'topic'],
+        set_={'frequency': statement.excluded.frequency, 'last_modified': now}
+    )
+    db.session.execute(statement, [
+        {'user_id': user_id, 'subject': subject, 'topic': topic, 'frequency': frequency, 'last_modified': now}
+        for (subject, topic), frequency in preferences.items()
+    ])
+
+def update_cached_sampler(user_id, ratings):
+    """Rebuild only the affected alias tables in this worker's sampler"""
+    sampler = sampler_cache.peek(user_id)
+    if sampler:
+        for (subject, topic), proficiency in ratings.items():
+            sampler.update(subject, topic, proficiency=proficiency)
+
 def get_uplearn_link(subject):
     """Get the UpLearn link for a subject"""
     links = {
@@ -318,6 +476,232 @@ def get_uplearn_link(subject):
     }
     return links.get(subject, "")
 
+# -------------------------
+# Analytics Aggregates
+# -------------------------
+def rebuild_daily_rollups(user_id=None):
+    """Recompute DailyRollup from the raw logs for one user or everyone (caller commits).
+
+    Returns the number of grouped (user, day, subject) log rows folded in.
+    """
+    rollups = DailyRollup.query
+    tasks = select(TaskLog.user_id, func.date(TaskLog.date_completed), TaskLog.subject, func.count(),
+                   func.sum(TaskLog.duration), func.sum(TaskLog.difficulty))
+    uplearn = select(UplearnLog.user_id, UplearnLog.date, UplearnLog.subject, func.count(),
+                     func.sum(UplearnLog.lessons_completed), func.sum(UplearnLog.time_spent),
+                     func.sum(UplearnLog.comprehension))
+    if user_id is not None:
+        rollups = rollups.filter(DailyRollup.user_id == user_id)
+        tasks = tasks.where(TaskLog.user_id == user_id)
+        uplearn = uplearn.where(UplearnLog.user_id == user_id)
+    rollups.delete(synchronize_session=False)
+    
+    rows = []
+    for uid, day, subject, count, minutes, difficulty in db.session.execute(
+            tasks.group_by(TaskLog.user_id, func.date(TaskLog.date_completed), TaskLog.subject)):
+        rows.append({'user_id': uid, 'day': datetime.strptime(day, '%Y-%m-%d').date(), 'subject': subject,
+                     'task_count': count, 'task_minutes': minutes or 0, 'difficulty_sum': difficulty or 0})
+    for uid, day, subject, sessions, lessons, minutes, comprehension in db.session.execute(
+            uplearn.group_by(UplearnLog.user_id, UplearnLog.date, UplearnLog.subject)):
+        rows.append({'user_id': uid, 'day': day, 'subject': subject, 'uplearn_sessions': sessions,
+                     'uplearn_lessons': lessons or 0,
+                     'uplearn_minutes': minutes or 0, 'comprehension_sum': comprehension or 0})
+    for i in range(0, len(rows), 1000):
+        upsert_rollups(db.session, rows[i:i + 1000])
+    
+    # Rollups changed underneath any cached analytics
+    if user_id is not None:
+        bump_data_version(db.session, user_id)
+    else:
+        UserDataVersion.query.update({UserDataVersion.version: UserDataVersion.version + 1},
+                                     synchronize_session=False)
+    return len(rows)
+
+def get_data_version(user_id):
+    """Current analytics data version for a user (None if it cannot be read)"""
+    try:
+        version = db.session.execute(
+            select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+        ).scalar()
+    except Exception as e:
+        print(f"Note: Unable to read data version: {e}")
+        db.session.rollback()
+        return None
+    return version or 0
+
+def get_cached_analytics(user_id, name, build):
+    """Serve an analytics context from data_cache while the user's data version is unchanged"""
+    key = ':'.join(str(part) for part in (user_id,) + name)
+    return data_cache.get_or_build('analytics', key, get_data_version(user_id), build)
+
+def load_rollup_activities(user_id):
+    """Stream the user's DailyRollup rows as analytics activities"""
+    rows = db.session.execute(
+        select(DailyRollup.day, DailyRollup.subject, DailyRollup.task_count, DailyRollup.task_minutes,
+               DailyRollup.difficulty_sum, DailyRollup.uplearn_sessions, DailyRollup.uplearn_lessons,
+               DailyRollup.uplearn_minutes, DailyRollup.comprehension_sum)
+        .where(DailyRollup.user_id == user_id)
+    )
+    return (rollup_activity(row) for row in rows)
+
+def rebuild_streaks(user_id=None):
+    """Recompute UserStreak from the TaskLog history for one user or everyone (caller commits).
+
+    Returns the number of users with a streak row.
+    """
+    streaks = UserStreak.query
+    study_day = func.date(TaskLog.date_completed)
+    days = (select(TaskLog.user_id, study_day).distinct()
+            .where(TaskLog.date_completed.isnot(None))
+            .order_by(TaskLog.user_id, study_day))
+    if user_id is not None:
+        streaks = streaks.filter(UserStreak.user_id == user_id)
+        days = days.where(TaskLog.user_id == user_id)
+    streaks.delete(synchronize_session=False)
+    
+    days_by_user = {}
+    for uid, day in db.session.execute(days):
+        days_by_user.setdefault(uid, []).append(datetime.strptime(day, '%Y-%m-%d').date())
+    for uid, study_days in days_by_user.items():
+        run, max_streak, last_day = streak_state(study_days)
+        db.session.add(UserStreak(user_id=uid, current_streak=run, max_streak=max_streak,
+                                  last_study_date=last_day))
+    
+    if user_id is not None:
+        bump_data_version(db.session, user_id)
+    else:
+        UserDataVersion.query.update({UserDataVersion.version: UserDataVersion.version + 1},
+                                     synchronize_session=False)
+    return len(days_by_user)
+
+def get_streak(user_id, today):
+    """Return the stored (current_streak, max_streak) as of today"""
+    streak = db.session.get(UserStreak, user_id)
+    if streak is None:
+        return 0, 0
+    return active_streak(streak.current_streak, streak.last_study_date, today), streak.max_streak
+
+def build_study_analytics(user_id, today):
+    """StudyAnalytics shared by study_analytics, time_analysis and progress_log (one pass over O(days) rows)"""
+    analytics = compute_analytics(load_rollup_activities(user_id), today)
+    # Streaks are maintained at write time by log_store.update_streak
+    analytics.current_streak, analytics.max_streak = get_streak(user_id, today)
+    return analytics
+
+def get_upcoming_exams(today=None):
+    """Next exam still ahead for each subject"""
+    today = today or datetime.now().date()
+    upcoming_exams = {}
+    for subject, exams in EXAMS_BY_SUBJECT.items():
+        # Same cut-off as days_until_filter(exam['date']) > 0: at least one full day away
+        next_exam = next((exam for exam_date, exam in exams if (exam_date - today).days > 1), None)
+        if next_exam:
+            upcoming_exams[subject] = next_exam
+    return upcoming_exams
+
+def get_cached_upcoming_exams():
+    """get_upcoming_exams() from data_cache, built once per calendar day and shared by every user"""
+    today = datetime.now().date()
+    return data_cache.get_or_build('exams', 'upcoming', today.toordinal(), lambda: get_upcoming_exams(today))
+
+# -------------------------
+# Log Writes
+# -------------------------
+def flush_log_writes(items):
+    """Write a batch of queued (kind, fields, key) logs in one transaction (write-behind thread)"""
+    with app.app_context():
+        try:
+            store_logs(db.session, [(kind, fields) for kind, fields, _ in items])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+# Submission keys for /complete_task and /progress_log, shared by every worker through the database
+idempotency_keys = IdempotencyStore(lambda: db.engine)
+
+def release_dropped_log(item):
+    """A queued log that could not be written frees its idempotency key, so a retry is accepted"""
+    key = item[2]
+    if key is not None:
+        with app.app_context():
+            idempotency_keys.release(key)
+
+log_writer = WriteBehindQueue(
+    flush_log_writes,
+    on_drop=release_dropped_log,
+    flush_interval=app.config["WRITE_BEHIND_INTERVAL"],
+    max_batch=app.config["WRITE_BEHIND_MAX_BATCH"],
+    max_size=app.config["WRITE_BEHIND_MAX_QUEUE"]
+)
+
+def submission_key():
+    """Idempotency key of this log submission, scoped to the user (None if the client sent none).
+
+    Read from the Idempotency-Key header or an idempotency_key form field.
+    """
+    key = request.headers.get('Idempotency-Key') or request.form.get('idempotency_key')
+    if not key:
+        return None
+    return (current_user.id, key[:128])
+
+def write_log(kind, key=None, **fields):
+    """Store a task or UpLearn log, through the write-behind queue when LOG_WRITE_MODE enables it.
+
+    Timestamps are taken by the caller so queued logs keep their request
+    time. A full queue falls back to a synchronous commit (backpressure).
+    Returns False without writing when `key` (see submission_key) was
+    already used within the idempotency window.
+    """
+    if key is not None and not idempotency_keys.claim(key):
+        return False
+    try:
+        if app.config["LOG_WRITE_MODE"] == "write_behind" and log_writer.submit((kind, fields, key)):
+            return True
+        store_logs(db.session, [(kind, fields)])
+        db.session.commit()
+    except Exception:
+        if key is not None:
+            # Nothing was written, so a retry with the same key must go through
+            db.session.rollback()
+            idempotency_keys.release(key)
+        raise
+    return True
+
+# -------------------------
+# Log History
+# -------------------------
+def task_history_page(user_id, cursor=None, limit=PAGE_SIZE):
+    """One page of the user's TaskLogs, newest first (cursor from the previous page)"""
+    return keyset_page(TaskLog.query.filter(TaskLog.user_id == user_id),
+                       TaskLog.date_completed, TaskLog.id, cursor, limit)
+
+def uplearn_history_page(user_id, cursor=None, limit=PAGE_SIZE):
+    """One page of the user's UplearnLogs, newest first (cursor from the previous page)"""
+    return keyset_page(UplearnLog.query.filter(UplearnLog.user_id == user_id),
+                       UplearnLog.date, UplearnLog.id, cursor, limit)
+
+def task_log_json(log):
+    return {
+        'id': log.id,
+        'task': log.task,
+        'subject': log.subject,
+        'date_completed': log.date_completed.isoformat() if log.date_completed else None,
+        'duration': log.duration,
+        'difficulty': log.difficulty,
+        'notes': log.notes
+    }
+
+def uplearn_log_json(log):
+    return {
+        'id': log.id,
+        'subject': log.subject,
+        'date': log.date.isoformat() if log.date else None,
+        'lessons_completed': log.lessons_completed,
+        'time_spent': log.time_spent,
+        'comprehension': log.comprehension
+    }
+
 # Sample Data for Timetable & Weekend Tasks
 weekday_timetable = {
     "Monday": [
@@ -373,23 +757,28 @@ SUBJECT_END_DATES = {
     ]
 }
 
-def get_calendar_data(start_date=None):
-    """Generate calendar data with exam dates"""
-    if not start_date:
-        start_date = datetime.now()
-    
-    weeks = []
-    current_date = start_date
-    
-    # Calculate exam dates and create a map of important dates
-    important_dates = {}
-    for subject, exams in SUBJECT_END_DATES.items():
+def build_exam_index(subject_end_dates):
+    """Parse the exam dates once: ({subject: [(date, exam), ...] soonest first}, {'YYYY-MM-DD': calendar entries})"""
+    by_subject = {}
+    by_day = {}
+    for subject, exams in subject_end_dates.items():
+        by_subject[subject] = sorted(((datetime.strptime(exam['date'], '%Y-%m-%d').date(), exam) for exam in exams),
+                                     key=lambda item: item[0])
         for exam in exams:
-            exam_date = exam['date']
-            important_dates[exam_date] = important_dates.get(exam_date, []) + [
+            by_day.setdefault(exam['date'], []).append(
                 {'subject': subject, 'exam': exam['paper'], 'topics': exam['topics']}
-            ]
-    
+            )
+    return by_subject, by_day
+
+EXAMS_BY_SUBJECT, EXAMS_BY_DAY = build_exam_index(SUBJECT_END_DATES)
+
+# Cached calendar skeletons are rebuilt whenever the exam dates change
+EXAM_DATES_VERSION = hashlib.sha1(json.dumps(SUBJECT_END_DATES, sort_keys=True).encode()).hexdigest()[:12]
+
+def build_calendar_skeleton(start_day):
+    """15 weeks of dates, exams and next exam per subject from start_day (no tasks, same for every user)"""
+    weeks = []
+    current_date = start_day
     for week in range(1, 16):  # Generate 15 weeks of data
         week_data = {
             'week_number': week,
@@ -404,45 +793,53 @@ def get_calendar_data(start_date=None):
         for day_offset in range(7):
             day_date = current_date + timedelta(days=day_offset)
             day_str = day_date.strftime('%Y-%m-%d')
-            day_name = day_date.strftime('%A')
             
             # Check if this day has any exams
-            day_exams = important_dates.get(day_str, [])
-            
-            day_data = {
-                'date': day_str,
-                'day_name': day_name,
-                'tasks': weekday_timetable.get(day_name, []),
-                'exams': day_exams
-            }
+            day_exams = EXAMS_BY_DAY.get(day_str, [])
+            week_data['days'].append({'date': day_str, 'day_name': day_date.strftime('%A'), 'exams': day_exams})
             
             # Add exams to the week's exam list
             week_data['exams'].extend(day_exams)
-            
-            week_data['days'].append(day_data)
         
-        # Add subject data with next exam information
-        for subject, exams in SUBJECT_END_DATES.items():
-            # Find the next exam for this subject from the current date
-            next_exam = None
-            for exam in exams:
-                exam_date = datetime.strptime(exam['date'], '%Y-%m-%d')
-                if exam_date >= current_date:
-                    if next_exam is None or exam_date < datetime.strptime(next_exam['date'], '%Y-%m-%d'):
-                        next_exam = exam
-            
+        # Next exam for each subject after the week's first day
+        for subject, exams in EXAMS_BY_SUBJECT.items():
+            next_exam = next((exam for exam_date, exam in exams if exam_date > current_date), None)
             if next_exam:
-                week_data['subjects'][subject] = {
-                    'tasks': weekday_timetable.get(current_date.strftime('%A'), []),
-                    'end_date': next_exam['date'],
-                    'next_exam': next_exam
-                }
+                week_data['subjects'][subject] = {'end_date': next_exam['date'], 'next_exam': next_exam}
         
         weeks.append(week_data)
         current_date += timedelta(days=7)
     
     return weeks
 
+def get_calendar_data(start_date=None, schedule=None):
+    """Generate calendar data with exam dates, filling days from the user's study schedule if given"""
+    start_day = (start_date or datetime.now()).date()
+    skeleton = data_cache.get_or_build('calendar', start_day.isoformat(), EXAM_DATES_VERSION,
+                                       lambda: build_calendar_skeleton(start_day))
+    
+    # Copy the cached weeks while adding the tasks, so the shared skeleton is never modified
+    weeks = []
+    for week in skeleton:
+        week_start = datetime.fromisoformat(week['start_date']).date()
+        days = []
+        for day in week['days']:
+            day_date = datetime.fromisoformat(day['date']).date()
+            tasks = schedule.tasks_for(day_date) if schedule else weekday_timetable.get(day['day_name'], [])
+            days.append(dict(day, tasks=tasks))
+        
+        subjects = {}
+        for subject, info in week['subjects'].items():
+            if schedule:
+                week_tasks = [task for task in schedule.tasks_for(week_start) if task.startswith(subject)]
+            else:
+                week_tasks = weekday_timetable.get(week_start.strftime('%A'), [])
+            subjects[subject] = dict(info, tasks=week_tasks)
+        
+        weeks.append(dict(week, days=days, subjects=subjects))
+    
+    return weeks
+
 def filter_timetable_for_user(timetable, user):
     """Filter timetable tasks based on user's selected subjects"""
     filtered_timetable = {}
@@ -540,52 +937,20 @@ def dashboard():
             flash("Error updating progress. Please check your inputs.")
         return redirect(url_for('dashboard'))
     
-    curriculum_data = load_curriculum()
+    # Today's plan is materialized per user, so refreshes and redirects show the same tasks
+    daily_tasks = get_daily_plan(current_user)
     
-    # Get user's selected subjects for task filtering
-    user_subjects = []
-    uplearn_subjects = []
-    if current_user.subjects:
-        if current_user.subjects.biology:
-            user_subjects.append("Biology")
-            uplearn_subjects.append("Biology")
-        if current_user.subjects.chemistry:
-            user_subjects.append("Chemistry")
-            uplearn_subjects.append("Chemistry")
-    # Always include Psychology
-    if "Psychology" in curriculum_data:
-        user_subjects.append("Psychology")
-    
-    # Get user's topic proficiencies for personalized task generation
-    user_proficiencies = {}
-    try:
-        # Check if the topic_proficiency table exists
-        topic_proficiencies = TopicProficiency.query.filter_by(user_id=current_user.id).all()
-        
-        for proficiency in topic_proficiencies:
-            if proficiency.subject not in user_proficiencies:
-                user_proficiencies[proficiency.subject] = {}
-            user_proficiencies[proficiency.subject][proficiency.topic] = proficiency.proficiency
-    except Exception as e:
-        # If table doesn't exist yet, proceed without proficiencies
-        print(f"Note: Unable to load topic proficiencies: {e}")
-    
-    # Generate tasks based on user's selected subjects, uplearn preferences, and topic proficiencies
-    daily_tasks = generate_daily_tasks(curriculum_data, user_subjects, uplearn_subjects, user_proficiencies)
-    
-    # Filter timetable for user's subjects
-    filtered_timetable = filter_timetable_for_user(weekday_timetable, current_user)
+    # Exam-aware schedule drives both the weekly timetable and the calendar
+    schedule = get_study_schedule(current_user)
+    filtered_timetable = schedule.week_timetable(datetime.now().date())
+    if not filtered_timetable:
+        filtered_timetable = filter_timetable_for_user(weekday_timetable, current_user)
     
     # Get calendar data for compact view
-    calendar_data = get_calendar_data()
+    calendar_data = get_calendar_data(schedule=schedule)
     
     # Get the next upcoming exam for each subject
-    upcoming_exams = {}
-    for subject, exams in SUBJECT_END_DATES.items():
-        next_exams = sorted([exam for exam in exams if days_until_filter(exam['date']) > 0], 
-                          key=lambda x: days_until_filter(x['date']))
-        if next_exams:
-            upcoming_exams[subject] = next_exams[0]
+    upcoming_exams = get_cached_upcoming_exams()
     
     return render_template(
         "dashboard.html",
@@ -625,6 +990,7 @@ def update_subjects():
     
     subjects.chemistry = request.form.get("chemistry") == "on"
     subjects.biology = request.form.get("biology") == "on"
+    invalidate_daily_plans(current_user.id)
     
     db.session.commit()
     flash("Subjects updated successfully!")
@@ -633,21 +999,12 @@ def update_subjects():
 @app.route("/study_planner")
 @login_required
 def study_planner():
-    calendar_data = get_calendar_data()
+    schedule = get_study_schedule(current_user)
+    calendar_data = get_calendar_data(schedule=schedule)
+    curriculum_data = load_curriculum()
     
     # Get user's selected subjects for task filtering
-    user_subjects = []
-    uplearn_subjects = []
-    if current_user.subjects:
-        if current_user.subjects.biology:
-            user_subjects.append("Biology")
-            uplearn_subjects.append("Biology")
-        if current_user.subjects.chemistry:
-            user_subjects.append("Chemistry")
-            uplearn_subjects.append("Chemistry")
-    # Always include Psychology
-    if "Psychology" in load_curriculum():
-        user_subjects.append("Psychology")
+    user_subjects, _ = get_subject_lists(current_user.subjects, curriculum_data)
         
     # Filter weekend tasks based on user's selected subjects
     filtered_weekend_tasks = []
@@ -660,16 +1017,13 @@ def study_planner():
         elif "Psychology" in task_subject:
             filtered_weekend_tasks.append(task)
     
-    # Filter timetable for user's subjects
-    filtered_timetable = filter_timetable_for_user(weekday_timetable, current_user)
+    # Weekly timetable from the schedule, falling back to the static one
+    filtered_timetable = schedule.week_timetable(datetime.now().date())
+    if not filtered_timetable:
+        filtered_timetable = filter_timetable_for_user(weekday_timetable, current_user)
     
     # Get the next upcoming exam for each subject
-    upcoming_exams = {}
-    for subject, exams in SUBJECT_END_DATES.items():
-        next_exams = sorted([exam for exam in exams if days_until_filter(exam['date']) > 0], 
-                          key=lambda x: days_until_filter(x['date']))
-        if next_exams:
-            upcoming_exams[subject] = next_exams[0]
+    upcoming_exams = get_cached_upcoming_exams()
     
     return render_template(
         "study_planner.html",
@@ -746,6 +1100,7 @@ def welcome():
             if current_user.onboarding_step < 1:
                 current_user.onboarding_step = 1
             
+            invalidate_daily_plans(current_user.id)
             db.session.commit()
             print(f"User updated: onboarding_step={current_user.onboarding_step}")
             
@@ -760,8 +1115,30 @@ def welcome():
             
         elif "step2" in request.form:
             print("Processing step 2")
-            # Process curriculum preferences
+            # Process curriculum preferences (one upsert for every topic on the form)
+            index = get_curriculum_index()
+            preferences = {}
+            for key, value in request.form.items():
+                if key.startswith('topic_'):
+                    _, subject, title = key.split('_', 2)
+                    try:
+                        frequency = int(value)  # -1, 0, or 1
+                    except ValueError:
+                        continue
+                    # Store under the module topic the simplified title names; the sampler ignores anything else
+                    entry = index.find_module_topic(subject, title)
+                    if entry is None or frequency not in PREFERENCE_MULTIPLIERS:
+                        continue
+                    preferences[(subject, entry.title)] = frequency
+            upsert_preferences(current_user.id, preferences)
+            sampler = sampler_cache.peek(current_user.id)
+            if sampler:
+                for (subject, topic), frequency in preferences.items():
+                    sampler.update(subject, topic, preference=frequency)
+            
             current_user.onboarding_step = 2
+            current_user.welcome_completed = True
+            invalidate_daily_plans(current_user.id)
             db.session.commit()
             print(f"User updated: onboarding_step={current_user.onboarding_step}")
             
@@ -783,7 +1160,7 @@ def welcome():
     return render_template(
         "welcome.html",
         user=current_user,
-        curriculum=curriculum_data,
+        curriculum=curriculum_data.get("Curriculum", curriculum_data),
         settings_mode=settings_mode,
         fullscreen_mode=True
     )
@@ -791,226 +1168,34 @@ def welcome():
 @app.route("/study_analytics")
 @login_required
 def study_analytics():
-    # Get task logs for the current user, ordered by most recent
-    task_logs = TaskLog.query.filter_by(user_id=current_user.id).order_by(TaskLog.date_completed.desc()).all()
+    # Only the five most recent tasks are listed; everything else comes from the summary
+    recent_tasks = TaskLog.query.filter_by(user_id=current_user.id).order_by(TaskLog.date_completed.desc()).limit(5).all()
     
-    # Get UpLearn logs for the current user
-    uplearn_logs = UplearnLog.query.filter_by(user_id=current_user.id).order_by(UplearnLog.date.desc()).all()
-    
-    # Calculate completion statistics by week
-    week_stats = {}
+    # Aggregates come from the rollups and are cached until the user's data changes
     today = datetime.now().date()
-    
-    # Process the last 12 weeks of data
-    for i in range(12):
-        week_start = today - timedelta(days=today.weekday()) - timedelta(weeks=i)
-        week_end = week_start + timedelta(days=6)
-        week_label = f"{week_start.strftime('%d %b')} - {week_end.strftime('%d %b')}"
-        
-        # Count tasks completed this week by subject
-        week_tasks = [log for log in task_logs 
-                     if week_start <= log.date_completed.date() <= week_end]
-        
-        # Group by subject
-        subjects = {}
-        for log in week_tasks:
-            subjects[log.subject] = subjects.get(log.subject, 0) + 1
-        
-        # Calculate time spent in hours
-        total_time = sum(log.duration for log in week_tasks) / 60.0 if week_tasks else 0
-        
-        # Get uplearn progress this week
-        week_uplearn = [log for log in uplearn_logs 
-                       if week_start <= log.date <= week_end]
-        uplearn_lessons = sum(log.lessons_completed for log in week_uplearn)
-        
-        week_stats[week_label] = {
-            'tasks': len(week_tasks),
-            'subjects': subjects,
-            'time_spent': round(total_time, 1),
-            'uplearn_lessons': uplearn_lessons
-        }
-    
-    # Calculate efficiency and productivity metrics
-    if task_logs:
-        avg_duration_by_subject = {}
-        avg_difficulty_by_subject = {}
-        
-        for subject in ['Chemistry', 'Biology Y13', 'Biology Y12', 'Psychology']:
-            subject_logs = [log for log in task_logs if log.subject == subject]
-            if subject_logs:
-                avg_duration_by_subject[subject] = sum(log.duration for log in subject_logs) / len(subject_logs)
-                avg_difficulty_by_subject[subject] = sum(log.difficulty for log in subject_logs) / len(subject_logs)
-        
-        # Calculate productivity score (tasks completed per hour of study)
-        total_hours = sum(log.duration for log in task_logs) / 60.0
-        productivity = len(task_logs) / total_hours if total_hours > 0 else 0
-    else:
-        avg_duration_by_subject = {}
-        avg_difficulty_by_subject = {}
-        productivity = 0
-    
-    # Analyze time distribution
-    time_distribution = {
-        'Monday': 0, 'Tuesday': 0, 'Wednesday': 0, 'Thursday': 0,
-        'Friday': 0, 'Saturday': 0, 'Sunday': 0
-    }
-    
-    # Track productivity by day of week
-    day_productivity = {
-        'Monday': {'time': 0, 'tasks': 0}, 'Tuesday': {'time': 0, 'tasks': 0},
-        'Wednesday': {'time': 0, 'tasks': 0}, 'Thursday': {'time': 0, 'tasks': 0},
-        'Friday': {'time': 0, 'tasks': 0}, 'Saturday': {'time': 0, 'tasks': 0},
-        'Sunday': {'time': 0, 'tasks': 0}
-    }
-    
-    # Analyze time spent on each task
-    for log in task_logs:
-        day_name = log.date_completed.strftime('%A')
-        time_distribution[day_name] += log.duration
-        day_productivity[day_name]['time'] += log.duration
-        day_productivity[day_name]['tasks'] += 1
-    
-    # Add UpLearn time
-    for log in uplearn_logs:
-        day_name = log.date.strftime('%A')
-        time_distribution[day_name] += log.time_spent
-    
-    # Calculate productivity (tasks per hour)
-    productivity_by_day = {}
-    for day, data in day_productivity.items():
-        if data['time'] > 0:
-            hours = data['time'] / 60.0
-            productivity_by_day[day] = data['tasks'] / hours
-        else:
-            productivity_by_day[day] = 0
-    
-    # Streak analysis
-    if task_logs:
-        # Check if there's a log from today
-        current_date = datetime.now().date()
-        today_log = any(log.date_completed.date() == current_date for log in task_logs)
-        
-        current_streak = 1 if today_log else 0
-        if not today_log:
-            # Check yesterday
-            yesterday = current_date - timedelta(days=1)
-            if any(log.date_completed.date() == yesterday for log in task_logs):
-                current_streak = 1
-        
-        # Calculate max streak
-        streak_dates = set(log.date_completed.date() for log in task_logs)
-        date_ranges = sorted(streak_dates)
-        
-        max_streak = 1
-        if date_ranges:
-            for i in range(1, len(date_ranges)):
-                date_diff = (date_ranges[i] - date_ranges[i-1]).days
-                if date_diff > 1:  # Streak broken
-                    # Calculate max streak
-                    streak_length = i
-                    if streak_length > max_streak:
-                        max_streak = streak_length
-    else:
-        current_streak = 0
-        max_streak = 0
+    analytics = get_cached_analytics(current_user.id, ('analytics', today),
+                                     lambda: build_study_analytics(current_user.id, today))
     
     return render_template(
         "study_analytics.html",
-        task_logs=task_logs,
-        uplearn_logs=uplearn_logs,
-        week_stats=week_stats,
-        avg_duration_by_subject=avg_duration_by_subject,
-        avg_difficulty_by_subject=avg_difficulty_by_subject,
-        productivity=productivity,
-        time_distribution=time_distribution,
-        productivity_by_day=productivity_by_day,
-        day_productivity=day_productivity,
-        current_streak=current_streak,
-        max_streak=max_streak,
-        now=datetime.now()
+        recent_tasks=recent_tasks,
+        now=datetime.now(),
+        **analytics.template_context()
     )
 
 @app.route("/time_analysis")
 @login_required
 def time_analysis():
-    # Get task logs for the current user
-    task_logs = TaskLog.query.filter_by(user_id=current_user.id).all()
-    
-    # Get UpLearn logs for the current user
-    uplearn_logs = UplearnLog.query.filter_by(user_id=current_user.id).all()
-    
-    # Analyze time distribution
-    time_distribution = {
-        'Monday': 0, 'Tuesday': 0, 'Wednesday': 0, 'Thursday': 0,
-        'Friday': 0, 'Saturday': 0, 'Sunday': 0
-    }
-    
-    # Track productivity by day of week
-    day_productivity = {
-        'Monday': {'time': 0, 'tasks': 0}, 'Tuesday': {'time': 0, 'tasks': 0},
-        'Wednesday': {'time': 0, 'tasks': 0}, 'Thursday': {'time': 0, 'tasks': 0},
-        'Friday': {'time': 0, 'tasks': 0}, 'Saturday': {'time': 0, 'tasks': 0},
-        'Sunday': {'time': 0, 'tasks': 0}
-    }
-    
-    # Analyze time spent on each task
-    for log in task_logs:
-        day_name = log.date_completed.strftime('%A')
-        time_distribution[day_name] += log.duration
-        day_productivity[day_name]['time'] += log.duration
-        day_productivity[day_name]['tasks'] += 1
-    
-    # Add UpLearn time
-    for log in uplearn_logs:
-        day_name = log.date.strftime('%A')
-        time_distribution[day_name] += log.time_spent
-    
-    # Calculate productivity (tasks per hour)
-    productivity_by_day = {}
-    for day, data in day_productivity.items():
-        if data['time'] > 0:
-            hours = data['time'] / 60.0
-            productivity_by_day[day] = data['tasks'] / hours
-        else:
-            productivity_by_day[day] = 0
-    
-    # Streak analysis
-    if task_logs:
-        # Check if there's a log from today
-        current_date = datetime.now().date()
-        today_log = any(log.date_completed.date() == current_date for log in task_logs)
-        
-        current_streak = 1 if today_log else 0
-        if not today_log:
-            # Check yesterday
-            yesterday = current_date - timedelta(days=1)
-            if any(log.date_completed.date() == yesterday for log in task_logs):
-                current_streak = 1
-        
-        # Calculate max streak
-        streak_dates = set(log.date_completed.date() for log in task_logs)
-        date_ranges = sorted(streak_dates)
-        
-        max_streak = 1
-        if date_ranges:
-            for i in range(1, len(date_ranges)):
-                date_diff = (date_ranges[i] - date_ranges[i-1]).days
-                if date_diff > 1:  # Streak broken
-                    # Calculate max streak
-                    streak_length = i
-                    if streak_length > max_streak:
-                        max_streak = streak_length
-    else:
-        current_streak = 0
-        max_streak = 0
+    today = datetime.now().date()
+    analytics = get_cached_analytics(current_user.id, ('analytics', today),
+                                     lambda: build_study_analytics(current_user.id, today))
     
     return render_template(
         "time_analysis.html",
-        time_distribution=time_distribution,
-        productivity_by_day=productivity_by_day,
-        current_streak=current_streak,
-        max_streak=max_streak
+        time_distribution=analytics.time_distribution,
+        productivity_by_day=analytics.productivity_by_day,
+        current_streak=analytics.current_streak,
+        max_streak=analytics.max_streak
     )
 
 @app.route("/progress_log", methods=["GET", "POST"])
@@ -1025,87 +1210,72 @@ def progress_log():
     
     if request.method == "POST":
         if "log_task" in request.form:
-            # Log a completed task
-            new_task = TaskLog(
+            # Log a completed task (a repeated submission is acknowledged without a second row)
+            write_log(
+                'task',
+                key=submission_key(),
                 user_id=current_user.id,
                 task=request.form.get("task"),
                 subject=request.form.get("subject"),
                 duration=request.form.get("duration"),
                 difficulty=request.form.get("difficulty"),
-                notes=request.form.get("notes")
+                notes=request.form.get("notes"),
+                date_completed=datetime.now()
             )
-            db.session.add(new_task)
-            db.session.commit()
             flash("Task logged successfully!")
             
         elif "log_uplearn" in request.form:
             # Log UpLearn progress
-            new_uplearn = UplearnLog(
+            write_log(
+                'uplearn',
+                key=submission_key(),
                 user_id=current_user.id,
                 subject=request.form.get("subject"),
                 lessons_completed=request.form.get("lessons_completed"),
                 time_spent=request.form.get("time_spent"),
-                comprehension=request.form.get("comprehension")
+                comprehension=request.form.get("comprehension"),
+                date=datetime.now().date()
             )
-            db.session.add(new_uplearn)
-            db.session.commit()
             flash("UpLearn progress logged successfully!")
             
         return redirect(url_for("progress_log"))
     
-    # Get task logs for the current user, ordered by most recent
-    task_logs = TaskLog.query.filter_by(user_id=current_user.id).order_by(TaskLog.date_completed.desc()).all()
-    
-    # Get UpLearn logs for the current user
-    uplearn_logs = UplearnLog.query.filter_by(user_id=current_user.id).order_by(UplearnLog.date.desc()).all()
-    
-    # Calculate UpLearn statistics
-    uplearn_stats = {
-        "Chemistry": {"daily": [], "weekly": []},
-        "Biology Y12": {"daily": [], "weekly": []},
-        "Biology Y13": {"daily": [], "weekly": []}
-    }
+    # First page of each log, most recent first; older entries load from /api/history/*
+    task_logs, task_cursor = task_history_page(current_user.id)
+    uplearn_logs, uplearn_cursor = uplearn_history_page(current_user.id)
     
-    # Process daily stats
-    for subject in uplearn_stats:
-        # Get last 14 days of data
-        today = datetime.now().date()
-        for i in range(14):
-            day = today - timedelta(days=i)
-            logs = [log for log in uplearn_logs if log.subject == subject and log.date == day]
-            
-            # Calculate daily stats
-            daily_lessons = sum(log.lessons_completed for log in logs)
-            uplearn_stats[subject]["daily"].append({
-                "date": day.strftime("%Y-%m-%d"),
-                "lessons": daily_lessons
-            })
-        
-        # Weekly stats (last 8 weeks)
-        for i in range(8):
-            week_start = today - timedelta(days=today.weekday()) - timedelta(weeks=i)
-            week_end = week_start + timedelta(days=6)
-            
-            logs = [log for log in uplearn_logs 
-                if log.subject == subject 
-                and week_start <= log.date <= week_end]
-            
-            weekly_lessons = sum(log.lessons_completed for log in logs)
-            uplearn_stats[subject]["weekly"].append({
-                "week": f"{week_start.strftime('%d %b')} - {week_end.strftime('%d %b')}",
-                "lessons": weekly_lessons
-            })
+    # UpLearn statistics from the daily rollups
+    today = datetime.now().date()
+    analytics = get_cached_analytics(current_user.id, ('analytics', today),
+                                     lambda: build_study_analytics(current_user.id, today))
+    uplearn_stats = analytics.uplearn_stats
     
     return render_template(
         "progress_log.html",
         task_logs=task_logs,
         uplearn_logs=uplearn_logs,
+        task_cursor=task_cursor,
+        uplearn_cursor=uplearn_cursor,
         uplearn_stats=uplearn_stats,
         prefilled_task=prefilled_task,
         show_task_modal=bool(prefilled_task['task']),
         user=current_user
     )
 
+@app.route("/history")
+@login_required
+def history():
+    """Task and UpLearn log history: first page rendered here, the rest loaded on scroll"""
+    task_logs, task_cursor = task_history_page(current_user.id)
+    uplearn_logs, uplearn_cursor = uplearn_history_page(current_user.id)
+    return render_template(
+        "history.html",
+        task_logs=task_logs,
+        uplearn_logs=uplearn_logs,
+        task_cursor=task_cursor,
+        uplearn_cursor=uplearn_cursor
+    )
+
 @app.route("/complete_task", methods=["POST"])
 @login_required
 def complete_task():
@@ -1121,133 +1291,216 @@ def complete_task():
         flash("Missing task information.")
         return redirect(url_for("dashboard"))
     
-    # Create new task log
-    new_task = TaskLog(
+    # Create new task log; a double-click or retried request with the same key is acknowledged without one
+    created = write_log(
+        'task',
+        key=submission_key(),
         user_id=current_user.id,
         task=task,
         subject=subject,
         duration=duration,
         difficulty=difficulty,
-        notes="Completed via quick action"
+        notes="Completed via quick action",
+        date_completed=datetime.now()
     )
-    db.session.add(new_task)
-    db.session.commit()
-    
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({"success": True, "message": f"Task '{task}' marked as complete."})
+        return jsonify({"success": True, "duplicate": not created, "message": f"Task '{task}' marked as complete."})
     
     flash(f"Task '{task}' marked as complete!")
     return redirect(url_for("dashboard"))
 
 def init_db():
-    """Initialize the database and ensure schema is up to date"""
+    """Bring the database schema up to date by applying pending migrations (utils/migrations.py)"""
     with app.app_context():
-        # Attempt to create all tables including the new TopicProficiency table
-        db.create_all()
-        
-        # Verify the table exists 
-        try:
-            from sqlalchemy import inspect
-            inspector = inspect(db.engine)
-            if 'topic_proficiency' not in inspector.get_table_names():
-                # Force create the TopicProficiency table specifically
-                TopicProficiency.__table__.create(db.engine, checkfirst=True)
-            print("Database schema successfully updated!")
-        except Exception as e:
-            print(f"Warning: Could not verify table creation: {e}")
-            # Still try to create the table directly
-            try:
-                TopicProficiency.__table__.create(db.engine, checkfirst=True)
-                print("TopicProficiency table created successfully!")
-            except Exception as inner_e:
-                print(f"Error creating TopicProficiency table: {inner_e}")
-                
+        for migration in migrate(db.engine):
+            print(f"Applied migration {migration.version}: {migration.name}")
         print("Database initialization complete!")
 
+def warm_up():
+    """Build the read-only state every worker needs before gunicorn forks them (preload_app).
+
+    Applies pending migrations, compiles every template and loads the
+    curriculum index, SQLAlchemy mappers, URL map and today's calendar
+    skeleton, so forked workers share them copy-on-write and their first
+    request is served warm. The master's database connections are closed
+    afterwards so no SQLite handle crosses the fork.
+    """
+    init_db()
+    with app.app_context():
+        configure_mappers()
+        get_curriculum_index()
+        get_calendar_data()
+        app.url_map.update()
+        if app.jinja_env.bytecode_cache is not None:
+            status = cache_status(app.jinja_env)
+            stale = sorted(name for name, fresh in status.items() if not fresh)
+            print(f"Template bytecode cache: {len(status) - len(stale)}/{len(status)} fresh"
+                  + (f", compiling {', '.join(stale)}" if stale else ""))
+        # Loads from the bytecode cache, compiling (and caching) any template that is stale
+        for name in app.jinja_env.list_templates():
+            try:
+                app.jinja_env.get_template(name)
+            except TemplateError as e:
+                print(f"Note: Unable to compile template {name}: {e}")
+        db.engine.dispose()
+    print(f"Warm-up complete: {len(app.jinja_env.list_templates())} templates, "
+          f"{len(get_curriculum_index().topics)} curriculum topics")
+
+def parse_rating(value):
+    """A proficiency rating as an int from 1 to 5 (None if it is anything else)"""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        return None
+    try:
+        rating = int(value)
+    except (TypeError, ValueError):
+        return None
+    return rating if 1 <= rating <= 5 else None
+
 @app.route("/api/ratings/save", methods=['POST'])
 @login_required
 def save_rating():
     """API endpoint to save topic proficiency ratings"""
-    data = request.json
+    data = request.get_json(silent=True) or {}
     topic_id = data.get('topic_id')  # This will be the topic name
-    rating = data.get('rating')
     
-    if not topic_id or not rating:
+    if not topic_id or data.get('rating') is None:
         return jsonify({'error': 'Missing required fields'}), 400
+    rating = parse_rating(data.get('rating'))
+    if rating is None:
+        return jsonify({'error': 'Rating must be a whole number from 1 to 5'}), 400
     
-    # Convert topic_id to actual topic name (remove underscores, etc.)
-    topic_name = topic_id.replace('_', ' ')
-    
-    # Determine the subject based on the topic name
-    curriculum = load_curriculum().get('Curriculum', {})
-    subject = None
-    for subj, topics in curriculum.items():
-        if topic_name in topics:
-            subject = subj
-            break
-    
-    if not subject:
-        # Fallback: check if the topic_id contains the subject name
-        if 'biology' in topic_id.lower():
-            subject = 'Biology'
-        elif 'chemistry' in topic_id.lower():
-            subject = 'Chemistry'
-        elif 'psychology' in topic_id.lower():
-            subject = 'Psychology'
-        else:
-            return jsonify({'error': 'Could not determine subject for topic'}), 400
+    resolved = resolve_rating_topic(topic_id) if isinstance(topic_id, str) else None
+    if resolved is None:
+        return jsonify({'error': 'Could not determine subject for topic'}), 400
     
     try:
-        # Ensure the TopicProficiency table exists
-        init_db()
-        
-        # Check if a rating exists already
-        rating_obj = TopicProficiency.query.filter_by(
-            user_id=current_user.id, 
-            subject=subject,
-            topic=topic_name
-        ).first()
-        
-        if rating_obj:
-            # Update existing rating
-            rating_obj.proficiency = rating
-        else:
-            # Create new rating
-            rating_obj = TopicProficiency(
-                user_id=current_user.id,
-                subject=subject,
-                topic=topic_name,
-                proficiency=rating
-            )
-            db.session.add(rating_obj)
-            
+        ratings = {resolved: rating}
+        upsert_ratings(current_user.id, ratings)
         db.session.commit()
+        update_cached_sampler(current_user.id, ratings)
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route("/api/ratings/save_batch", methods=['POST'])
+@login_required
+def save_ratings_batch():
+    """Save many topic proficiency ratings in one transaction ({"ratings": [{"topic_id", "rating"}, ...]})"""
+    data = request.get_json(silent=True) or {}
+    items = data.get('ratings')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Missing ratings'}), 400
+    if len(items) > MAX_RATINGS_BATCH:
+        return jsonify({'error': f'At most {MAX_RATINGS_BATCH} ratings per batch'}), 400
+    
+    ratings = {}
+    skipped = []
+    for item in items:
+        topic_id = item.get('topic_id') if isinstance(item, dict) else None
+        rating = parse_rating(item.get('rating')) if isinstance(item, dict) else None
+        resolved = resolve_rating_topic(topic_id) if topic_id and isinstance(topic_id, str) else None
+        if resolved is None or rating is None:
+            skipped.append(topic_id)
+            continue
+        # Later entries for the same topic win (the client sends them in click order)
+        ratings[resolved] = rating
+    
+    try:
+        upsert_ratings(current_user.id, ratings)
+        db.session.commit()
+        update_cached_sampler(current_user.id, ratings)
+        return jsonify({'success': True, 'saved': len(ratings), 'skipped': skipped})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route("/api/history/tasks", methods=['GET'])
+@login_required
+def task_history():
+    """Keyset-paginated TaskLog history (?cursor=<next_cursor>&limit=N)"""
+    cursor = request.args.get('cursor')
+    position = decode_cursor(cursor, parse_datetime) if cursor else None
+    if cursor and position is None:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    logs, next_cursor = task_history_page(current_user.id, position, page_size(request.args.get('limit')))
+    return jsonify({'items': [task_log_json(log) for log in logs], 'next_cursor': next_cursor})
+
+@app.route("/api/history/uplearn", methods=['GET'])
+@login_required
+def uplearn_history():
+    """Keyset-paginated UplearnLog history (?cursor=<next_cursor>&limit=N)"""
+    cursor = request.args.get('cursor')
+    position = decode_cursor(cursor, parse_date) if cursor else None
+    if cursor and position is None:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    logs, next_cursor = uplearn_history_page(current_user.id, position, page_size(request.args.get('limit')))
+    return jsonify({'items': [uplearn_log_json(log) for log in logs], 'next_cursor': next_cursor})
+
+@app.route("/api/analytics/cache_stats", methods=['GET'])
+@login_required
+def analytics_cache_stats():
+    """Hit/miss counters for this worker's analytics and calendar cache"""
+    if not app.config["EXPOSE_STATS"]:
+        abort(404)
+    return jsonify(data_cache.stats())
+
+@app.route("/api/ingest/stats", methods=['GET'])
+@login_required
+def ingest_stats():
+    """Queue depth and flush latency of this worker's write-behind log queue"""
+    if not app.config["EXPOSE_STATS"]:
+        abort(404)
+    return jsonify(dict(log_writer.stats(), mode=app.config["LOG_WRITE_MODE"]))
+
 @app.route("/api/ratings/get", methods=['GET'])
 @login_required
 def get_ratings():
-    """API endpoint to get user's topic proficiency ratings"""
+    """API endpoint to get user's topic proficiency ratings.
+    
+    Clients holding ratings can pass ?since=<watermark> to receive only rows
+    written after it, and If-None-Match to get a 304 when nothing changed.
+    Both are the user's data version, which every write bumps in commit
+    order. A watermark that is not a version (e.g. an older client's
+    timestamp) gets the full map.
+    """
     try:
-        # Ensure the TopicProficiency table exists
-        init_db()
+        since = int(request.args.get('since', ''))
+    except ValueError:
+        since = None
+    
+    try:
+        # Read the version before the rows: a rating committed in between is newer than
+        # the watermark, so the client simply receives it again next time
+        watermark = get_data_version(current_user.id)
+        etag = f"ratings-v{watermark}" if watermark is not None else None
+        if etag and request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
         
-        # Get all ratings for current user
-        ratings = TopicProficiency.query.filter_by(user_id=current_user.id).all()
+        # Get the user's ratings (only those written after the client's watermark for a delta)
+        query = TopicProficiency.query.filter_by(user_id=current_user.id)
+        if since is not None:
+            query = query.filter(TopicProficiency.data_version > since)
         
         # Create a dictionary mapping topics to their proficiency levels
         ratings_dict = {}
-        for r in ratings:
+        for r in query.all():
             topic_id = r.topic.lower().replace(' ', '_')
             ratings_dict[topic_id] = r.proficiency
         
-        return jsonify({
+        response = jsonify({
             'success': True,
-            'ratings': ratings_dict
+            'ratings': ratings_dict,
+            'delta': since is not None,
+            'watermark': watermark
         })
+        if etag:
+            response.set_etag(etag)
+        # Let the browser keep the full map and revalidate it with If-None-Match
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         # Return empty ratings if there's an error
         return jsonify({
@@ -1256,6 +1509,204 @@ def get_ratings():
             'note': f"Could not retrieve ratings: {str(e)}"
         })
 
+# -------------------------
+# CLI Commands
+# -------------------------
+plans_cli = AppGroup("plans", help="Daily plan maintenance commands.")
+
+def load_bulk_plan_inputs(curriculum_data, last_date):
+    """Collect get_plan_inputs() for every user with a handful of bulk queries (reviews due by last_date)"""
+    subjects_by_user = {row.user_id: row for row in UserSubjects.query.all()}
+    
+    proficiencies = {}
+    for user_id, subject, topic, proficiency in db.session.execute(
+            select(TopicProficiency.user_id, TopicProficiency.subject, TopicProficiency.topic,
+                   TopicProficiency.proficiency)):
+        proficiencies.setdefault(user_id, {}).setdefault(subject, {})[topic] = proficiency
+    
+    preferences = {}
+    try:
+        for user_id, subject, topic, frequency in db.session.execute(
+                select(TopicPreference.user_id, TopicPreference.subject, TopicPreference.topic,
+                       TopicPreference.frequency)):
+            preferences.setdefault(user_id, {}).setdefault(subject, {})[topic] = frequency
+    except Exception as e:
+        print(f"Note: Unable to load topic preferences: {e}")
+        db.session.rollback()
+    
+    due_reviews = {}
+    try:
+        for user_id, due, subject, topic in db.session.execute(
+                select(TopicReview.user_id, TopicReview.due, TopicReview.subject, TopicReview.topic)
+                .where(TopicReview.due <= last_date.toordinal())
+                .order_by(TopicReview.user_id, TopicReview.due, TopicReview.id)):
+            due_reviews.setdefault(user_id, []).append((due, subject, topic))
+    except Exception as e:
+        print(f"Note: Unable to load topic reviews: {e}")
+        db.session.rollback()
+    
+    jobs = []
+    for user_id, daily_study_hours in db.session.execute(select(User.id, User.daily_study_hours)):
+        user_subjects, uplearn_subjects = get_subject_lists(subjects_by_user.get(user_id), curriculum_data)
+        jobs.append((user_id, {
+            "user_subjects": user_subjects,
+            "uplearn_subjects": uplearn_subjects,
+            "proficiencies": proficiencies.get(user_id, {}),
+            "preferences": preferences.get(user_id, {}),
+            "daily_study_hours": daily_study_hours,
+            "due_reviews": due_reviews.get(user_id, [])
+        }))
+    return jobs
+
+@plans_cli.command("generate")
+@click.option("--date", "start_date", default=None, help="First plan date (YYYY-MM-DD), defaults to today.")
+@click.option("--days", default=1, show_default=True, help="Number of consecutive days to generate.")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Worker processes.")
+@click.option("--chunk-size", default=500, show_default=True, help="Users per worker task.")
+@click.option("--batch-size", default=1000, show_default=True, help="Rows per insert batch.")
+@click.option("--force", is_flag=True, help="Overwrite plans that already exist.")
+def generate_plans(start_date, days, workers, chunk_size, batch_size, force):
+    """Pre-generate daily plans for every user ahead of the morning peak."""
+    first_day = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else datetime.now().date()
+    plan_dates = [first_day + timedelta(days=offset) for offset in range(days)]
+    migrate(db.engine)
+    
+    started = time.perf_counter()
+    jobs = load_bulk_plan_inputs(load_curriculum(), plan_dates[-1])
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    loaded = time.perf_counter()
+    
+    statement = sqlite_insert(DailyPlan)
+    if force:
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "plan_date"],
+            set_={"tasks": statement.excluded.tasks, "created_at": statement.excluded.created_at}
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=["user_id", "plan_date"])
+    
+    pending = []
+    written = 0
+    
+    def flush():
+        nonlocal written, pending
+        if pending:
+            db.session.execute(statement, pending)
+            db.session.commit()
+            written += len(pending)
+            pending = []
+    
+    def collect(rows):
+        now = datetime.now()
+        for user_id, plan_date, tasks in rows:
+            pending.append({"user_id": user_id, "plan_date": plan_date,
+                            "tasks": json.dumps(tasks), "created_at": now})
+            if len(pending) >= batch_size:
+                flush()
+    
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_plan_worker) as executor:
+            for rows in executor.map(build_plan_chunk, chunks, [plan_dates] * len(chunks)):
+                collect(rows)
+    else:
+        init_plan_worker()
+        for chunk in chunks:
+            collect(build_plan_chunk(chunk, plan_dates))
+    flush()
+    
+    elapsed = time.perf_counter() - started
+    rate = len(jobs) / elapsed if elapsed > 0 else 0
+    click.echo(f"Loaded inputs for {len(jobs)} users in {loaded - started:.2f}s")
+    click.echo(f"Generated {len(jobs) * len(plan_dates)} plans ({written} rows submitted) "
+               f"for {len(plan_dates)} day(s) in {elapsed:.2f}s: {rate:.0f} users/sec")
+
+app.cli.add_command(plans_cli)
+
+analytics_cli = AppGroup("analytics", help="Study analytics maintenance commands.")
+
+@analytics_cli.command("rebuild-rollups")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this user's rollups.")
+def rebuild_rollups_command(user_id):
+    """Recompute the daily rollup table from TaskLog and UplearnLog."""
+    migrate(db.engine)
+    started = time.perf_counter()
+    rows = rebuild_daily_rollups(user_id)
+    db.session.commit()
+    click.echo(f"Rebuilt daily rollups from {rows} grouped log rows in {time.perf_counter() - started:.2f}s")
+
+@analytics_cli.command("repair-streaks")
+@click.option("--user-id", type=int, default=None, help="Only repair this user's streak.")
+def repair_streaks_command(user_id):
+    """Recompute stored study streaks from the TaskLog history."""
+    migrate(db.engine)
+    started = time.perf_counter()
+    users = rebuild_streaks(user_id)
+    db.session.commit()
+    click.echo(f"Repaired streaks for {users} users in {time.perf_counter() - started:.2f}s")
+
+app.cli.add_command(analytics_cli)
+
+schema_cli = AppGroup("schema", help="Database schema migration commands.")
+
+@schema_cli.command("migrate")
+def migrate_command():
+    """Apply pending schema migrations."""
+    applied = migrate(db.engine)
+    for migration in applied:
+        click.echo(f"Applied migration {migration.version}: {migration.name}")
+    click.echo(f"Schema is at version {LATEST_VERSION}" if applied else "Schema is up to date")
+
+@schema_cli.command("status")
+def schema_status_command():
+    """Show the schema version, pending migrations and any model/schema drift."""
+    with db.engine.connect() as connection:
+        version = current_version(connection)
+    click.echo(f"Schema version {version} (latest {LATEST_VERSION})")
+    if db.engine.dialect.name == 'sqlite':
+        settings = ", ".join(f"{name}={value}" for name, value in sqlite_settings(db.engine).items())
+        click.echo(f"SQLite profile {app.config['SQLITE_PROFILE']}: {settings}")
+    for migration in MIGRATIONS:
+        if migration.version > version:
+            click.echo(f"  pending {migration.version}: {migration.name}")
+    for problem in schema_drift(db.engine, db.metadata):
+        click.echo(f"  drift: {problem}")
+
+app.cli.add_command(schema_cli)
+
+templates_cli = AppGroup("templates", help="Template bytecode cache commands.")
+
+@templates_cli.command("compile")
+def compile_templates_command():
+    """Precompile every template into the bytecode cache (run at deploy time)."""
+    if app.jinja_env.bytecode_cache is None:
+        raise click.ClickException("The template bytecode cache is disabled (TEMPLATE_CACHE_DIR is empty)")
+    results = compile_templates(app.jinja_env)
+    compiled = [result for result in results if result.error is None]
+    for result in sorted(compiled, key=lambda result: result.compile_ms, reverse=True):
+        click.echo(f"  {result.name:35} {result.compile_ms:7.2f} ms compile {result.cached_ms:6.2f} ms from cache")
+    compile_total = sum(result.compile_ms for result in compiled)
+    cached_total = sum(result.cached_ms for result in compiled)
+    click.echo(f"Compiled {len(compiled)} templates into {app.config['TEMPLATE_CACHE_DIR']}: "
+               f"{compile_total:.1f} ms from source, {cached_total:.1f} ms from the cache")
+    failed = [result for result in results if result.error is not None]
+    for result in failed:
+        click.echo(f"  failed {result.name}: {result.error}")
+    if failed:
+        raise click.ClickException(f"{len(failed)} templates failed to compile")
+
+@templates_cli.command("status")
+def templates_status_command():
+    """Show which templates have fresh bytecode in the cache."""
+    if app.jinja_env.bytecode_cache is None:
+        raise click.ClickException("The template bytecode cache is disabled (TEMPLATE_CACHE_DIR is empty)")
+    status = cache_status(app.jinja_env)
+    stale = sorted(name for name, fresh in status.items() if not fresh)
+    click.echo(f"{len(status) - len(stale)}/{len(status)} templates fresh in {app.config['TEMPLATE_CACHE_DIR']}")
+    for name in stale:
+        click.echo(f"  stale: {name}")
+
+app.cli.add_command(templates_cli)
+
 # Run the application
 if __name__ == "__main__":
     # Create database and update schema
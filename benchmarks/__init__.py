@@ -0,0 +1 @@
+# Standalone micro-benchmarks; run from the project root, e.g. `python -m benchmarks.bench_sampler`
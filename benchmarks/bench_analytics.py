@@ -0,0 +1,128 @@
+"""
+Analytics kernel benchmark
+--------------------------
+Times the original study_analytics loops (12 weekly list comprehensions,
+per-subject passes, day-of-week and streak passes) against the single-pass
+compute_analytics kernel over 100k synthetic task and Up Learn logs, against
+the kernel fed with the equivalent daily rollup rows, and (when NumPy is
+installed) against the columnar engine over plain log tuples.
+
+    python -m benchmarks.bench_analytics
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from utils.analytics import analyze_log_rows, compute_analytics, np, rollup_activity, task_activity, uplearn_activity
+
+SUBJECTS = ['Chemistry', 'Biology Y13', 'Biology Y12', 'Psychology']
+
+def make_logs(rows, rng, days=730):
+    """Synthetic logs spread over the last `days` days (90% tasks, 10% Up Learn)"""
+    now = datetime.now()
+    task_logs = []
+    uplearn_logs = []
+    for _ in range(rows):
+        when = now - timedelta(days=rng.randint(0, days), minutes=rng.randint(0, 1439))
+        if rng.random() < 0.9:
+            task_logs.append(SimpleNamespace(date_completed=when, subject=rng.choice(SUBJECTS),
+                                             duration=rng.randint(10, 90), difficulty=rng.randint(1, 5)))
+        else:
+            uplearn_logs.append(SimpleNamespace(date=when.date(), subject=rng.choice(SUBJECTS[:3]),
+                                                lessons_completed=rng.randint(1, 4),
+                                                time_spent=rng.randint(10, 60), comprehension=rng.randint(1, 5)))
+    return task_logs, uplearn_logs
+
+def make_rollups(task_logs, uplearn_logs):
+    """Daily rollup rows (day, subject, counters...) for the same logs"""
+    rollups = {}
+    for log in task_logs:
+        row = rollups.setdefault((log.date_completed.date(), log.subject), [0, 0, 0, 0, 0, 0, 0])
+        row[0] += 1
+        row[1] += log.duration
+        row[2] += log.difficulty
+    for log in uplearn_logs:
+        row = rollups.setdefault((log.date, log.subject), [0, 0, 0, 0, 0, 0, 0])
+        row[3] += 1
+        row[4] += log.lessons_completed
+        row[5] += log.time_spent
+        row[6] += log.comprehension
+    return [(day, subject, *counters) for (day, subject), counters in rollups.items()]
+
+def make_rows(task_logs, uplearn_logs):
+    """The plain tuples the columnar engine fetches from SQL"""
+    task_rows = [(log.date_completed.toordinal(), log.date_completed.hour, log.subject, log.duration, log.difficulty)
+                 for log in task_logs]
+    uplearn_rows = [(log.date.toordinal(), log.subject, log.lessons_completed, log.time_spent, log.comprehension)
+                    for log in uplearn_logs]
+    return task_rows, uplearn_rows
+
+def legacy_analytics(task_logs, uplearn_logs, today):
+    """The per-metric passes study_analytics used to run over the full log lists"""
+    week_stats = {}
+    for i in range(12):
+        week_start = today - timedelta(days=today.weekday()) - timedelta(weeks=i)
+        week_end = week_start + timedelta(days=6)
+        week_tasks = [log for log in task_logs if week_start <= log.date_completed.date() <= week_end]
+        subjects = {}
+        for log in week_tasks:
+            subjects[log.subject] = subjects.get(log.subject, 0) + 1
+        week_uplearn = [log for log in uplearn_logs if week_start <= log.date <= week_end]
+        week_stats[week_start] = (len(week_tasks), subjects, sum(log.duration for log in week_tasks),
+                                  sum(log.lessons_completed for log in week_uplearn))
+
+    averages = {}
+    for subject in SUBJECTS:
+        subject_logs = [log for log in task_logs if log.subject == subject]
+        if subject_logs:
+            averages[subject] = (sum(log.duration for log in subject_logs) / len(subject_logs),
+                                 sum(log.difficulty for log in subject_logs) / len(subject_logs))
+
+    time_distribution = {}
+    for log in task_logs:
+        day_name = log.date_completed.strftime('%A')
+        time_distribution[day_name] = time_distribution.get(day_name, 0) + log.duration
+    for log in uplearn_logs:
+        day_name = log.date.strftime('%A')
+        time_distribution[day_name] = time_distribution.get(day_name, 0) + log.time_spent
+
+    streak_dates = sorted(set(log.date_completed.date() for log in task_logs))
+    return week_stats, averages, time_distribution, streak_dates
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def main(rows=100000, repeat=5):
+    rng = random.Random(11)
+    today = datetime.now().date()
+    task_logs, uplearn_logs = make_logs(rows, rng)
+    rollups = make_rollups(task_logs, uplearn_logs)
+
+    legacy = best_of(repeat, lambda: legacy_analytics(task_logs, uplearn_logs, today))
+    kernel = best_of(repeat, lambda: compute_analytics(
+        [task_activity(log) for log in task_logs] + [uplearn_activity(log) for log in uplearn_logs], today))
+    rolled = best_of(repeat, lambda: compute_analytics([rollup_activity(row) for row in rollups], today))
+
+    print(f"{rows} logs ({len(task_logs)} tasks, {len(uplearn_logs)} Up Learn), {len(rollups)} rollup rows")
+    print(f"  {'legacy multi-pass loops':32} {legacy * 1000:8.1f} ms")
+    print(f"  {'single-pass kernel (logs)':32} {kernel * 1000:8.1f} ms  ({legacy / kernel:.1f}x)")
+    print(f"  {'single-pass kernel (rollups)':32} {rolled * 1000:8.1f} ms  ({legacy / rolled:.1f}x)")
+
+    task_rows, uplearn_rows = make_rows(task_logs, uplearn_logs)
+    python_rows = best_of(repeat, lambda: analyze_log_rows(task_rows, uplearn_rows, today, engine='python'))
+    print(f"  {'kernel over plain tuples':32} {python_rows * 1000:8.1f} ms  ({legacy / python_rows:.1f}x)")
+    if np is None:
+        print("  NumPy not installed: columnar engine skipped")
+        return
+    columnar = best_of(repeat, lambda: analyze_log_rows(task_rows, uplearn_rows, today, engine='numpy'))
+    print(f"  {'columnar NumPy engine':32} {columnar * 1000:8.1f} ms  ({legacy / columnar:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Topic sampler micro-benchmark
+-----------------------------
+Compares the original per-request weighted selection in generate_daily_tasks
+(rebuild `6 - proficiency` weight dicts, random.choices, then scan the module
+for the chosen title) with the alias-table TopicSampler.
+
+    python -m benchmarks.bench_sampler
+"""
+
+import random
+import timeit
+
+from utils.curriculum import get_curriculum, get_curriculum_index
+from utils.sampler import TopicSampler
+
+def make_proficiencies(rng):
+    """Rate every topic in the curriculum with a random 1-5 proficiency"""
+    index = get_curriculum_index()
+    proficiencies = {}
+    for entry in index.topics:
+        proficiencies.setdefault(entry.subject, {})[entry.title] = rng.randint(1, 5)
+    return proficiencies
+
+def legacy_draw(curriculum_data, user_proficiencies):
+    """One draw per Biology module plus one Chemistry module, the way generate_daily_tasks used to"""
+    weighted_topics = {}
+    for subject in ("Biology", "Chemistry"):
+        weighted_topics[subject] = {}
+        for topic, proficiency in user_proficiencies.get(subject, {}).items():
+            weighted_topics[subject][topic] = 6 - proficiency
+
+    modules = [module for year in curriculum_data["Biology"]["Years"] for module in year["Modules"]]
+    modules.append(random.choice(curriculum_data["Chemistry"]["Modules"]))
+    picked = []
+    for module in modules:
+        subject = "Chemistry" if module in curriculum_data["Chemistry"]["Modules"] else "Biology"
+        module_topics = {}
+        for topic in module["Topics"]:
+            if topic["Title"] in weighted_topics[subject]:
+                module_topics[topic["Title"]] = weighted_topics[subject][topic["Title"]]
+        selected_title = random.choices(list(module_topics.keys()), weights=list(module_topics.values()), k=1)[0]
+        picked.append(next(t for t in module["Topics"] if t["Title"] == selected_title))
+    return picked
+
+def alias_draw(sampler, index):
+    """The same draws through the precomputed alias tables"""
+    picked = [sampler.draw_topic(group) for group in index.modules["Biology"]]
+    picked.append(sampler.draw_topic(sampler.draw_module("Chemistry")))
+    return picked
+
+def main(number=20000):
+    rng = random.Random(42)
+    curriculum_data = get_curriculum()
+    index = get_curriculum_index()
+    proficiencies = make_proficiencies(rng)
+    sampler = TopicSampler(proficiencies, index=index)
+
+    legacy = timeit.timeit(lambda: legacy_draw(curriculum_data, proficiencies), number=number)
+    alias = timeit.timeit(lambda: alias_draw(sampler, index), number=number)
+    build = timeit.timeit(lambda: TopicSampler(proficiencies, index=index), number=number // 100)
+    update = timeit.timeit(lambda: sampler.update("Biology", "Enzymes", proficiency=rng.randint(1, 5)),
+                           number=number)
+
+    print(f"Legacy weighted selection: {legacy / number * 1e6:8.2f} us per plan")
+    print(f"Alias-table draws:         {alias / number * 1e6:8.2f} us per plan ({legacy / alias:.1f}x faster)")
+    print(f"Full sampler build:        {build / (number // 100) * 1e6:8.2f} us")
+    print(f"Single rating update:      {update / number * 1e6:8.2f} us")
+
+if __name__ == "__main__":
+    main()
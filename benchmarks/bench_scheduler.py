@@ -0,0 +1,65 @@
+"""
+Study schedule benchmark
+------------------------
+Times a full 15-week StudySchedule build per user, and the incremental
+re-plan (record_completion) after logging a task that was not planned for
+today, which is what a cached schedule does when a new task log arrives.
+
+    python -m benchmarks.bench_scheduler
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+from utils.curriculum import get_curriculum_index
+from utils.scheduler import StudySchedule, topic_label
+
+def upcoming_exams(start_date):
+    """Exam calendar shaped like SUBJECT_END_DATES, placed after the 15-week horizon starts"""
+    exams = {}
+    for offset, subject in enumerate(("Psychology", "Chemistry", "Biology")):
+        exams[subject] = [
+            {'paper': f'Paper {paper}', 'date': (start_date + timedelta(weeks=10 + paper, days=offset)).isoformat(),
+             'topics': ''}
+            for paper in (1, 2, 3)
+        ]
+    return exams
+
+def main(users=200):
+    rng = random.Random(7)
+    index = get_curriculum_index()
+    today = datetime.now().date()
+    exams = upcoming_exams(today)
+    subjects = ["Biology", "Chemistry", "Psychology"]
+
+    build_times = []
+    replan_times = []
+    for _ in range(users):
+        proficiencies = {}
+        for entry in index.topics:
+            if rng.random() < 0.7:
+                proficiencies.setdefault(entry.subject, {})[entry.title] = rng.randint(1, 5)
+
+        hours = rng.choice([2.0, 3.0, 4.0, 5.0])
+        started = time.perf_counter()
+        schedule = StudySchedule(today, subjects, proficiencies, hours, exams, index=index)
+        build_times.append(time.perf_counter() - started)
+
+        # Log a topic that is not on today's list to force a re-plan of the later days
+        unscheduled = [entry for entry in index.topics
+                       if entry.subject in subjects and topic_label(entry) not in schedule.tasks_for(today)]
+        entry = rng.choice(unscheduled)
+        started = time.perf_counter()
+        schedule.record_completion((entry.subject, entry.title), today, 90)
+        replan_times.append(time.perf_counter() - started)
+
+    build_times.sort()
+    replan_times.sort()
+    print(f"Full 15-week plan ({len(schedule.labels)} topics, {users} users):")
+    print(f"  median {build_times[users // 2] * 1000:.2f} ms, p95 {build_times[int(users * 0.95)] * 1000:.2f} ms")
+    print("Re-plan after logging an unplanned task:")
+    print(f"  median {replan_times[users // 2] * 1000:.2f} ms, p95 {replan_times[int(users * 0.95)] * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+SQLite connection profile benchmark
+-----------------------------------
+Runs the gunicorn.conf.py shape (2 worker processes x 4 threads) against a
+scratch copy of the schema for a few seconds per configuration. Reads fetch a
+history page and the user's rollups; writes insert a TaskLog row and upsert
+its rollup in one transaction after reading the user's latest log, the way
+the ORM request handlers read before they write. Compares the old setup (new connection per
+request, stock SQLite settings) with the 'default' and 'performance'
+profiles on a pooled engine, and counts "database is locked" and other
+SQLite errors.
+
+    python -m benchmarks.bench_sqlite
+"""
+
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+
+from utils.database import apply_sqlite_profile, engine_options
+from utils.migrations import migrate
+
+USERS = 200
+SEED_LOGS = 50000
+WRITE_RATIO = 0.2
+
+CONFIGS = [
+    ('NullPool, stock settings', 'default', False),
+    ('pooled, default profile', 'default', True),
+    ('pooled, performance profile', 'performance', True),
+]
+
+READ_PAGE = text(
+    "SELECT id, task, subject, date_completed, duration, difficulty FROM task_log "
+    "WHERE user_id = :user_id ORDER BY date_completed DESC, id DESC LIMIT 25")
+READ_ROLLUPS = text("SELECT day, subject, task_count, task_minutes FROM daily_rollup WHERE user_id = :user_id")
+WRITE_LOG = text(
+    "INSERT INTO task_log (user_id, task, subject, date_completed, duration, difficulty) "
+    "VALUES (:user_id, 'Benchmark task', 'Chemistry', :now, 30, 3)")
+WRITE_ROLLUP = text(
+    "INSERT INTO daily_rollup (user_id, day, subject, task_count, task_minutes, difficulty_sum, uplearn_sessions, "
+    "uplearn_lessons, uplearn_minutes, comprehension_sum) VALUES (:user_id, :day, 'Chemistry', 1, 30, 3, 0, 0, 0, 0) "
+    "ON CONFLICT (user_id, day, subject) DO UPDATE SET task_count = task_count + 1, "
+    "task_minutes = task_minutes + 30, difficulty_sum = difficulty_sum + 3")
+
+def make_engine(path, profile, pooled, threads):
+    url = f"sqlite:///{path}"
+    if pooled:
+        engine = create_engine(url, **engine_options(url, threads))
+    else:
+        engine = create_engine(url, poolclass=NullPool)
+    apply_sqlite_profile(engine, profile)
+    return engine
+
+def seed(path, profile):
+    engine = make_engine(path, profile, True, 1)
+    migrate(engine)
+    rng = random.Random(7)
+    start = datetime.now() - timedelta(days=365)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO user (id, username, password) VALUES (:id, :name, 'x')"),
+                           [{'id': i, 'name': f"user{i}"} for i in range(1, USERS + 1)])
+        connection.execute(WRITE_LOG, [
+            {'user_id': rng.randint(1, USERS), 'now': (start + timedelta(minutes=rng.randint(0, 525600))).isoformat(' ')}
+            for _ in range(SEED_LOGS)
+        ])
+    engine.dispose()
+
+def run_worker(path, profile, pooled, threads, seconds, results):
+    engine = make_engine(path, profile, pooled, threads)
+    counts = {'reads': 0, 'writes': 0, 'locked': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop(seed_value):
+        rng = random.Random(seed_value)
+        reads = writes = locked = errors = 0
+        while time.perf_counter() < deadline:
+            user_id = rng.randint(1, USERS)
+            try:
+                if rng.random() < WRITE_RATIO:
+                    now = datetime.now()
+                    with engine.begin() as connection:
+                        connection.execute(READ_PAGE, {'user_id': user_id}).first()
+                        connection.execute(WRITE_LOG, {'user_id': user_id, 'now': now.isoformat(' ')})
+                        connection.execute(WRITE_ROLLUP, {'user_id': user_id, 'day': now.date().isoformat()})
+                    writes += 1
+                else:
+                    with engine.connect() as connection:
+                        connection.execute(READ_PAGE, {'user_id': user_id}).all()
+                        connection.execute(READ_ROLLUPS, {'user_id': user_id}).all()
+                    reads += 1
+            except OperationalError as e:
+                if 'locked' in str(e):
+                    locked += 1
+                else:
+                    errors += 1
+        with lock:
+            counts['reads'] += reads
+            counts['writes'] += writes
+            counts['locked'] += locked
+            counts['errors'] += errors
+
+    workers = [threading.Thread(target=loop, args=(os.getpid() * 100 + i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    engine.dispose()
+    results.put(counts)
+
+def run_config(profile, pooled, processes, threads, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        seed(path, profile)
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=run_worker, args=(path, profile, pooled, threads, seconds, results))
+                   for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        totals = {'reads': 0, 'writes': 0, 'locked': 0, 'errors': 0}
+        for _ in workers:
+            for key, value in results.get().items():
+                totals[key] += value
+        for worker in workers:
+            worker.join()
+        return totals
+
+def main(processes=2, threads=4, seconds=5):
+    print(f"{processes} processes x {threads} threads, {seconds}s per configuration, "
+          f"{int(WRITE_RATIO * 100)}% writes, {SEED_LOGS} seeded logs")
+    for label, profile, pooled in CONFIGS:
+        totals = run_config(profile, pooled, processes, threads, seconds)
+        print(f"  {label:30} {totals['reads'] / seconds:8.0f} reads/s {totals['writes'] / seconds:7.0f} writes/s"
+              f" {totals['locked']:5} locked {totals['errors']:5} other errors")
+
+if __name__ == "__main__":
+    main()
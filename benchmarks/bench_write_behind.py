@@ -0,0 +1,110 @@
+"""
+Write-behind log ingestion benchmark
+------------------------------------
+Runs the AJAX quick-complete (/complete_task) from several threads against a
+scratch database for a few seconds in each LOG_WRITE_MODE. Sustained
+completions/sec counts the time until every queued log is committed, not
+only until the requests return. Also reports the request latency, the
+write-behind queue depth and flush latency, and checks that every completion
+reached task_log.
+
+    python -m benchmarks.bench_write_behind
+"""
+
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="bench-write-behind-")
+if 'app' in sys.modules:
+    raise SystemExit("Run this benchmark in a fresh interpreter (the app is already imported)")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'bench.db')}"
+
+from app import app, db, init_db, log_writer, TaskLog
+
+THREADS = 8
+TASKS = [
+    ('Review notes on Enzymes', 'Biology'),
+    ('Complete practice questions on Amount of substance', 'Chemistry'),
+    ('Create flashcards for Cell structure', 'Biology'),
+]
+
+def make_client(username):
+    client = app.test_client()
+    client.post('/register', data={'username': username, 'password': 'secret'})
+    client.post('/login', data={'username': username, 'password': 'secret'})
+    return client
+
+def run_mode(mode, clients, seconds):
+    app.config["LOG_WRITE_MODE"] = mode
+    latencies = [[] for _ in clients]
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop(index, client):
+        i = 0
+        while time.perf_counter() < deadline:
+            task, subject = TASKS[i % len(TASKS)]
+            start = time.perf_counter()
+            response = client.post('/complete_task', data={'task': task, 'subject': subject},
+                                   headers={'X-Requested-With': 'XMLHttpRequest'})
+            latencies[index].append(time.perf_counter() - start)
+            if response.status_code != 200:
+                with lock:
+                    errors[0] += 1
+            i += 1
+
+    with app.app_context():
+        before = db.session.query(TaskLog).count()
+    start = time.perf_counter()
+    workers = [threading.Thread(target=loop, args=(i, client)) for i, client in enumerate(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    returned = time.perf_counter() - start
+    log_writer.drain()
+    committed = time.perf_counter() - start
+    with app.app_context():
+        stored = db.session.query(TaskLog).count() - before
+        db.session.remove()
+
+    samples = sorted(value for values in latencies for value in values)
+    return {
+        'completions': len(samples),
+        'stored': stored,
+        'errors': errors[0],
+        'sustained': len(samples) / committed,
+        'p50_ms': statistics.median(samples) * 1000,
+        'p95_ms': samples[int(len(samples) * 0.95)] * 1000,
+        'drain_ms': (committed - returned) * 1000
+    }
+
+def main(seconds=5):
+    try:
+        init_db()
+        clients = [make_client(f"bench{i}") for i in range(THREADS)]
+        print(f"{THREADS} threads, {seconds}s per mode, flush interval {log_writer.flush_interval}s, "
+              f"max batch {log_writer.max_batch}")
+        for mode in ('sync', 'write_behind'):
+            result = run_mode(mode, clients, seconds)
+            print(f"  {mode:13} {result['sustained']:7.0f} completions/s  p50 {result['p50_ms']:6.1f} ms"
+                  f"  p95 {result['p95_ms']:6.1f} ms  drain {result['drain_ms']:6.1f} ms"
+                  f"  {result['stored']}/{result['completions']} stored  {result['errors']} errors")
+        stats = log_writer.stats()
+        print(f"  write-behind: {stats['batches']} batches, avg {stats['avg_batch']} logs/batch, "
+              f"max depth {stats['max_depth']}, flush avg {stats['avg_flush_ms']} ms / max {stats['max_flush_ms']} ms, "
+              f"{stats['rejected']} sync fallbacks, {stats['failed']} dropped")
+    finally:
+        log_writer.stop()
+        with app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
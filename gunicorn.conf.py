@@ -1,4 +1,5 @@
 # Gunicorn configuration file
+import gc
 
 # Server socket binding
 bind = "0.0.0.0:10000"
@@ -23,10 +24,35 @@ proc_name = "RevisionTimetable"
 # Application module
 wsgi_app = "app:app"
 
+# Load the app once in the master and fork workers from it (see the boot hooks below)
+preload_app = True
+
 # Max requests settings
 max_requests = 1000
 max_requests_jitter = 50
 
 # Security settings
 limit_request_line = 4096
-limit_request_fields = 100
\ No newline at end of file
+limit_request_fields = 100
+
+# Flush queued write-behind logs (LOG_WRITE_MODE=write_behind) before a worker exits
+def worker_exit(server, worker):
+    from app import log_writer
+    log_writer.stop()
+
+# Boot: migrate and build read-only state in the master so every worker,
+# including ones recycled by max_requests, starts warm
+def on_starting(server):
+    from app import warm_up
+    warm_up()
+
+# Freeze what the master built so the garbage collector never touches
+# (and un-shares) those pages in the workers
+def pre_fork(server, worker):
+    gc.freeze()
+
+# Forget any pooled connections inherited from the master without closing them under it
+def post_fork(server, worker):
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -342,12 +342,18 @@ function initTaskCompletionForms() {
             const taskName = formData.get('task');
             const subject = formData.get('subject');
             
+            // One key per task submission, reused if it is retried, so the server logs it once
+            if (!this.dataset.idempotencyKey) {
+                this.dataset.idempotencyKey = newIdempotencyKey();
+            }
+            
             // Send AJAX request to complete_task endpoint
             fetch(this.action, {
                 method: 'POST',
                 body: formData,
                 headers: {
-                    'X-Requested-With': 'XMLHttpRequest'
+                    'X-Requested-With': 'XMLHttpRequest',
+                    'Idempotency-Key': this.dataset.idempotencyKey
                 }
             })
             .then(response => response.json())
@@ -381,6 +387,16 @@ function initTaskCompletionForms() {
     });
 }
 
+/**
+ * Random key identifying one submission (crypto.randomUUID needs a secure context)
+ */
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+}
+
 // Toast notification function
 function showToast(message, type = 'info') {
     const toastContainer = document.getElementById('toast-container') || createToastContainer();
@@ -0,0 +1,107 @@
+// Infinite scroll for the history page: the first page is rendered by the
+// server, later pages are fetched from /api/history/* with the keyset cursor.
+
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML;
+}
+
+function formatDate(value) {
+    if (!value) return '';
+    return new Date(value).toLocaleDateString('en-GB', { day: '2-digit', month: 'short', year: 'numeric' });
+}
+
+const historyRenderers = {
+    taskHistory(log) {
+        return `
+            <div class="list-group-item">
+                <div class="d-flex w-100 justify-content-between">
+                    <h6 class="mb-1">${escapeHtml(log.task)}</h6>
+                    <small>${formatDate(log.date_completed)}</small>
+                </div>
+                <div class="d-flex justify-content-between">
+                    <small class="text-primary">${escapeHtml(log.subject)}</small>
+                    <small>${log.duration || 0} min &middot; difficulty ${log.difficulty || '-'}/5</small>
+                </div>
+            </div>`;
+    },
+    uplearnHistory(log) {
+        return `
+            <div class="list-group-item">
+                <div class="d-flex w-100 justify-content-between">
+                    <h6 class="mb-1">${escapeHtml(log.subject)}</h6>
+                    <small>${formatDate(log.date)}</small>
+                </div>
+                <small>${log.lessons_completed || 0} lessons &middot; ${log.time_spent || 0} min &middot; comprehension ${log.comprehension || '-'}/5</small>
+            </div>`;
+    }
+};
+
+// Backoff after a failed page: 2s, 4s, 8s ... capped at 30s, then only the retry button
+const RETRY_BASE_MS = 2000;
+const RETRY_MAX_MS = 30000;
+const MAX_AUTO_RETRIES = 5;
+
+function showRetry(list, sentinel, observer, failures) {
+    sentinel.innerHTML = 'Could not load more entries. <button type="button" class="btn btn-link btn-sm p-0 align-baseline">Retry</button>';
+    sentinel.querySelector('button').addEventListener('click', function() {
+        clearTimeout(list.retryTimer);
+        loadNextPage(list, sentinel, observer);
+    });
+    if (failures <= MAX_AUTO_RETRIES) {
+        const delay = Math.min(RETRY_MAX_MS, RETRY_BASE_MS * 2 ** (failures - 1));
+        list.retryTimer = setTimeout(() => loadNextPage(list, sentinel, observer), delay);
+    }
+}
+
+async function loadNextPage(list, sentinel, observer) {
+    const cursor = list.dataset.cursor;
+    if (!cursor || list.dataset.loading) return;
+    list.dataset.loading = 'true';
+    sentinel.textContent = 'Loading...';
+    let loaded = false;
+    try {
+        const response = await fetch(`${list.dataset.url}?cursor=${encodeURIComponent(cursor)}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const page = await response.json();
+        list.insertAdjacentHTML('beforeend', page.items.map(historyRenderers[list.id]).join(''));
+        list.dataset.cursor = page.next_cursor || '';
+        sentinel.textContent = '';
+        loaded = true;
+    } catch (error) {
+        console.error('Error loading history:', error);
+    } finally {
+        delete list.dataset.loading;
+    }
+    if (!loaded) {
+        // Stop scroll-triggered loads until a retry succeeds, so a failing endpoint is not hammered
+        observer.unobserve(sentinel);
+        list.failures = (list.failures || 0) + 1;
+        showRetry(list, sentinel, observer, list.failures);
+        return;
+    }
+    if (list.failures) {
+        list.failures = 0;
+        observer.observe(sentinel);
+    }
+    if (!list.dataset.cursor) {
+        observer.unobserve(sentinel);
+    } else if (sentinel.getBoundingClientRect().top < window.innerHeight + 200) {
+        // Still in view after a short page: the observer will not fire again by itself
+        loadNextPage(list, sentinel, observer);
+    }
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.history-sentinel').forEach(function(sentinel) {
+        const list = document.getElementById(sentinel.dataset.target);
+        if (!list.dataset.cursor) return;
+        const observer = new IntersectionObserver(function(entries) {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNextPage(list, sentinel, observer);
+            }
+        }, { rootMargin: '200px' });
+        observer.observe(sentinel);
+    });
+});
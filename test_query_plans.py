@@ -0,0 +1,127 @@
+"""
+Query plan regression tests
+---------------------------
+Drives the hot pages and API endpoints against a scratch database, captures
+every SELECT/UPDATE/DELETE they send to SQLite and runs EXPLAIN QUERY PLAN on
+each one. A plan that scans a whole table or sorts through a temp B-tree
+means an index no longer matches the query, so the test fails with the
+offending SQL and plan.
+
+    python -m pytest test_query_plans.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="query-plans-")
+SCRATCH_URL = f"sqlite:///{os.path.join(SCRATCH_DIR, 'plans.db')}"
+if 'app' not in sys.modules:
+    os.environ["DATABASE_URL"] = SCRATCH_URL
+
+from sqlalchemy import event
+
+from app import app, db, init_db
+
+# (method, url, request kwargs) for the pages and endpoints hit on every visit or write
+HOT_REQUESTS = [
+    ('get', '/dashboard', {}),
+    ('get', '/study_planner', {}),
+    ('get', '/study_analytics', {}),
+    ('get', '/curriculum', {}),
+    ('get', '/welcome', {}),
+    ('get', '/history', {}),
+    ('get', '/api/history/uplearn', {}),
+    ('get', '/api/ratings/get', {}),
+    ('get', '/api/ratings/get', {'query_string': {'since': '1'}}),
+    ('post', '/api/ratings/save_batch', {'json': {'ratings': [{'topic_id': 'enzymes', 'rating': 3}]}}),
+    ('post', '/progress_log', {'data': {'log_task': '1', 'task': 'Review notes on Enzymes', 'subject': 'Biology',
+                                        'duration': '30', 'difficulty': '3'}}),
+    ('post', '/progress_log', {'data': {'log_uplearn': '1', 'subject': 'Chemistry', 'lessons_completed': '2',
+                                        'time_spent': '30', 'comprehension': '4'}}),
+    ('post', '/complete_task', {'data': {'task': 'Complete practice questions on Enzymes', 'subject': 'Biology',
+                                         'duration': '40', 'difficulty': '4'}}),
+]
+
+def plan_problems(plan):
+    """Plan lines that mean a full table scan or an extra sort step"""
+    return [line for line in plan if line.startswith('SCAN') or 'TEMP B-TREE' in line]
+
+class QueryPlanTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if app.config["SQLALCHEMY_DATABASE_URI"] != SCRATCH_URL:
+            raise unittest.SkipTest("app was imported before the scratch DATABASE_URL could be set")
+        init_db()
+        cls.client = app.test_client()
+        cls.client.post('/register', data={'username': 'planner', 'password': 'secret'})
+        cls.client.post('/login', data={'username': 'planner', 'password': 'secret'})
+        cls.client.post('/welcome', data={'step1': '1', 'chemistry': 'on', 'biology': 'on', 'daily_study_hours': '3'})
+        cls.client.post('/welcome', data={'step2': '1'})
+        for i in range(3):
+            cls.client.post('/complete_task', data={'task': f'Seed task {i}', 'subject': 'Chemistry'})
+
+        cls.statements = []
+        cls.statuses = []
+        with app.app_context():
+            engine = db.engine
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                cls.statements.append((statement, parameters))
+
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            for method, url, kwargs in HOT_REQUESTS:
+                response = getattr(cls.client, method)(url, **kwargs)
+                cls.statuses.append((method, url, response.status_code))
+            # Later history pages seek from a keyset cursor
+            page = cls.client.get('/api/history/tasks', query_string={'limit': 1}).get_json()
+            response = cls.client.get('/api/history/tasks', query_string={'limit': 1, 'cursor': page['next_cursor']})
+            cls.statuses.append(('get', '/api/history/tasks?cursor=', response.status_code))
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+
+    @classmethod
+    def tearDownClass(cls):
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+    def explain(self, statement, parameters):
+        with app.app_context():
+            with db.engine.connect() as connection:
+                return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+    def test_hot_requests_succeed(self):
+        failed = [entry for entry in self.statuses if entry[2] >= 400]
+        self.assertEqual(failed, [])
+
+    def test_statements_were_captured(self):
+        self.assertGreater(len(self.statements), len(HOT_REQUESTS))
+
+    def test_no_full_scans_or_temp_sorts(self):
+        failures = []
+        seen = set()
+        for statement, parameters in self.statements:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            plan = self.explain(statement, parameters)
+            if plan_problems(plan):
+                failures.append(f"{' '.join(statement.split())}\n    plan: {' | '.join(plan)}")
+        self.assertEqual(failures, [], "Queries regressed to a full scan or temp B-tree sort:\n" + "\n".join(failures))
+
+    def test_history_cursor_is_an_index_range(self):
+        plans = [self.explain(statement, parameters) for statement, parameters in self.statements
+                 if 'FROM task_log' in statement and 'date_completed, task_log.id) <' in statement]
+        self.assertTrue(plans, "keyset page query was not captured")
+        for plan in plans:
+            self.assertIn('ix_task_log_user_completed', ' '.join(plan))
+            self.assertIn('date_completed<?', ' '.join(plan))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+"""
+Analytics engine equivalence tests
+----------------------------------
+Seeds one user's task and Up Learn logs (NULL durations, difficulties and
+Up Learn counters, several subjects, logs on either side of midnight and of
+the week, 7-day, 14-day, 8-week and 12-week window boundaries) through the
+app's write path, then checks that every way of computing StudyAnalytics
+agrees: the per-log loop over ORM objects, the kernel over plain SQL tuples,
+the rollups maintained at write time, the rollups rebuilt with GROUP BY and
+the NumPy columnar engine (skipped when NumPy is not installed). A second
+user's fractional and text durations check that the maintained rollups add
+up exactly like the rebuilt ones.
+
+    python -m pytest test_study_analytics.py
+"""
+
+import dataclasses
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="study-analytics-")
+SCRATCH_URL = f"sqlite:///{os.path.join(SCRATCH_DIR, 'analytics.db')}"
+if 'app' not in sys.modules:
+    # Importing app connects to its database, so never let it open the real one
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'app.db')}"
+
+from flask import Flask
+from sqlalchemy import Integer, cast, func
+
+from app import DailyRollup, TaskLog, UplearnLog, User, db, load_rollup_activities, rebuild_daily_rollups
+from utils.analytics import analyze_log_rows, compute_analytics, np, task_activity, uplearn_activity
+from utils.database import engine_options
+from utils.log_store import store_logs
+from utils.migrations import migrate
+
+# A Wednesday, so the current week has days on both sides of it
+TODAY = date(2026, 3, 18)
+THIS_MONDAY = TODAY - timedelta(days=TODAY.weekday())
+
+def at(day, hour=12, minute=0, second=0):
+    return datetime.combine(day, time(hour, minute, second))
+
+# (completed at, subject, duration, difficulty)
+TASKS = [
+    (at(TODAY, 23, 59, 59), 'Chemistry', 30, 4),
+    (at(TODAY, 0, 0, 0), 'Chemistry', None, 3),
+    (at(TODAY, 9), 'Chemistry', None, None),
+    (at(TODAY - timedelta(days=1), 23, 59, 59), 'Biology Y12', 45, None),
+    (at(TODAY - timedelta(days=7), 0, 0, 0), 'Psychology', 20, 2),
+    (at(TODAY - timedelta(days=8), 23, 59, 59), 'Psychology', 25, 5),
+    (at(THIS_MONDAY - timedelta(days=1), 23, 59, 59), 'Biology Y13', 60, 3),
+    (at(THIS_MONDAY, 0, 0, 0), 'Biology Y13', 15, 1),
+    (at(THIS_MONDAY - timedelta(weeks=11), 6), 'Chemistry', 50, 2),
+    (at(THIS_MONDAY - timedelta(weeks=11, days=1), 18), 'Chemistry', 35, 4),
+    (at(TODAY - timedelta(days=2), 14), 'Maths', 40, None),
+    (at(TODAY - timedelta(days=400), 20), 'Psychology', 90, 5),
+]
+
+# (date, subject, lessons, minutes, comprehension)
+UPLEARN = [
+    (TODAY, 'Chemistry', 2, 30, 4),
+    (TODAY, 'Chemistry', 1, None, 5),
+    (TODAY - timedelta(days=1), 'Biology Y12', None, None, None),
+    (TODAY - timedelta(days=13), 'Biology Y13', 1, 10, None),
+    (TODAY - timedelta(days=14), 'Biology Y13', 3, 40, 2),
+    (THIS_MONDAY - timedelta(weeks=7), 'Chemistry', 4, 60, 3),
+    (THIS_MONDAY - timedelta(weeks=7, days=1), 'Chemistry', 2, 25, 4),
+    (THIS_MONDAY - timedelta(weeks=20), 'Biology Y12', 1, 15, 1),
+]
+
+# Fractional minutes, as floats and as submitted form text: (day, duration, time spent)
+FRACTIONAL = [
+    (TODAY, 12.5, '7.25'),
+    (TODAY, '0.5', 2.5),
+    (TODAY, '30', ''),
+    (TODAY - timedelta(days=1), None, '10.0'),
+    (TODAY - timedelta(days=1), 'n/a', 0.75),
+]
+
+def day_ordinal(column):
+    """SQL expression for a date/datetime column as a Python date ordinal (as in RevisionTimetable.py)"""
+    return cast(func.julianday(func.date(column)) - 1721424.5, Integer)
+
+class StudyAnalyticsEngineTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # A separate Flask app keeps this database apart from whichever one app.py was imported with
+        cls.app = Flask(__name__)
+        cls.app.config["SQLALCHEMY_DATABASE_URI"] = SCRATCH_URL
+        cls.app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(SCRATCH_URL, 1)
+        db.init_app(cls.app)
+        with cls.app.app_context():
+            migrate(db.engine)
+            user = User(username='analytics', password='secret')
+            db.session.add(user)
+            db.session.flush()
+            cls.user_id = user.id
+            store_logs(db.session,
+                       [('task', {'user_id': cls.user_id, 'date_completed': completed, 'subject': subject,
+                                  'task': f'Seed task on {subject}', 'duration': duration,
+                                  'difficulty': difficulty})
+                        for completed, subject, duration, difficulty in TASKS] +
+                       [('uplearn', {'user_id': cls.user_id, 'date': day, 'subject': subject,
+                                     'lessons_completed': lessons, 'time_spent': minutes,
+                                     'comprehension': comprehension})
+                        for day, subject, lessons, minutes, comprehension in UPLEARN])
+            db.session.commit()
+
+            task_logs = TaskLog.query.filter_by(user_id=cls.user_id).all()
+            uplearn_logs = UplearnLog.query.filter_by(user_id=cls.user_id).all()
+            cls.expected = compute_analytics(
+                [task_activity(log) for log in task_logs] + [uplearn_activity(log) for log in uplearn_logs], TODAY)
+            cls.stored = [(log.duration, log.difficulty) for log in task_logs], len(uplearn_logs)
+            cls.task_rows = db.session.query(
+                day_ordinal(TaskLog.date_completed),
+                cast(func.strftime('%H', TaskLog.date_completed), Integer),
+                TaskLog.subject,
+                TaskLog.duration,
+                TaskLog.difficulty
+            ).filter(TaskLog.user_id == cls.user_id).all()
+            cls.uplearn_rows = db.session.query(
+                day_ordinal(UplearnLog.date),
+                UplearnLog.subject,
+                UplearnLog.lessons_completed,
+                UplearnLog.time_spent,
+                UplearnLog.comprehension
+            ).filter(UplearnLog.user_id == cls.user_id).all()
+            cls.maintained_rollups = list(load_rollup_activities(cls.user_id))
+            rebuild_daily_rollups(cls.user_id)
+            db.session.commit()
+            cls.rebuilt_rollups = list(load_rollup_activities(cls.user_id))
+            cls.rollup_count = DailyRollup.query.filter_by(user_id=cls.user_id).count()
+
+            fractional = User(username='fractional', password='secret')
+            db.session.add(fractional)
+            db.session.flush()
+            store_logs(db.session, [entry for day, duration, minutes in FRACTIONAL for entry in (
+                ('task', {'user_id': fractional.id, 'date_completed': at(day), 'subject': 'Chemistry',
+                          'task': 'Seed task on Chemistry', 'duration': duration, 'difficulty': 3}),
+                ('uplearn', {'user_id': fractional.id, 'date': day, 'subject': 'Chemistry',
+                             'lessons_completed': 1, 'time_spent': minutes, 'comprehension': 4}))])
+            db.session.commit()
+            cls.fractional_maintained = list(load_rollup_activities(fractional.id))
+            rebuild_daily_rollups(fractional.id)
+            db.session.commit()
+            cls.fractional_rebuilt = list(load_rollup_activities(fractional.id))
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+    def assert_rollups_match(self, activities):
+        # Rollups are per day, so they carry no hour of day and cannot fill time_of_day
+        result = compute_analytics(activities, TODAY)
+        self.assertEqual(set(result.time_of_day.values()), {0})
+        self.assertEqual(dataclasses.replace(result, time_of_day=self.expected.time_of_day), self.expected)
+
+    def test_seed_covers_the_edge_cases(self):
+        task_values, uplearn_count = self.stored
+        self.assertEqual(len(task_values), len(TASKS))
+        self.assertEqual(uplearn_count, len(UPLEARN))
+        self.assertIn(None, [duration for duration, _ in task_values])
+        self.assertIn(None, [difficulty for _, difficulty in task_values])
+        # Several logs share a (day, subject) rollup row
+        self.assertLess(self.rollup_count, len(TASKS) + len(UPLEARN))
+        self.assertGreater(self.expected.summary['total_tasks'], 0)
+        self.assertGreater(self.expected.uplearn_totals['total_lessons'], 0)
+
+    def test_kernel_over_sql_tuples(self):
+        self.assertEqual(analyze_log_rows(self.task_rows, self.uplearn_rows, TODAY, engine='python'), self.expected)
+
+    def test_rollups_maintained_at_write_time(self):
+        self.assert_rollups_match(self.maintained_rollups)
+
+    def test_rollups_rebuilt_with_group_by(self):
+        self.assertEqual(sorted(self.rebuilt_rollups), sorted(self.maintained_rollups))
+        self.assert_rollups_match(self.rebuilt_rollups)
+
+    def test_fractional_rollups_match_rebuilt(self):
+        self.assertEqual(sorted(self.fractional_rebuilt), sorted(self.fractional_maintained))
+        today = next(activity for activity in self.fractional_maintained if activity.day == TODAY)
+        self.assertEqual((today.task_minutes, today.uplearn_minutes), (43, 9.75))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_numpy_engine(self):
+        self.assertEqual(analyze_log_rows(self.task_rows, self.uplearn_rows, TODAY, engine='numpy'), self.expected)
+
+if __name__ == "__main__":
+    unittest.main()
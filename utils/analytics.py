@@ -0,0 +1,459 @@
+from collections import namedtuple
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it only the pure-Python engine is used
+    np = None
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Subjects shown in the per-subject averages on study_analytics
+ANALYTICS_SUBJECTS = ['Chemistry', 'Biology Y13', 'Biology Y12', 'Psychology']
+
+# Subjects tracked in the progress_log Up Learn charts
+UPLEARN_SUBJECTS = ['Chemistry', 'Biology Y12', 'Biology Y13']
+
+WEEK_STATS_WEEKS = 12
+UPLEARN_DAYS = 14
+UPLEARN_WEEKS = 8
+
+# Raw log histories at least this long use the NumPy engine when it is installed
+COLUMNAR_MIN_ROWS = 5000
+
+# One item of the activity stream. A raw TaskLog or UplearnLog is one activity
+# (count 1); a DailyRollup row is the pre-summed activity for a day and subject.
+# `hour` is None when the time of day is unknown (rollups, Up Learn logs).
+Activity = namedtuple('Activity', [
+    'day', 'hour', 'subject',
+    'task_count', 'task_minutes', 'difficulty_sum',
+    'uplearn_logs', 'uplearn_lessons', 'uplearn_minutes', 'comprehension_sum'
+])
+
+def task_activity(log):
+    """Activity for one TaskLog"""
+    return Activity(log.date_completed.date(), log.date_completed.hour, log.subject,
+                    1, log.duration or 0, log.difficulty or 0, 0, 0, 0, 0)
+
+def uplearn_activity(log):
+    """Activity for one UplearnLog"""
+    return Activity(log.date, None, log.subject, 0, 0, 0,
+                    1, log.lessons_completed or 0, log.time_spent or 0, log.comprehension or 0)
+
+def rollup_activity(row):
+    """Activity for one DailyRollup row (day, subject, then the counters in column order)"""
+    day, subject, task_count, task_minutes, difficulty_sum, uplearn_sessions, uplearn_lessons, uplearn_minutes, \
+        comprehension_sum = row
+    return Activity(day, None, subject, task_count, task_minutes, difficulty_sum,
+                    uplearn_sessions, uplearn_lessons, uplearn_minutes, comprehension_sum)
+
+# Running sums collected by either analytics engine before formatting
+AnalyticsTotals = namedtuple('AnalyticsTotals', [
+    'weeks',  # per week back from this week: [tasks, {subject: tasks}, minutes, uplearn lessons]
+    'subject_totals',  # subject -> [tasks, minutes, difficulty]
+    'weekday_totals',  # Monday..Sunday: [tasks, task minutes, uplearn minutes]
+    'time_of_day',  # task minutes by hour // 6: night, morning, afternoon, evening
+    'uplearn_lessons_by_day',  # (subject, day) -> lessons within the 8-week chart window
+    'uplearn_subjects',  # subject -> [lessons, minutes, logs, comprehension]
+    'recent',  # last 7 days: tasks, minutes, difficulty, uplearn lessons, uplearn minutes, {subject: [...]}
+    'study_days',  # sorted distinct days with a task
+    'total_tasks',
+    'total_minutes'
+])
+
+def task_row_activity(row):
+    """Activity for a plain TaskLog tuple (day ordinal, hour, subject, duration, difficulty)"""
+    ordinal, hour, subject, duration, difficulty = row
+    return Activity(date.fromordinal(ordinal), hour, subject, 1, duration or 0, difficulty or 0, 0, 0, 0, 0)
+
+def uplearn_row_activity(row):
+    """Activity for a plain UplearnLog tuple (day ordinal, subject, lessons, minutes, comprehension)"""
+    ordinal, subject, lessons, minutes, comprehension = row
+    return Activity(date.fromordinal(ordinal), None, subject, 0, 0, 0, 1, lessons or 0, minutes or 0,
+                    comprehension or 0)
+
+def week_label(week_start):
+    week_end = week_start + timedelta(days=6)
+    return f"{week_start.strftime('%d %b')} - {week_end.strftime('%d %b')}"
+
+@dataclass
+class StudyAnalytics:
+    """Every study metric the views need, computed by compute_analytics in one pass"""
+    week_stats: dict = field(default_factory=dict)
+    avg_duration_by_subject: dict = field(default_factory=dict)
+    avg_difficulty_by_subject: dict = field(default_factory=dict)
+    productivity: float = 0
+    time_distribution: dict = field(default_factory=dict)
+    day_productivity: dict = field(default_factory=dict)
+    productivity_by_day: dict = field(default_factory=dict)
+    time_of_day: dict = field(default_factory=dict)
+    current_streak: int = 0
+    max_streak: int = 0
+    uplearn_stats: dict = field(default_factory=dict)
+    recent_week: dict = field(default_factory=dict)
+    uplearn_totals: dict = field(default_factory=dict)
+    summary: dict = field(default_factory=dict)
+
+    def template_context(self):
+        """Keyword arguments for study_analytics.html"""
+        return {
+            'week_stats': self.week_stats,
+            'avg_duration_by_subject': self.avg_duration_by_subject,
+            'avg_difficulty_by_subject': self.avg_difficulty_by_subject,
+            'productivity': self.productivity,
+            'time_distribution': self.time_distribution,
+            'productivity_by_day': self.productivity_by_day,
+            'day_productivity': self.day_productivity,
+            'current_streak': self.current_streak,
+            'max_streak': self.max_streak,
+            'summary': self.summary
+        }
+
+def streak_state(study_days):
+    """Return (run, max_streak, last_day) for a sorted list of distinct study days.
+
+    run is the length of the run of consecutive days ending on last_day.
+    """
+    run = max_streak = 0
+    previous = None
+    for day in study_days:
+        run = run + 1 if previous is not None and (day - previous).days == 1 else 1
+        if run > max_streak:
+            max_streak = run
+        previous = day
+    return run, max_streak, previous
+
+def active_streak(run, last_day, today):
+    """A run only counts as the current streak if it ended today or yesterday"""
+    if last_day is None or (today - last_day).days > 1:
+        return 0
+    return run
+
+def compute_streaks(study_days, today):
+    """Return (current_streak, max_streak) for a sorted list of distinct study days"""
+    run, max_streak, last_day = streak_state(study_days)
+    return active_streak(run, last_day, today), max_streak
+
+def compute_analytics(activities, today):
+    """Consume an activity stream once and return a StudyAnalytics result.
+
+    Each activity updates every accumulator in the same loop: weekly buckets
+    (relative to the end of the current week), per-subject totals,
+    day-of-week and time-of-day totals, the last-7-days window, Up Learn
+    totals and the set of study days for the streaks. Only the final
+    formatting walks the (small) accumulators.
+    """
+    this_monday = today - timedelta(days=today.weekday())
+    last_day = this_monday + timedelta(days=6)
+    recent_start = today - timedelta(days=7)
+
+    weeks = [[0, {}, 0, 0] for _ in range(WEEK_STATS_WEEKS)]  # tasks, subjects, minutes, uplearn lessons
+    subject_totals = {}  # subject -> [tasks, minutes, difficulty]
+    weekday_totals = [[0, 0, 0] for _ in range(7)]  # tasks, task minutes, uplearn minutes
+    time_of_day = [0, 0, 0, 0]  # hour // 6: night, morning, afternoon, evening
+    uplearn_lessons_by_day = {}  # (subject, day) -> lessons, for the progress_log charts
+    uplearn_subjects = {}  # subject -> [lessons, minutes, logs, comprehension]
+    recent = [0, 0, 0, 0, 0, {}]  # tasks, minutes, difficulty, uplearn lessons, uplearn minutes, subjects
+    study_days = set()
+    total_tasks = 0
+    total_minutes = 0
+
+    for day, hour, subject, task_count, task_minutes, difficulty_sum, uplearn_logs, uplearn_lessons, \
+            uplearn_minutes, comprehension_sum in activities:
+        week = (last_day - day).days // 7
+        weekday = day.weekday()
+        if task_count:
+            total_tasks += task_count
+            total_minutes += task_minutes
+            study_days.add(day)
+            totals = subject_totals.get(subject)
+            if totals is None:
+                totals = subject_totals[subject] = [0, 0, 0]
+            totals[0] += task_count
+            totals[1] += task_minutes
+            totals[2] += difficulty_sum
+            day_totals = weekday_totals[weekday]
+            day_totals[0] += task_count
+            day_totals[1] += task_minutes
+            if hour is not None:
+                time_of_day[hour // 6] += task_minutes
+            if 0 <= week < WEEK_STATS_WEEKS:
+                bucket = weeks[week]
+                bucket[0] += task_count
+                bucket[1][subject] = bucket[1].get(subject, 0) + task_count
+                bucket[2] += task_minutes
+            if recent_start <= day:
+                recent[0] += task_count
+                recent[1] += task_minutes
+                recent[2] += difficulty_sum
+                subject_recent = recent[5].setdefault(subject, [0, 0, 0])
+                subject_recent[0] += task_minutes
+                subject_recent[1] += task_count
+                subject_recent[2] += difficulty_sum
+        if uplearn_logs or uplearn_lessons or uplearn_minutes:
+            weekday_totals[weekday][2] += uplearn_minutes
+            totals = uplearn_subjects.get(subject)
+            if totals is None:
+                totals = uplearn_subjects[subject] = [0, 0, 0, 0]
+            totals[0] += uplearn_lessons
+            totals[1] += uplearn_minutes
+            totals[2] += uplearn_logs
+            totals[3] += comprehension_sum
+            if 0 <= week < WEEK_STATS_WEEKS:
+                weeks[week][3] += uplearn_lessons
+            # The 14-day daily chart falls inside the 8-week window
+            if 0 <= week < UPLEARN_WEEKS:
+                key = (subject, day)
+                uplearn_lessons_by_day[key] = uplearn_lessons_by_day.get(key, 0) + uplearn_lessons
+            if recent_start <= day:
+                recent[3] += uplearn_lessons
+                recent[4] += uplearn_minutes
+
+    return format_analytics(today, AnalyticsTotals(
+        weeks, subject_totals, weekday_totals, time_of_day, uplearn_lessons_by_day, uplearn_subjects,
+        recent, sorted(study_days), total_tasks, total_minutes
+    ))
+
+def format_analytics(today, totals):
+    """Turn accumulated AnalyticsTotals into the StudyAnalytics the templates expect"""
+    this_monday = today - timedelta(days=today.weekday())
+    weeks, subject_totals, weekday_totals, time_of_day, uplearn_lessons_by_day, uplearn_subjects, recent, \
+        study_days, total_tasks, total_minutes = totals
+    result = StudyAnalytics()
+
+    for i, (tasks, subjects, minutes, lessons) in enumerate(weeks):
+        result.week_stats[week_label(this_monday - timedelta(weeks=i))] = {
+            'tasks': tasks,
+            'subjects': subjects,
+            'time_spent': round(minutes / 60.0, 1),
+            'uplearn_lessons': lessons
+        }
+
+    for subject in ANALYTICS_SUBJECTS:
+        tasks, minutes, difficulty = subject_totals.get(subject, (0, 0, 0))
+        if tasks:
+            result.avg_duration_by_subject[subject] = minutes / tasks
+            result.avg_difficulty_by_subject[subject] = difficulty / tasks
+
+    # Productivity score: tasks completed per hour of study
+    total_hours = total_minutes / 60.0
+    result.productivity = total_tasks / total_hours if total_hours > 0 else 0
+
+    for weekday, (tasks, minutes, uplearn_minutes) in enumerate(weekday_totals):
+        day_name = DAY_NAMES[weekday]
+        # Up Learn time counts towards the time distribution but not task productivity
+        result.time_distribution[day_name] = minutes + uplearn_minutes
+        result.day_productivity[day_name] = {'time': minutes, 'tasks': tasks}
+        result.productivity_by_day[day_name] = tasks / (minutes / 60.0) if minutes > 0 else 0
+
+    result.time_of_day = {
+        'morning': time_of_day[1],
+        'afternoon': time_of_day[2],
+        'evening': time_of_day[3],
+        'night': time_of_day[0]
+    }
+
+    result.current_streak, result.max_streak = compute_streaks(study_days, today)
+
+    for subject in UPLEARN_SUBJECTS:
+        daily = []
+        for i in range(UPLEARN_DAYS):
+            day = today - timedelta(days=i)
+            daily.append({"date": day.strftime("%Y-%m-%d"), "lessons": uplearn_lessons_by_day.get((subject, day), 0)})
+        weekly = []
+        for i in range(UPLEARN_WEEKS):
+            week_start = this_monday - timedelta(weeks=i)
+            weekly.append({
+                "week": week_label(week_start),
+                "lessons": sum(uplearn_lessons_by_day.get((subject, week_start + timedelta(days=d)), 0)
+                               for d in range(7))
+            })
+        result.uplearn_stats[subject] = {"daily": daily, "weekly": weekly}
+
+    recent_tasks, recent_minutes, recent_difficulty, recent_lessons, recent_uplearn_minutes, recent_subjects = recent
+    result.recent_week = {
+        'total_study_time': recent_minutes,
+        'tasks_completed': recent_tasks,
+        'avg_difficulty': recent_difficulty / recent_tasks if recent_tasks else 0,
+        'uplearn_lessons': recent_lessons,
+        'uplearn_time': recent_uplearn_minutes,
+        'subjects': {
+            subject: {'time': minutes, 'tasks': tasks, 'avg_difficulty': difficulty / tasks}
+            for subject, (minutes, tasks, difficulty) in recent_subjects.items()
+        }
+    }
+
+    total_logs = sum(subject[2] for subject in uplearn_subjects.values())
+    result.uplearn_totals = {
+        'total_lessons': sum(subject[0] for subject in uplearn_subjects.values()),
+        'total_time': sum(subject[1] for subject in uplearn_subjects.values()),
+        'avg_comprehension': sum(subject[3] for subject in uplearn_subjects.values()) / total_logs if total_logs else 0,
+        'by_subject': {
+            subject: {
+                'lessons': lessons,
+                'time': minutes,
+                'avg_comprehension': comprehension / logs if logs else 0,
+                'logs_count': logs
+            }
+            for subject, (lessons, minutes, logs, comprehension) in uplearn_subjects.items()
+        }
+    }
+
+    # Headline numbers and per-subject tables for study_analytics.html (all-time)
+    result.summary = {
+        'total_tasks': total_tasks,
+        'uplearn_sessions': total_logs,
+        'uplearn_lessons': result.uplearn_totals['total_lessons'],
+        'total_hours': (total_minutes + result.uplearn_totals['total_time']) / 60,
+        'tasks_by_subject': {subject: subject_totals.get(subject, (0,))[0] for subject in ANALYTICS_SUBJECTS},
+        'uplearn_by_subject': {
+            subject: result.uplearn_totals['by_subject'].get(
+                subject, {'lessons': 0, 'time': 0, 'avg_comprehension': None, 'logs_count': 0}
+            )
+            for subject in UPLEARN_SUBJECTS
+        }
+    }
+    return result
+
+# -------------------------
+# Columnar engine (NumPy)
+# -------------------------
+def _columns(rows, count):
+    """Split plain tuples into `count` column tuples (empty rows give empty columns)"""
+    columns = list(zip(*rows))
+    return columns if columns else [()] * count
+
+def _numeric(column):
+    """int64 array from a column, treating None as 0"""
+    return np.nan_to_num(np.array(column, dtype=np.float64)).astype(np.int64)
+
+def _bincount(codes, weights=None, minlength=0):
+    """Integer-valued np.bincount (weights are whole minutes/ratings)"""
+    counts = np.bincount(codes, weights=weights, minlength=minlength)
+    return np.rint(counts).astype(np.int64) if weights is not None else counts
+
+def compute_analytics_columnar(task_rows, uplearn_rows, today):
+    """compute_analytics over plain log tuples using NumPy arrays instead of a Python loop.
+
+    Rows are converted to columns once (day ordinal, hour, subject code,
+    duration, difficulty, ...). Weekly buckets, weekday and time-of-day
+    totals and per-subject sums are np.bincount over integer codes; the
+    week/day windows are boolean masks. The sums are handed to the same
+    formatter as the pure-Python engine, so results are identical.
+    """
+    today_ordinal = today.toordinal()
+    this_monday = today - timedelta(days=today.weekday())
+    last_ordinal = this_monday.toordinal() + 6
+    recent_start = today_ordinal - 7
+
+    t_day, t_hour, t_subject, t_duration, t_difficulty = _columns(task_rows, 5)
+    u_day, u_subject, u_lessons, u_minutes, u_comprehension = _columns(uplearn_rows, 5)
+
+    # Subject code = position of the subject in first-seen order
+    lookup = {}
+    t_code = np.fromiter((lookup.setdefault(subject, len(lookup)) for subject in t_subject), np.int64, len(t_subject))
+    u_code = np.fromiter((lookup.setdefault(subject, len(lookup)) for subject in u_subject), np.int64, len(u_subject))
+    subjects = list(lookup)
+    n_subjects = len(subjects)
+
+    t_day = _numeric(t_day)
+    t_hour = np.nan_to_num(np.array(t_hour, dtype=np.float64), nan=-1).astype(np.int64)
+    t_duration = _numeric(t_duration)
+    t_difficulty = _numeric(t_difficulty)
+    u_day = _numeric(u_day)
+    u_lessons = _numeric(u_lessons)
+    u_minutes = _numeric(u_minutes)
+    u_comprehension = _numeric(u_comprehension)
+
+    # Weeks back from the end of the current week (0 = this week); Monday = 0
+    t_week = (last_ordinal - t_day) // 7
+    u_week = (last_ordinal - u_day) // 7
+    t_weekday = (t_day - 1) % 7
+    u_weekday = (u_day - 1) % 7
+
+    weeks = [[0, {}, 0, 0] for _ in range(WEEK_STATS_WEEKS)]
+    in_weeks = (t_week >= 0) & (t_week < WEEK_STATS_WEEKS)
+    week_tasks = _bincount(t_week[in_weeks], minlength=WEEK_STATS_WEEKS)
+    week_minutes = _bincount(t_week[in_weeks], t_duration[in_weeks], WEEK_STATS_WEEKS)
+    week_subjects = _bincount(t_week[in_weeks] * n_subjects + t_code[in_weeks],
+                              minlength=WEEK_STATS_WEEKS * n_subjects).reshape(WEEK_STATS_WEEKS, n_subjects)
+    u_in_weeks = (u_week >= 0) & (u_week < WEEK_STATS_WEEKS)
+    week_lessons = _bincount(u_week[u_in_weeks], u_lessons[u_in_weeks], WEEK_STATS_WEEKS)
+    for week in range(WEEK_STATS_WEEKS):
+        bucket = weeks[week]
+        bucket[0] = int(week_tasks[week])
+        bucket[1] = {subjects[code]: int(count) for code, count in enumerate(week_subjects[week]) if count}
+        bucket[2] = int(week_minutes[week])
+        bucket[3] = int(week_lessons[week])
+
+    subject_tasks = _bincount(t_code, minlength=n_subjects)
+    subject_minutes = _bincount(t_code, t_duration, n_subjects)
+    subject_difficulty = _bincount(t_code, t_difficulty, n_subjects)
+    subject_totals = {
+        subjects[code]: [int(subject_tasks[code]), int(subject_minutes[code]), int(subject_difficulty[code])]
+        for code in range(n_subjects) if subject_tasks[code]
+    }
+
+    weekday_tasks = _bincount(t_weekday, minlength=7)
+    weekday_minutes = _bincount(t_weekday, t_duration, 7)
+    weekday_uplearn = _bincount(u_weekday, u_minutes, 7)
+    weekday_totals = [[int(weekday_tasks[i]), int(weekday_minutes[i]), int(weekday_uplearn[i])] for i in range(7)]
+
+    known_hour = t_hour >= 0
+    time_of_day = [int(minutes) for minutes in _bincount(t_hour[known_hour] // 6, t_duration[known_hour], 4)]
+
+    # Up Learn lessons per (subject, day) inside the chart window
+    uplearn_lessons_by_day = {}
+    in_chart = (u_week >= 0) & (u_week < UPLEARN_WEEKS)
+    chart_days = UPLEARN_WEEKS * 7
+    chart = _bincount(u_code[in_chart] * chart_days + (last_ordinal - u_day[in_chart]), u_lessons[in_chart],
+                      n_subjects * chart_days).reshape(n_subjects, chart_days)
+    for code, offset in zip(*np.nonzero(chart)):
+        uplearn_lessons_by_day[(subjects[code], date.fromordinal(int(last_ordinal - offset)))] = int(chart[code, offset])
+
+    u_logs = _bincount(u_code, minlength=n_subjects)
+    u_subject_lessons = _bincount(u_code, u_lessons, n_subjects)
+    u_subject_minutes = _bincount(u_code, u_minutes, n_subjects)
+    u_subject_comprehension = _bincount(u_code, u_comprehension, n_subjects)
+    uplearn_subjects = {
+        subjects[code]: [int(u_subject_lessons[code]), int(u_subject_minutes[code]), int(u_logs[code]),
+                         int(u_subject_comprehension[code])]
+        for code in range(n_subjects) if u_logs[code]
+    }
+
+    t_recent = t_day >= recent_start
+    u_recent = u_day >= recent_start
+    recent_tasks = _bincount(t_code[t_recent], minlength=n_subjects)
+    recent_minutes = _bincount(t_code[t_recent], t_duration[t_recent], n_subjects)
+    recent_difficulty = _bincount(t_code[t_recent], t_difficulty[t_recent], n_subjects)
+    recent = [
+        int(recent_tasks.sum()), int(recent_minutes.sum()), int(recent_difficulty.sum()),
+        int(u_lessons[u_recent].sum()), int(u_minutes[u_recent].sum()),
+        {subjects[code]: [int(recent_minutes[code]), int(recent_tasks[code]), int(recent_difficulty[code])]
+         for code in range(n_subjects) if recent_tasks[code]}
+    ]
+
+    study_days = [date.fromordinal(int(ordinal)) for ordinal in np.unique(t_day)]
+
+    return format_analytics(today, AnalyticsTotals(
+        weeks, subject_totals, weekday_totals, time_of_day, uplearn_lessons_by_day, uplearn_subjects,
+        recent, study_days, len(t_day), int(t_duration.sum())
+    ))
+
+def analyze_log_rows(task_rows, uplearn_rows, today, engine=None):
+    """Analytics for raw log tuples, picking the engine by history length.
+
+    task_rows hold (day ordinal, hour, subject, duration, difficulty) and
+    uplearn_rows (day ordinal, subject, lessons, minutes, comprehension).
+    engine is 'python', 'numpy' or None for automatic: NumPy when it is
+    installed and there are at least COLUMNAR_MIN_ROWS rows.
+    """
+    if engine is None:
+        engine = 'numpy' if np is not None and len(task_rows) + len(uplearn_rows) >= COLUMNAR_MIN_ROWS else 'python'
+    if engine == 'numpy':
+        return compute_analytics_columnar(task_rows, uplearn_rows, today)
+    activities = chain((task_row_activity(row) for row in task_rows),
+                       (uplearn_row_activity(row) for row in uplearn_rows))
+    return compute_analytics(activities, today)
@@ -0,0 +1,213 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by get() on a miss, so None can be cached as a value
+MISSING = object()
+
+class CacheBackend:
+    """Namespaced, versioned key/value cache.
+
+    Entries live under (namespace, key) and remember the version they were
+    built for (e.g. a user's data version or a hash of the exam dates). A
+    lookup with a different version is a miss, so bumping the version
+    invalidates an entry everywhere without a delete. invalidate() drops a
+    single key or a whole namespace. Every entry also expires after its TTL.
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_or_build(self, namespace, key, version, build, ttl=None):
+        """Return the cached value for this version, otherwise call build() and cache its result.
+
+        A version of None means the current version is unknown: the value is
+        built and never served from or written to the cache.
+        """
+        if version is None:
+            self._count(False)
+            return build()
+        value = self.get(namespace, key, version)
+        if value is not MISSING:
+            return value
+        value = build()
+        self.set(namespace, key, version, value, ttl)
+        return value
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': self.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
+
+class LRUCache(CacheBackend):
+    """In-process backend: an LRU dict bounded by entry count and TTL (one copy per worker)"""
+
+    name = 'lru'
+
+    def __init__(self, ttl=3600, max_entries=4096):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, namespace, key, version):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+                self._entries.move_to_end((namespace, key))
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return MISSING
+
+    def set(self, namespace, key, version, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[(namespace, key)] = (version, expires, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace, key=None):
+        with self._lock:
+            if key is not None:
+                self._entries.pop((namespace, key), None)
+            else:
+                for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == namespace]:
+                    del self._entries[entry_key]
+
+    def stats(self):
+        stats = super().stats()
+        stats['entries'] = len(self._entries)
+        return stats
+
+class SQLiteCache(CacheBackend):
+    """Host-wide backend: pickled entries in a local SQLite file shared by every worker process.
+
+    Entries outlive worker recycling and restarts. Each thread keeps its own
+    connection (reopened after a fork). The file runs in WAL mode with
+    synchronous=OFF, since losing cache writes in a crash is harmless. Keys
+    must be strings. Values that cannot be pickled are returned uncached.
+    Past max_entries, the entries closest to expiry are evicted.
+    """
+
+    name = 'sqlite'
+    PRUNE_EVERY = 64  # sets between expiry/size sweeps
+
+    def __init__(self, path, ttl=3600, max_entries=20000):
+        super().__init__(ttl)
+        self.path = path
+        self.max_entries = max_entries
+        self.errors = 0
+        self._local = threading.local()
+        self._sets = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entry (namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                "version TEXT NOT NULL, expires_at REAL NOT NULL, value BLOB NOT NULL, PRIMARY KEY (namespace, key))")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_entry_expires ON cache_entry (expires_at)")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _failed(self, action, error):
+        with self._lock:
+            self.errors += 1
+        print(f"Note: Shared cache {action} failed: {error}")
+
+    def get(self, namespace, key, version):
+        try:
+            row = self._connection().execute(
+                "SELECT version, expires_at, value FROM cache_entry WHERE namespace = ? AND key = ?",
+                (namespace, key)).fetchone()
+            if row is not None and row[0] == str(version) and row[1] > time.time():
+                value = pickle.loads(row[2])
+                self._count(True)
+                return value
+        except Exception as e:
+            # Locked/corrupt file or an entry pickled by incompatible code: treat as a miss
+            self._failed('read', e)
+        self._count(False)
+        return MISSING
+
+    def set(self, namespace, key, version, value, ttl=None):
+        try:
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            self._failed('pickle', e)
+            return
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entry (namespace, key, version, expires_at, value) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, str(version), expires, blob))
+            with self._lock:
+                self._sets += 1
+                prune = self._sets % self.PRUNE_EVERY == 0
+            if prune:
+                self._prune(connection)
+        except sqlite3.Error as e:
+            self._failed('write', e)
+
+    def _prune(self, connection):
+        connection.execute("DELETE FROM cache_entry WHERE expires_at <= ?", (time.time(),))
+        excess = connection.execute("SELECT count(*) FROM cache_entry").fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM cache_entry WHERE rowid IN "
+                "(SELECT rowid FROM cache_entry ORDER BY expires_at LIMIT ?)", (excess,))
+
+    def invalidate(self, namespace, key=None):
+        try:
+            if key is not None:
+                self._connection().execute("DELETE FROM cache_entry WHERE namespace = ? AND key = ?", (namespace, key))
+            else:
+                self._connection().execute("DELETE FROM cache_entry WHERE namespace = ?", (namespace,))
+        except sqlite3.Error as e:
+            self._failed('invalidate', e)
+
+    def stats(self):
+        stats = super().stats()
+        stats['errors'] = self.errors
+        try:
+            stats['entries'] = self._connection().execute("SELECT count(*) FROM cache_entry").fetchone()[0]
+        except sqlite3.Error:
+            stats['entries'] = None
+        return stats
+
+CACHE_BACKENDS = {'lru': LRUCache, 'sqlite': SQLiteCache}
+
+def make_cache(backend='lru', path=None, ttl=3600, max_entries=4096):
+    """Build the cache backend selected by name ('lru' or 'sqlite', which needs a file path)"""
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown cache backend '{backend}' (choose from {', '.join(CACHE_BACKENDS)})")
+    if backend == 'sqlite':
+        return SQLiteCache(path, ttl=ttl, max_entries=max_entries)
+    return LRUCache(ttl=ttl, max_entries=max_entries)
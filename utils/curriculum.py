@@ -0,0 +1,224 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+# Default location of the curriculum file, relative to the project root
+CURRICULUM_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'static', 'data', 'curriculum.json'
+)
+
+# Structure returned when the curriculum file is missing
+EMPTY_CURRICULUM = {
+    "Biology": {"Years": []},
+    "Chemistry": {"Modules": []},
+    "Psychology": {"Papers": []}
+}
+
+def freeze(value):
+    """Recursively convert parsed JSON into a read-only view (dicts -> mappingproxy, lists -> tuple)"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+# One row per topic in the curriculum; `id` is its position in CurriculumIndex.topics
+TopicEntry = namedtuple('TopicEntry', ['id', 'subject', 'title', 'year', 'module', 'paper'])
+
+# Flattened topic arrays for one Biology/Chemistry module or Psychology paper
+ModuleTopics = namedtuple('ModuleTopics', ['subject', 'year', 'name', 'titles', 'topics', 'ids'])
+
+def topic_slugs(title):
+    """Return the topic_id forms the front end generates for a topic title"""
+    lowered = title.lower()
+    return {
+        lowered.replace(' ', '_'),
+        re.sub(r'\s+', '_', lowered),
+        re.sub(r'[^a-z0-9]', '_', lowered)
+    }
+
+class CurriculumIndex:
+    """Lookup tables built once per curriculum load.
+
+    Maps topic titles and topic_id slugs to a TopicEntry (subject, year,
+    module, paper and a stable integer id), and exposes each subject's
+    modules/papers as flat tuples so the task generator can pick topics by
+    position instead of scanning.
+    """
+
+    def __init__(self, data):
+        self.source = data
+        self.topics = []
+        self.by_title = {}
+        self.by_subject_title = {}
+        self.by_slug = {}
+        self.modules = {}
+        # topic id -> (subject, module position, topic position) for topics inside a module/paper
+        self.locations = {}
+
+        for subject, subject_data in data.items():
+            if subject == 'Curriculum' or not hasattr(subject_data, 'get'):
+                continue
+            groups = []
+            if 'Years' in subject_data:
+                for year in subject_data['Years']:
+                    for module in year['Modules']:
+                        groups.append(self._add_group(subject, year['Name'], module['Name'], None, module['Topics']))
+            elif 'Modules' in subject_data:
+                for module in subject_data['Modules']:
+                    groups.append(self._add_group(subject, None, module['Name'], None, module['Topics']))
+            elif 'Papers' in subject_data:
+                for paper in subject_data['Papers']:
+                    groups.append(self._add_group(subject, None, None, paper['Name'], paper['Topics']))
+            for group_position, group in enumerate(groups):
+                for topic_position, topic_id in enumerate(group.ids):
+                    self.locations[topic_id] = (subject, group_position, topic_position)
+            self.modules[subject] = tuple(groups)
+
+        # Topics from the simplified "Curriculum" section (used for proficiency ratings)
+        for subject, titles in data.get('Curriculum', {}).items():
+            for title in titles:
+                if (subject, title) not in self.by_subject_title:
+                    self._add_topic(subject, title, None, None, None)
+
+        self.topics = tuple(self.topics)
+
+    def _add_topic(self, subject, title, year, module, paper):
+        entry = TopicEntry(len(self.topics), subject, title, year, module, paper)
+        self.topics.append(entry)
+        self.by_subject_title[(subject, title)] = entry
+        self.by_title.setdefault(title, entry)
+        for slug in topic_slugs(title):
+            self.by_slug.setdefault(slug, entry)
+        return entry
+
+    def _add_group(self, subject, year, module, paper, topics):
+        entries = [self._add_topic(subject, topic['Title'], year, module, paper) for topic in topics]
+        return ModuleTopics(
+            subject=subject,
+            year=year,
+            name=module or paper,
+            titles=tuple(entry.title for entry in entries),
+            topics=tuple(topics),
+            ids=tuple(entry.id for entry in entries)
+        )
+
+    def find(self, key, subject=None):
+        """Find a topic by title or topic_id slug, optionally restricted to a subject"""
+        if subject is not None:
+            entry = self.by_subject_title.get((subject, key))
+            if entry:
+                return entry
+        entry = self.by_title.get(key) or self.by_slug.get(key.lower())
+        if entry and (subject is None or entry.subject == subject):
+            return entry
+        return None
+
+    def find_module_topic(self, subject, title):
+        """The module/paper topic a (simplified) title refers to within a subject, matched by title or slug.
+
+        The "Curriculum" section uses its own titles; only those that name a
+        module or paper topic resolve, otherwise None.
+        """
+        entry = self.by_subject_title.get((subject, title))
+        if entry is not None and entry.id in self.locations:
+            return entry
+        for slug in topic_slugs(title):
+            entry = self.by_slug.get(slug)
+            if entry is not None and entry.subject == subject and entry.id in self.locations:
+                return entry
+        return None
+
+class CurriculumProvider:
+    """Process-wide curriculum cache that reparses the JSON file only when it changes on disk.
+
+    The file is stat'ed at most once every `check_interval` seconds; it is only
+    reparsed when its (mtime, size) signature differs from the cached one.
+    """
+
+    def __init__(self, path=CURRICULUM_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._data = None
+        self._index = None
+        self._signature = None
+        self._last_check = 0.0
+        self.hits = 0
+        self.reloads = 0
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, signature):
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            print(f"Error: Could not find curriculum.json at {self.path}")
+            data = EMPTY_CURRICULUM
+        self._data = freeze(data)
+        self._index = None
+        self._signature = signature
+        self.reloads += 1
+
+    def get(self):
+        """Return the read-only curriculum, reloading it if the file has changed"""
+        now = time.monotonic()
+        if self._data is not None and now - self._last_check < self.check_interval:
+            self.hits += 1
+            return self._data
+
+        with self._lock:
+            signature = self._stat_signature()
+            self._last_check = now
+            if self._data is None or signature != self._signature:
+                self._load(signature)
+            else:
+                self.hits += 1
+            return self._data
+
+    def index(self):
+        """Return the CurriculumIndex for the current curriculum, rebuilding it after a reload"""
+        data = self.get()
+        index = self._index
+        if index is None or index.source is not data:
+            index = CurriculumIndex(data)
+            self._index = index
+        return index
+
+    def invalidate(self):
+        """Force the next call to get() to reparse the file"""
+        with self._lock:
+            self._data = None
+            self._index = None
+            self._signature = None
+
+    def stats(self):
+        """Return cache counters for monitoring"""
+        return {
+            'path': self.path,
+            'hits': self.hits,
+            'reloads': self.reloads,
+            'loaded': self._data is not None
+        }
+
+# Shared provider used by the app, the task generator and RevisionTimetable
+curriculum_provider = CurriculumProvider()
+
+def get_curriculum():
+    """Return the shared read-only curriculum data"""
+    return curriculum_provider.get()
+
+def get_curriculum_index():
+    """Return the shared CurriculumIndex"""
+    return curriculum_provider.index()
@@ -0,0 +1,78 @@
+import hashlib
+import random
+
+from utils.curriculum import get_curriculum, get_curriculum_index
+from utils.sampler import TopicSampler
+from utils.task_generator import generate_daily_tasks
+
+def plan_seed(user_id, plan_date):
+    """Deterministic per-user, per-day seed (stable across processes, unlike hash())"""
+    digest = hashlib.sha256(f"{user_id}:{plan_date.isoformat()}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+def build_daily_plan(user_id, plan_date, user_subjects, uplearn_subjects, proficiencies=None,
+                     preferences=None, daily_study_hours=None, due_reviews=None, sampler=None, index=None,
+                     curriculum_data=None):
+    """Generate the task list for one user and day from a seeded RNG.
+
+    The same inputs always give the same plan, so any worker (or the bulk
+    pre-generation command) produces an identical result.
+    """
+    if curriculum_data is None:
+        curriculum_data = get_curriculum()
+    if index is None:
+        index = get_curriculum_index()
+    if sampler is None:
+        sampler = TopicSampler(proficiencies, preferences, index)
+
+    daily_minutes = int(daily_study_hours * 60) if daily_study_hours else None
+    # due_reviews: (due ordinal, subject, topic title) rows sorted by due, possibly loaded for a
+    # later date too; titles that are no longer in the curriculum are skipped
+    due_topics = None
+    if due_reviews:
+        cutoff = plan_date.toordinal()
+        due_topics = []
+        for due, subject, topic in due_reviews:
+            if due > cutoff:
+                break
+            entry = index.by_subject_title.get((subject, topic))
+            if entry is not None:
+                due_topics.append(entry.id)
+    return generate_daily_tasks(
+        curriculum_data,
+        user_subjects,
+        uplearn_subjects,
+        proficiencies,
+        index=index,
+        sampler=sampler,
+        rng=random.Random(plan_seed(user_id, plan_date)),
+        daily_minutes=daily_minutes,
+        due_topics=due_topics
+    )
+
+# -------------------------
+# Bulk pre-generation (process pool workers)
+# -------------------------
+_worker_index = None
+
+def init_plan_worker():
+    """Process pool initializer: parse the curriculum and build its index once per process"""
+    global _worker_index
+    _worker_index = get_curriculum_index()
+
+def build_plan_chunk(jobs, plan_dates):
+    """Build plans for a chunk of users; returns (user_id, plan_date, tasks) rows.
+
+    Each job is (user_id, inputs) where inputs holds the keyword arguments
+    collected by get_plan_inputs in app.py.
+    """
+    index = _worker_index or get_curriculum_index()
+    curriculum_data = index.source
+    rows = []
+    for user_id, inputs in jobs:
+        sampler = TopicSampler(inputs["proficiencies"], inputs["preferences"], index)
+        for plan_date in plan_dates:
+            tasks = build_daily_plan(user_id, plan_date, sampler=sampler, index=index,
+                                     curriculum_data=curriculum_data, **inputs)
+            rows.append((user_id, plan_date, tasks))
+    return rows
@@ -0,0 +1,50 @@
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+# Rows per history page (the API accepts ?limit= up to MAX_PAGE_SIZE)
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(value, row_id):
+    """Opaque cursor for the last row of a page: '<iso date/datetime>_<id>'"""
+    return f"{value.isoformat()}_{row_id}"
+
+def decode_cursor(cursor, parse):
+    """Split a cursor back into (value, id); returns None if it is malformed"""
+    value, _, row_id = (cursor or '').rpartition('_')
+    try:
+        return parse(value), int(row_id)
+    except ValueError:
+        return None
+
+def parse_datetime(value):
+    return datetime.fromisoformat(value)
+
+def parse_date(value):
+    return date.fromisoformat(value)
+
+def page_size(value):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+
+def keyset_page(query, key_column, id_column, cursor=None, limit=PAGE_SIZE):
+    """Return (rows, next_cursor) for one page of `query`, newest first.
+
+    Rows are ordered by (key_column, id_column) descending and the page starts
+    strictly after the cursor row, so with a (user_id, key, id) index every
+    page is a bounded index range scan no matter how deep into the history it
+    is (unlike OFFSET, which walks every skipped row). next_cursor is None on
+    the last page.
+    """
+    if cursor is not None:
+        query = query.filter(tuple_(key_column, id_column) < tuple_(*cursor))
+    rows = query.order_by(key_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, key_column.key), getattr(last, id_column.key))
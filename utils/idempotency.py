@@ -0,0 +1,61 @@
+import threading
+import time
+
+class IdempotencyStore:
+    """Time-windowed set of recently seen submission keys, shared by every worker process.
+
+    Keys are (user_id, key) pairs stored in the submission_key table of the
+    app database, so a double-click or a retried request carrying the same
+    key is acknowledged without writing again whichever gunicorn worker it
+    reaches. claim() is a single INSERT OR IGNORE on the table's primary key
+    in its own short transaction. Keys expire after `ttl` seconds; expired
+    rows are swept every PRUNE_EVERY claims.
+    """
+
+    PRUNE_EVERY = 64  # claims between expiry sweeps
+
+    def __init__(self, engine, ttl=600):
+        self._engine = engine  # callable returning the SQLAlchemy engine (needs the app context)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.claimed = 0
+        self.duplicates = 0
+
+    def claim(self, key):
+        """Record `key`; False if it was already claimed within the window"""
+        user_id, value = key
+        now = time.time()
+        with self._engine().begin() as connection:
+            # An expired claim no longer blocks the key
+            connection.exec_driver_sql(
+                "DELETE FROM submission_key WHERE user_id = ? AND key = ? AND expires_at <= ?", (user_id, value, now))
+            claimed = connection.exec_driver_sql(
+                "INSERT OR IGNORE INTO submission_key (user_id, key, expires_at) VALUES (?, ?, ?)",
+                (user_id, value, now + self.ttl)).rowcount == 1
+            with self._lock:
+                if claimed:
+                    self.claimed += 1
+                else:
+                    self.duplicates += 1
+                prune = claimed and self.claimed % self.PRUNE_EVERY == 0
+            if prune:
+                connection.exec_driver_sql("DELETE FROM submission_key WHERE expires_at <= ?", (now,))
+        return claimed
+
+    def release(self, key):
+        """Forget a claimed key whose write failed, so a retry is accepted"""
+        user_id, value = key
+        with self._engine().begin() as connection:
+            connection.exec_driver_sql("DELETE FROM submission_key WHERE user_id = ? AND key = ?", (user_id, value))
+
+    def stats(self):
+        with self._engine().connect() as connection:
+            keys = connection.exec_driver_sql(
+                "SELECT count(*) FROM submission_key WHERE expires_at > ?", (time.time(),)).scalar()
+        with self._lock:
+            return {
+                'keys': keys,
+                'claimed': self.claimed,
+                'duplicates': self.duplicates,
+                'ttl': self.ttl
+            }
@@ -0,0 +1,251 @@
+"""
+Log writes
+----------
+Both entry points (app.py and RevisionTimetable.py) store task and Up Learn
+logs through store_logs(), so every log updates the same derived state.
+That state is the daily rollups, the user's study streak and data version,
+and the SM-2 review of the task's topic.
+
+Each app has its own Flask-SQLAlchemy models, so these functions take the
+caller's session and work on lightweight table constructs. The schema
+itself is defined by utils/migrations.py. The caller commits.
+"""
+
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import Date, DateTime, Integer, String, Text, case, column, func, insert, select, table
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from utils.curriculum import get_curriculum_index
+from utils.spaced_repetition import DEFAULT_EASE, quality_from_difficulty, sm2_update
+from utils.task_generator import topic_from_task
+
+task_log = table(
+    'task_log',
+    column('id', Integer), column('user_id', Integer), column('task', String), column('subject', String),
+    column('date_completed', DateTime), column('duration', Integer), column('difficulty', Integer),
+    column('notes', Text)
+)
+uplearn_log = table(
+    'uplearn_log',
+    column('id', Integer), column('user_id', Integer), column('subject', String), column('date', Date),
+    column('lessons_completed', Integer), column('time_spent', Integer), column('comprehension', Integer)
+)
+daily_rollup = table(
+    'daily_rollup',
+    column('user_id', Integer), column('day', Date), column('subject', String),
+    column('task_count', Integer), column('task_minutes', Integer), column('difficulty_sum', Integer),
+    column('uplearn_sessions', Integer), column('uplearn_lessons', Integer), column('uplearn_minutes', Integer),
+    column('comprehension_sum', Integer)
+)
+user_streak = table(
+    'user_streak',
+    column('user_id', Integer), column('current_streak', Integer), column('max_streak', Integer),
+    column('last_study_date', Date)
+)
+user_data_version = table('user_data_version', column('user_id', Integer), column('version', Integer))
+topic_review = table(
+    'topic_review',
+    column('user_id', Integer), column('subject', String), column('topic', String), column('interval', Integer),
+    column('ease', Integer), column('repetitions', Integer), column('due', Integer), column('last_reviewed', DateTime)
+)
+daily_plan = table('daily_plan', column('user_id', Integer), column('plan_date', Date))
+
+# Columns a log may leave out, with the value the models default them to
+LOG_TABLES = {
+    'task': (task_log, {'duration': None, 'difficulty': None, 'notes': None}),
+    'uplearn': (uplearn_log, {'lessons_completed': 0, 'time_spent': None, 'comprehension': None})
+}
+
+ROLLUP_COUNTERS = ['task_count', 'task_minutes', 'difficulty_sum', 'uplearn_sessions', 'uplearn_lessons',
+                   'uplearn_minutes', 'comprehension_sum']
+
+def rollup_value(value):
+    """A log field as SQLite stores and SUM()s it: numbers as given, numeric text converted, anything else 0.
+
+    Matches the SUM() in rebuild_daily_rollups and the migration backfill, so
+    fractional durations add up the same incrementally and when rebuilt.
+    """
+    if isinstance(value, (int, float)):
+        return value if math.isfinite(value) else 0
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0
+    if not math.isfinite(number):
+        return 0
+    return int(number) if number.is_integer() else number
+
+def upsert_rollups(session, rows):
+    """Add counters into daily_rollup rows, creating them as needed.
+
+    The increment happens inside SQLite (ON CONFLICT DO UPDATE SET x = x + excluded.x),
+    so concurrent workers never overwrite each other's totals.
+    """
+    if not rows:
+        return
+    statement = sqlite_insert(daily_rollup)
+    statement = statement.on_conflict_do_update(
+        index_elements=['user_id', 'day', 'subject'],
+        set_={name: daily_rollup.c[name] + statement.excluded[name] for name in ROLLUP_COUNTERS}
+    )
+    params = []
+    for row in rows:
+        values = {'user_id': row['user_id'], 'day': row['day'], 'subject': row['subject']}
+        for name in ROLLUP_COUNTERS:
+            values[name] = row.get(name, 0)
+        params.append(values)
+    session.execute(statement, params)
+
+def rollup_row(kind, log):
+    """daily_rollup counters contributed by one task or Up Learn log (a dict of its columns)"""
+    if kind == 'task':
+        row = {
+            'day': log['date_completed'].date(),
+            'task_count': 1,
+            'task_minutes': rollup_value(log['duration']),
+            'difficulty_sum': rollup_value(log['difficulty'])
+        }
+    else:
+        row = {
+            'day': log['date'],
+            'uplearn_sessions': 1,
+            'uplearn_lessons': rollup_value(log['lessons_completed']),
+            'uplearn_minutes': rollup_value(log['time_spent']),
+            'comprehension_sum': rollup_value(log['comprehension'])
+        }
+    row.update(user_id=log['user_id'], subject=log['subject'])
+    return row
+
+def update_daily_rollups(session, logs):
+    """Fold newly added (kind, log) pairs into the daily rollups, one upsert row per (user, day, subject)"""
+    rows = {}
+    for kind, log in logs:
+        row = rollup_row(kind, log)
+        key = (row['user_id'], row['day'], row['subject'])
+        if key in rows:
+            for name in ROLLUP_COUNTERS:
+                rows[key][name] = rows[key].get(name, 0) + row.get(name, 0)
+        else:
+            rows[key] = row
+    upsert_rollups(session, list(rows.values()))
+
+def bump_data_version(session, user_id):
+    """Invalidate the user's cached analytics in every worker (same transaction as the write)"""
+    statement = sqlite_insert(user_data_version).values(user_id=user_id, version=1)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={'version': user_data_version.c.version + 1}
+    ))
+
+def update_streak(session, user_id, day):
+    """Extend the user's streak with a task logged on `day` (same transaction as the write).
+
+    The update runs inside SQLite as a single UPSERT, so it is O(1) and safe
+    against concurrent workers. A log dated before last_study_date leaves the
+    streak alone; `flask analytics repair-streaks` recomputes it from history.
+    """
+    last_day = user_streak.c.last_study_date
+    yesterday = day - timedelta(days=1)
+    run = case(
+        (last_day == yesterday, user_streak.c.current_streak + 1),
+        (last_day.is_(None) | (last_day < yesterday), 1),
+        else_=user_streak.c.current_streak
+    )
+    statement = sqlite_insert(user_streak).values(user_id=user_id, current_streak=1, max_streak=1,
+                                                  last_study_date=day)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={
+            'current_streak': run,
+            'max_streak': func.max(user_streak.c.max_streak, run),
+            'last_study_date': case((last_day.is_(None) | (last_day < day), day), else_=last_day)
+        }
+    ))
+
+def invalidate_daily_plans(session, user_id, first_date=None):
+    """Drop the user's stored plans from first_date (default today) on"""
+    try:
+        session.execute(daily_plan.delete().where(
+            daily_plan.c.user_id == user_id,
+            daily_plan.c.plan_date >= (first_date or datetime.now().date())
+        ))
+    except Exception as e:
+        print(f"Note: Unable to invalidate daily plans: {e}")
+
+def record_review(session, user_id, subject, task, difficulty):
+    """Update the SM-2 review state for the topic behind a completed task; False if it has none"""
+    topic = topic_from_task(task)
+    if not topic or not subject:
+        return False
+    # "Biology (Year 12)" -> "Biology"
+    entry = get_curriculum_index().find(topic, subject.split(' ')[0])
+    if entry is None:
+        return False
+
+    today = datetime.now().date()
+    try:
+        review = session.execute(
+            select(topic_review.c.interval, topic_review.c.ease, topic_review.c.repetitions).where(
+                topic_review.c.user_id == user_id,
+                topic_review.c.subject == entry.subject,
+                topic_review.c.topic == entry.title)
+        ).first()
+        interval, ease, repetitions = review or (0, DEFAULT_EASE, 0)
+        interval, ease, repetitions, due = sm2_update(
+            interval or 0, ease or DEFAULT_EASE, repetitions or 0, quality_from_difficulty(difficulty), today
+        )
+        statement = sqlite_insert(topic_review).values(
+            user_id=user_id, subject=entry.subject, topic=entry.title, interval=interval, ease=ease,
+            repetitions=repetitions, due=due, last_reviewed=datetime.now())
+        session.execute(statement.on_conflict_do_update(
+            index_elements=['user_id', 'subject', 'topic'],
+            set_={name: statement.excluded[name] for name in ('interval', 'ease', 'repetitions', 'due',
+                                                              'last_reviewed')}
+        ))
+        # Today's plan stays as served; later days pick up the new due date
+        invalidate_daily_plans(session, user_id, today + timedelta(days=1))
+    except Exception as e:
+        print(f"Note: Unable to record topic review: {e}")
+        return False
+    return True
+
+def store_logs(session, entries):
+    """Add ('task' | 'uplearn', fields) logs and their rollup, streak, data version and review updates.
+
+    Rollup counters are merged per (user, day, subject) and each user's
+    streak and data version are touched once, so a batch of logs costs a
+    handful of statements plus the per-task review updates. Returns the
+    number of logs added.
+    """
+    logs = []
+    for kind, fields in entries:
+        log = dict(LOG_TABLES[kind][1], **fields)
+        if kind == 'task' and log.get('date_completed') is None:
+            log['date_completed'] = datetime.now()
+        elif kind == 'uplearn' and log.get('date') is None:
+            log['date'] = datetime.now().date()
+        logs.append((kind, log))
+    for kind, (log_table, _) in LOG_TABLES.items():
+        rows = [log for log_kind, log in logs if log_kind == kind]
+        # One executemany per column set
+        by_columns = {}
+        for row in rows:
+            by_columns.setdefault(tuple(sorted(row)), []).append(row)
+        for batch in by_columns.values():
+            session.execute(insert(log_table), batch)
+    update_daily_rollups(session, logs)
+    tasks = [log for kind, log in logs if kind == 'task']
+    # Oldest day first, so each day extends the streak left by the previous one
+    for user_id, day in sorted({(log['user_id'], log['date_completed'].date()) for log in tasks}):
+        update_streak(session, user_id, day)
+    for user_id in sorted({log['user_id'] for _, log in logs}):
+        bump_data_version(session, user_id)
+    for log in tasks:
+        record_review(session, log['user_id'], log['subject'], log['task'], log['difficulty'])
+    return len(logs)
@@ -0,0 +1,407 @@
+"""
+Versioned schema migrations
+---------------------------
+The schema is defined by the ordered MIGRATIONS below, not by db.create_all().
+Both entry points (app.py and RevisionTimetable.py) run migrate() once at
+startup (or `flask schema migrate`), so request handlers never do DDL or
+schema introspection.
+
+Each applied step is recorded in the schema_version table. To change the
+schema, append a Migration with the next version number and update the
+models in app.py to match; never edit a step that has already shipped.
+Steps use IF NOT EXISTS / missing-column checks so they also bring databases
+created by the old create_all() code up to the same schema.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+from utils.analytics import streak_state
+from utils.curriculum import get_curriculum_index, topic_slugs
+
+Migration = namedtuple('Migration', ['version', 'name', 'apply'])
+
+SCHEMA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at DATETIME NOT NULL
+)
+"""
+
+def table_columns(connection, table):
+    """Column names of `table` (empty set if it does not exist)"""
+    return {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info("{table}")')}
+
+def add_missing_columns(connection, table, columns):
+    """ALTER TABLE ADD COLUMN for each (name, type) not already present; returns the added names"""
+    existing = table_columns(connection, table)
+    added = []
+    for name, column_type in columns:
+        if name not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN {name} {column_type}')
+            added.append(name)
+    return added
+
+# -------------------------
+# Migration steps
+# -------------------------
+def create_baseline(connection):
+    """Tables shared by app.py and RevisionTimetable.py"""
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS user (
+            id INTEGER NOT NULL,
+            username VARCHAR(150) NOT NULL,
+            password VARCHAR(150) NOT NULL,
+            chem_progress INTEGER,
+            bio_y13_progress INTEGER,
+            bio_y12_progress INTEGER,
+            welcome_completed BOOLEAN,
+            daily_study_hours FLOAT,
+            study_start_date DATE,
+            study_end_date DATE,
+            onboarding_step INTEGER,
+            last_welcome_shown DATETIME,
+            PRIMARY KEY (id),
+            UNIQUE (username)
+        )""")
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS user_subjects (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            chemistry BOOLEAN,
+            biology BOOLEAN,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS task_log (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            task VARCHAR(255) NOT NULL,
+            subject VARCHAR(50) NOT NULL,
+            date_completed DATETIME,
+            duration INTEGER,
+            difficulty INTEGER,
+            notes TEXT,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS uplearn_log (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            subject VARCHAR(50) NOT NULL,
+            date DATE,
+            lessons_completed INTEGER,
+            time_spent INTEGER,
+            comprehension INTEGER,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS topic_preference (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            subject VARCHAR(50) NOT NULL,
+            topic VARCHAR(200) NOT NULL,
+            frequency INTEGER,
+            last_modified DATETIME,
+            PRIMARY KEY (id),
+            CONSTRAINT unique_topic_pref UNIQUE (user_id, subject, topic),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS topic_proficiency (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            subject VARCHAR(50) NOT NULL,
+            topic VARCHAR(100) NOT NULL,
+            proficiency INTEGER NOT NULL,
+            last_updated DATETIME,
+            notes TEXT,
+            PRIMARY KEY (id),
+            CONSTRAINT uix_user_subject_topic UNIQUE (user_id, subject, topic),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+
+def converge_user_columns(connection):
+    """Give user tables created by either entry point the same columns"""
+    added = add_missing_columns(connection, 'user', [
+        ('welcome_completed', 'BOOLEAN'),
+        ('daily_study_hours', 'FLOAT'),
+        ('study_start_date', 'DATE'),
+        ('study_end_date', 'DATE'),
+        ('onboarding_step', 'INTEGER'),
+        ('last_welcome_shown', 'DATETIME')
+    ])
+    # app.py tracks onboarding with onboarding_step, RevisionTimetable.py with welcome_completed
+    if 'welcome_completed' in added:
+        connection.exec_driver_sql("UPDATE user SET welcome_completed = COALESCE(onboarding_step, 0) >= 2")
+    if 'onboarding_step' in added:
+        connection.exec_driver_sql("UPDATE user SET onboarding_step = CASE WHEN welcome_completed THEN 2 ELSE 0 END")
+
+def create_plan_tables(connection):
+    """Cached daily plans and spaced-repetition review state"""
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS daily_plan (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            plan_date DATE NOT NULL,
+            tasks TEXT NOT NULL,
+            created_at DATETIME,
+            PRIMARY KEY (id),
+            CONSTRAINT uix_user_plan_date UNIQUE (user_id, plan_date),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS topic_review (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            topic_id INTEGER NOT NULL,
+            interval INTEGER,
+            ease INTEGER,
+            repetitions INTEGER,
+            due INTEGER NOT NULL,
+            last_reviewed DATETIME,
+            PRIMARY KEY (id),
+            CONSTRAINT uix_user_topic_review UNIQUE (user_id, topic_id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+
+def create_rollup_tables(connection):
+    """Per-day analytics rollups (rebuilt from the logs) and per-user data versions"""
+    # Rollups are derived data, so any earlier layout is simply rebuilt
+    connection.exec_driver_sql("DROP TABLE IF EXISTS daily_rollup")
+    connection.exec_driver_sql("""
+        CREATE TABLE daily_rollup (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            subject VARCHAR(50) NOT NULL,
+            task_count INTEGER NOT NULL,
+            task_minutes INTEGER NOT NULL,
+            difficulty_sum INTEGER NOT NULL,
+            uplearn_sessions INTEGER NOT NULL,
+            uplearn_lessons INTEGER NOT NULL,
+            uplearn_minutes INTEGER NOT NULL,
+            comprehension_sum INTEGER NOT NULL,
+            PRIMARY KEY (id),
+            CONSTRAINT uix_user_day_subject UNIQUE (user_id, day, subject),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    connection.exec_driver_sql("""
+        INSERT INTO daily_rollup (user_id, day, subject, task_count, task_minutes, difficulty_sum,
+                                  uplearn_sessions, uplearn_lessons, uplearn_minutes, comprehension_sum)
+        SELECT user_id, day, subject, SUM(task_count), SUM(task_minutes), SUM(difficulty_sum),
+               SUM(uplearn_sessions), SUM(uplearn_lessons), SUM(uplearn_minutes), SUM(comprehension_sum)
+        FROM (
+            SELECT user_id, date(date_completed) AS day, subject, COUNT(*) AS task_count,
+                   COALESCE(SUM(duration), 0) AS task_minutes, COALESCE(SUM(difficulty), 0) AS difficulty_sum,
+                   0 AS uplearn_sessions, 0 AS uplearn_lessons, 0 AS uplearn_minutes, 0 AS comprehension_sum
+            FROM task_log WHERE date_completed IS NOT NULL
+            GROUP BY user_id, date(date_completed), subject
+            UNION ALL
+            SELECT user_id, date, subject, 0, 0, 0, COUNT(*), COALESCE(SUM(lessons_completed), 0),
+                   COALESCE(SUM(time_spent), 0), COALESCE(SUM(comprehension), 0)
+            FROM uplearn_log WHERE date IS NOT NULL
+            GROUP BY user_id, date, subject
+        )
+        GROUP BY user_id, day, subject""")
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS user_data_version (
+            user_id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (user_id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+
+def create_history_indexes(connection):
+    """Keyset pagination indexes for the log history pages"""
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_task_log_user_completed ON task_log (user_id, date_completed, id)")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_uplearn_log_user_date ON uplearn_log (user_id, date, id)")
+
+def create_streak_table(connection):
+    """Incrementally maintained study streaks, backfilled from the task history"""
+    connection.exec_driver_sql("DROP TABLE IF EXISTS user_streak")
+    connection.exec_driver_sql("""
+        CREATE TABLE user_streak (
+            user_id INTEGER NOT NULL,
+            current_streak INTEGER NOT NULL,
+            max_streak INTEGER NOT NULL,
+            last_study_date DATE,
+            PRIMARY KEY (user_id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    days_by_user = {}
+    for user_id, day in connection.exec_driver_sql(
+            "SELECT DISTINCT user_id, date(date_completed) FROM task_log "
+            "WHERE date_completed IS NOT NULL ORDER BY 1, 2"):
+        days_by_user.setdefault(user_id, []).append(datetime.strptime(day, '%Y-%m-%d').date())
+    for user_id, study_days in days_by_user.items():
+        run, max_streak, last_day = streak_state(study_days)
+        connection.exec_driver_sql(
+            "INSERT INTO user_streak (user_id, current_streak, max_streak, last_study_date) VALUES (?, ?, ?, ?)",
+            (user_id, run, max_streak, last_day.isoformat())
+        )
+
+def create_rating_sync_index(connection):
+    """Delta sync index for /api/ratings/get?since="""
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_topic_proficiency_user_updated ON topic_proficiency (user_id, last_updated)")
+
+def create_user_subjects_index(connection):
+    """current_user.subjects lookups"""
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_user_subjects_user ON user_subjects (user_id)")
+
+def key_reviews_by_title(connection):
+    """Key topic_review by (subject, topic title) instead of the CurriculumIndex position.
+
+    Existing rows are mapped through the current curriculum; rows whose
+    position no longer exists are dropped.
+    """
+    connection.exec_driver_sql("""
+        CREATE TABLE topic_review_new (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            subject VARCHAR(50) NOT NULL,
+            topic VARCHAR(100) NOT NULL,
+            interval INTEGER,
+            ease INTEGER,
+            repetitions INTEGER,
+            due INTEGER NOT NULL,
+            last_reviewed DATETIME,
+            PRIMARY KEY (id),
+            CONSTRAINT uix_user_topic_review UNIQUE (user_id, subject, topic),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    topics = get_curriculum_index().topics
+    rows = []
+    for row in connection.exec_driver_sql(
+            "SELECT id, user_id, topic_id, interval, ease, repetitions, due, last_reviewed FROM topic_review"):
+        review_id, user_id, topic_id = row[:3]
+        if topic_id is not None and 0 <= topic_id < len(topics):
+            rows.append((review_id, user_id, topics[topic_id].subject, topics[topic_id].title) + tuple(row[3:]))
+    if rows:
+        connection.exec_driver_sql(
+            "INSERT INTO topic_review_new (id, user_id, subject, topic, interval, ease, repetitions, due, "
+            "last_reviewed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    connection.exec_driver_sql("DROP TABLE topic_review")
+    connection.exec_driver_sql("ALTER TABLE topic_review_new RENAME TO topic_review")
+
+def create_review_due_index(connection):
+    """Due-date lookups for the topic reviews a plan should revise"""
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_topic_review_user_due ON topic_review (user_id, due)")
+
+def version_ratings(connection):
+    """Ratings remember the data version that wrote them, for commit-ordered delta sync"""
+    add_missing_columns(connection, 'topic_proficiency', [('data_version', 'INTEGER NOT NULL DEFAULT 0')])
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_topic_proficiency_user_updated")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_topic_proficiency_user_version ON topic_proficiency (user_id, data_version)")
+
+def key_ratings_by_title(connection):
+    """Rekey topic_proficiency rows saved under a topic_id slug to the canonical curriculum title.
+
+    Where a user already has a rating under the title (or several slugs map
+    to it), the most recently written row is kept and the others deleted.
+    Rows that do not resolve to a curriculum topic are left as they are.
+    """
+    index = get_curriculum_index()
+    groups = {}
+    for row in connection.exec_driver_sql(
+            "SELECT id, user_id, subject, topic, data_version, last_updated FROM topic_proficiency"):
+        rating_id, user_id, subject, topic = row[:4]
+        entry = index.find(topic, subject) or next(
+            (found for found in (index.find(slug, subject) for slug in topic_slugs(topic)) if found), None)
+        if entry is None:
+            continue
+        groups.setdefault((user_id, entry.subject, entry.title), []).append(
+            (row[4] or 0, row[5] or '', rating_id, subject, topic))
+
+    deleted, renamed = [], []
+    for (user_id, subject, title), rows in groups.items():
+        rows.sort(reverse=True)
+        _, _, rating_id, old_subject, old_topic = rows[0]
+        deleted.extend((row[2],) for row in rows[1:])
+        if (old_subject, old_topic) != (subject, title):
+            renamed.append((subject, title, rating_id))
+    if deleted:
+        connection.exec_driver_sql("DELETE FROM topic_proficiency WHERE id = ?", deleted)
+    if renamed:
+        connection.exec_driver_sql("UPDATE topic_proficiency SET subject = ?, topic = ? WHERE id = ?", renamed)
+
+def create_submission_key_table(connection):
+    """Idempotency keys of recent log submissions, shared by every worker"""
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS submission_key (
+            user_id INTEGER NOT NULL,
+            "key" VARCHAR(128) NOT NULL,
+            expires_at FLOAT NOT NULL,
+            PRIMARY KEY (user_id, "key"),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_submission_key_expires ON submission_key (expires_at)")
+
+MIGRATIONS = [
+    Migration(1, 'baseline tables', create_baseline),
+    Migration(2, 'converge user columns', converge_user_columns),
+    Migration(3, 'daily plans and topic reviews', create_plan_tables),
+    Migration(4, 'daily rollups and data versions', create_rollup_tables),
+    Migration(5, 'log history indexes', create_history_indexes),
+    Migration(6, 'user streaks', create_streak_table),
+    Migration(7, 'rating sync index', create_rating_sync_index),
+    Migration(8, 'user subjects index', create_user_subjects_index),
+    Migration(9, 'topic reviews keyed by title', key_reviews_by_title),
+    Migration(10, 'topic review due index', create_review_due_index),
+    Migration(11, 'rating data versions', version_ratings),
+    Migration(12, 'topic ratings keyed by title', key_ratings_by_title),
+    Migration(13, 'submission keys', create_submission_key_table),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+# -------------------------
+# Runner
+# -------------------------
+def current_version(connection):
+    """Highest applied migration version (0 for an unversioned database)"""
+    connection.exec_driver_sql(SCHEMA_VERSION_DDL)
+    return connection.exec_driver_sql("SELECT MAX(version) FROM schema_version").scalar() or 0
+
+def migrate(engine):
+    """Apply all pending migrations in one transaction; returns the applied Migration list.
+
+    BEGIN IMMEDIATE takes SQLite's write lock before the version is read, so
+    when several workers boot at once the first applies the steps and the
+    others wait, then find nothing left to do.
+    """
+    with engine.begin() as connection:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        version = current_version(connection)
+        pending = [migration for migration in MIGRATIONS if migration.version > version]
+        for migration in pending:
+            migration.apply(connection)
+            connection.exec_driver_sql(
+                "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, datetime.now().isoformat(' '))
+            )
+    return pending
+
+def schema_drift(engine, metadata):
+    """Model tables/columns missing from the database (empty when the models match the schema)"""
+    problems = []
+    with engine.connect() as connection:
+        for table in metadata.sorted_tables:
+            columns = table_columns(connection, table.name)
+            if not columns:
+                problems.append(f"missing table {table.name}")
+                continue
+            for column in table.columns:
+                if column.name not in columns:
+                    problems.append(f"missing column {table.name}.{column.name}")
+    return problems
@@ -0,0 +1,204 @@
+import random
+import threading
+from collections import OrderedDict
+
+from utils.curriculum import get_curriculum_index
+
+# Multiplier applied for TopicPreference.frequency (-1 less often, 0 default, 1 more often)
+PREFERENCE_MULTIPLIERS = {-1: 0.5, 0: 1.0, 1: 2.0}
+
+def proficiency_weight(proficiency):
+    """Invert proficiency: 1 (beginner) = weight 5, 5 (expert) = weight 1 (clamped, so never below 1)"""
+    return 6 - min(5, max(1, proficiency))
+
+class AliasTable:
+    """Walker/Vose alias table giving O(1) weighted draws over range(len(weights))"""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        self.size = n
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        if n == 0 or total <= 0:
+            return
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # Anything left over is 1.0 up to floating point error
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def draw(self, rng=random):
+        """Return a weighted random position"""
+        i = int(rng.random() * self.size)
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+class TopicSampler:
+    """Per-user weighted topic sampler over the curriculum index.
+
+    Topic weights combine proficiency (6 - rating) with the user's topic
+    preference multiplier. Within a module/paper, unrated topics are only
+    drawn when none of that module's topics have been rated, matching the
+    original generate_daily_tasks behaviour. Each module keeps an alias table
+    over its topics and each subject keeps one over its modules (weighted by
+    mean topic weight), so draws are O(1) and a single rating change only
+    rebuilds the module it belongs to plus its subject table.
+    """
+
+    def __init__(self, proficiencies=None, preferences=None, index=None):
+        self.index = index or get_curriculum_index()
+        self.proficiencies = {subject: dict(topics) for subject, topics in (proficiencies or {}).items()}
+        self.preferences = {subject: dict(topics) for subject, topics in (preferences or {}).items()}
+        self.module_tables = {}
+        self.module_weights = {}
+        self.subject_tables = {}
+        self._lock = threading.Lock()
+
+        # (subject, title) -> position of the module/paper containing that topic
+        self.topic_modules = {}
+        self.module_positions = {}
+        for subject, groups in self.index.modules.items():
+            for position, group in enumerate(groups):
+                self.module_positions[(subject, group.year, group.name)] = position
+                for title in group.titles:
+                    self.topic_modules[(subject, title)] = position
+
+        for subject, groups in self.index.modules.items():
+            for position in range(len(groups)):
+                self._build_module(subject, position)
+            self._build_subject(subject)
+
+    def _topic_weight(self, subject, title):
+        proficiency = self.proficiencies.get(subject, {}).get(title)
+        if proficiency is None:
+            return None
+        preference = self.preferences.get(subject, {}).get(title, 0)
+        return proficiency_weight(proficiency) * PREFERENCE_MULTIPLIERS.get(preference, 1.0)
+
+    def _build_module(self, subject, position):
+        group = self.index.modules[subject][position]
+        weights = [self._topic_weight(subject, title) for title in group.titles]
+        if any(w is not None for w in weights):
+            weights = [w or 0 for w in weights]
+        else:
+            # No ratings in this module: uniform, adjusted by preference only
+            preferences = self.preferences.get(subject, {})
+            weights = [PREFERENCE_MULTIPLIERS.get(preferences.get(title, 0), 1.0) for title in group.titles]
+        self.module_tables[(subject, position)] = AliasTable(weights)
+        self.module_weights[(subject, position)] = sum(weights) / len(weights) if weights else 0
+
+    def _build_subject(self, subject):
+        groups = self.index.modules[subject]
+        self.subject_tables[subject] = AliasTable(
+            [self.module_weights[(subject, position)] for position in range(len(groups))]
+        )
+
+    def update(self, subject, topic, proficiency=None, preference=None):
+        """Apply one rating/preference change, rebuilding only the affected module and subject tables"""
+        with self._lock:
+            if proficiency is not None:
+                self.proficiencies.setdefault(subject, {})[topic] = proficiency
+            if preference is not None:
+                self.preferences.setdefault(subject, {})[topic] = preference
+            position = self.topic_modules.get((subject, topic))
+            if position is None:
+                return False
+            self._build_module(subject, position)
+            self._build_subject(subject)
+            return True
+
+    def sync(self, proficiencies=None, preferences=None):
+        """Bring the sampler in line with freshly loaded ratings, rebuilding only what changed"""
+        proficiencies = proficiencies or {}
+        preferences = preferences or {}
+        with self._lock:
+            changed = set()
+            for current, fresh in ((self.proficiencies, proficiencies), (self.preferences, preferences)):
+                for subject in set(current) | set(fresh):
+                    old_topics = current.get(subject, {})
+                    new_topics = fresh.get(subject, {})
+                    if old_topics == new_topics:
+                        continue
+                    for title in set(old_topics) | set(new_topics):
+                        if old_topics.get(title) != new_topics.get(title):
+                            changed.add((subject, title))
+                    current[subject] = dict(new_topics)
+
+            rebuilt_subjects = set()
+            for subject, title in changed:
+                position = self.topic_modules.get((subject, title))
+                if position is not None:
+                    self._build_module(subject, position)
+                    rebuilt_subjects.add(subject)
+            for subject in rebuilt_subjects:
+                self._build_subject(subject)
+            return len(changed)
+
+    def draw_module(self, subject, rng=random):
+        """Pick a module/paper for a subject, favouring modules with weaker topics"""
+        groups = self.index.modules.get(subject, ())
+        if not groups:
+            return None
+        return groups[self.subject_tables[subject].draw(rng)]
+
+    def draw_topic(self, group, rng=random):
+        """Pick a topic from a module/paper in O(1)"""
+        position = self.module_positions.get((group.subject, group.year, group.name))
+        if position is None:
+            return rng.choice(group.topics)
+        return group.topics[self.module_tables[(group.subject, position)].draw(rng)]
+
+class SamplerCache:
+    """Bounded per-process cache of TopicSampler objects keyed by user id"""
+
+    def __init__(self, max_users=512):
+        self.max_users = max_users
+        self._samplers = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, user_id, proficiencies=None, preferences=None):
+        """Return the user's sampler, synchronised with the given ratings"""
+        index = get_curriculum_index()
+        with self._lock:
+            sampler = self._samplers.get(user_id)
+            if sampler is not None and sampler.index is index:
+                self._samplers.move_to_end(user_id)
+                self.hits += 1
+            else:
+                sampler = None
+        if sampler is not None:
+            sampler.sync(proficiencies, preferences)
+            return sampler
+
+        sampler = TopicSampler(proficiencies, preferences, index)
+        with self._lock:
+            self.builds += 1
+            self._samplers[user_id] = sampler
+            while len(self._samplers) > self.max_users:
+                self._samplers.popitem(last=False)
+        return sampler
+
+    def peek(self, user_id):
+        """Return the cached sampler for a user without building one"""
+        with self._lock:
+            return self._samplers.get(user_id)
+
+    def stats(self):
+        return {'users': len(self._samplers), 'hits': self.hits, 'builds': self.builds}
+
+# Shared per-process sampler cache
+sampler_cache = SamplerCache()
@@ -0,0 +1,231 @@
+import heapq
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from utils.curriculum import get_curriculum_index
+
+# Length of one scheduled study session
+SESSION_MINUTES = 45
+
+# Default planning horizon (matches the 15-week calendar)
+HORIZON_DAYS = 15 * 7
+
+# Weight for topics the user has not rated yet (same as a "3" rating)
+DEFAULT_TOPIC_WEIGHT = 3
+
+# Plans run in fixed 15-week periods counted from this Monday, so work logged
+# earlier in the period keeps counting after the day rolls over
+PLAN_PERIOD_EPOCH = date(2024, 1, 1)
+
+def plan_period_start(day):
+    """First day of the planning period containing `day`"""
+    return day - timedelta(days=(day - PLAN_PERIOD_EPOCH).days % HORIZON_DAYS)
+
+def topic_label(entry):
+    """Calendar label for a topic, e.g. 'Biology (Year 12): Enzymes'"""
+    subject = f"{entry.subject} ({entry.year})" if entry.year else entry.subject
+    return f"{subject}: {entry.title}"
+
+def exam_deadlines(subject_end_dates, start_date):
+    """Map subject -> (final exam day, {paper name: exam day}) for exams on or after start_date"""
+    deadlines = {}
+    for subject, exams in subject_end_dates.items():
+        papers = {}
+        for exam in exams:
+            exam_date = datetime.strptime(exam['date'], '%Y-%m-%d').date()
+            if exam_date >= start_date:
+                papers[exam['paper']] = exam_date
+        if papers:
+            deadlines[subject] = (max(papers.values()), papers)
+    return deadlines
+
+class StudySchedule:
+    """Exam-aware allocation of curriculum topics to days.
+
+    Every topic gets a demand (number of sessions) proportional to its weight,
+    6 - proficiency. Demand is split across all available sessions up to
+    the horizon. Each topic must be covered before its deadline: its own
+    paper's date when the curriculum names the paper (Psychology), otherwise
+    the subject's final paper. If a subject has no upcoming exams, the
+    deadline is the end of the horizon.
+
+    Days are filled greedily. Each day takes the topics with the highest
+    urgency, remaining demand / days left before the deadline. This is the
+    earliest-deadline-first rule weighted by how much work is left, so one
+    pass over the days is enough. Logged work counts as sessions: work on a
+    topic that was planned for that day leaves the plan unchanged, extra work
+    reduces the topic's demand. Because the per-day choice only depends on
+    the remaining demand, record_completion() re-plans the days after a
+    logged task without touching earlier ones. Logs passed to the
+    constructor ((log id, day, (subject, topic title), minutes)) are folded
+    in day by day during the single pass, with the same result.
+    """
+
+    def __init__(self, start_date, user_subjects, proficiencies=None, daily_study_hours=None,
+                 subject_end_dates=None, horizon_days=HORIZON_DAYS, index=None, logs=()):
+        index = index or get_curriculum_index()
+        proficiencies = proficiencies or {}
+        self.start_date = start_date
+        self.horizon_days = horizon_days
+        daily_minutes = int((daily_study_hours or 4.0) * 60)
+        self.slots_per_day = max(1, daily_minutes // SESSION_MINUTES)
+
+        deadlines = exam_deadlines(subject_end_dates or {}, start_date)
+        self.labels = []
+        self.deadlines = []
+        self.positions = {}
+        weights = []
+        for subject in user_subjects:
+            final_exam, papers = deadlines.get(subject, (None, {}))
+            for group in index.modules.get(subject, ()):
+                for topic_id in group.ids:
+                    entry = index.topics[topic_id]
+                    exam_day = papers.get(entry.paper, final_exam)
+                    deadline = (exam_day - start_date).days if exam_day else horizon_days
+                    if deadline <= 0:
+                        continue
+                    self.positions[(subject, entry.title)] = len(self.labels)
+                    self.labels.append(topic_label(entry))
+                    self.deadlines.append(min(deadline, horizon_days))
+                    rating = proficiencies.get(subject, {}).get(entry.title)
+                    weights.append(6 - rating if rating else DEFAULT_TOPIC_WEIGHT)
+
+        total_weight = float(sum(weights)) or 1.0
+        total_slots = self.slots_per_day * horizon_days
+        # Demand left after logged extra work, before any day's planned sessions
+        self.remaining = [w / total_weight * total_slots for w in weights]
+        self.days = [[] for _ in range(horizon_days)]
+        self.logged = {}  # (day offset, position) -> sessions logged
+        self.log_watermark = 0  # highest log id applied
+        self._lock = threading.Lock()
+
+        by_day = {}
+        for log_id, day, key, minutes in logs:
+            self.log_watermark = max(self.log_watermark, log_id)
+            offset = self.day_offset(day)
+            position = self.positions.get(key)
+            if position is not None and 0 <= offset < horizon_days:
+                by_day.setdefault(offset, []).append((position, minutes))
+        remaining = list(self.remaining)
+        first_day = 0
+        for offset in sorted(by_day):
+            self._allocate(first_day, offset + 1, remaining)
+            for position, minutes in by_day[offset]:
+                extra = self._log_sessions(offset, position, minutes)
+                self.remaining[position] -= extra
+                remaining[position] -= extra
+            first_day = offset + 1
+        self._allocate(first_day, horizon_days, remaining)
+
+    def _allocate(self, first_day, last_day, remaining):
+        """Fill days[first_day:last_day] given the demand still open at the start of first_day"""
+        deadlines = self.deadlines
+        slots = self.slots_per_day
+        candidates = list(range(len(self.labels)))
+        for day in range(first_day, last_day):
+            # Topics whose exam has passed drop out for good
+            candidates = [i for i in candidates if deadlines[i] > day]
+            chosen = heapq.nlargest(slots, candidates, key=lambda i: remaining[i] / (deadlines[i] - day))
+            for i in chosen:
+                remaining[i] -= 1
+            self.days[day] = chosen
+
+    def _log_sessions(self, offset, position, minutes):
+        """Record logged minutes; returns the sessions beyond the plan for that day they add"""
+        planned = 1 if position in self.days[offset] else 0
+        before = self.logged.get((offset, position), 0)
+        after = before + minutes / SESSION_MINUTES
+        self.logged[(offset, position)] = after
+        return max(0, after - planned) - max(0, before - planned)
+
+    def record_completion(self, key, day, minutes=SESSION_MINUTES):
+        """Count logged work on a (subject, topic title) and re-plan only the days after `day`.
+
+        Completing a session that was already scheduled for that day leaves
+        the plan unchanged; extra work reduces the topic's demand and the
+        following days are reallocated.
+        """
+        position = self.positions.get(key)
+        offset = self.day_offset(day)
+        if position is None or not 0 <= offset < self.horizon_days:
+            return False
+        with self._lock:
+            extra = self._log_sessions(offset, position, minutes)
+            if extra <= 0:
+                return True
+            self.remaining[position] -= extra
+            # Demand still open after `day`: remaining demand minus everything planned up to it
+            remaining = list(self.remaining)
+            for scheduled in self.days[:offset + 1]:
+                for i in scheduled:
+                    remaining[i] -= 1
+            self._allocate(offset + 1, self.horizon_days, remaining)
+        return True
+
+    def apply_logs(self, logs):
+        """record_completion() for (log id, day, key, minutes) logs newer than log_watermark, in id order"""
+        with self._lock:
+            logs = sorted(log for log in logs if log[0] > self.log_watermark)
+            if logs:
+                self.log_watermark = logs[-1][0]
+        for _, day, key, minutes in logs:
+            self.record_completion(key, day, minutes)
+        return len(logs)
+
+    def day_offset(self, day):
+        return (day - self.start_date).days
+
+    def tasks_for(self, day):
+        """Calendar strings for a date (empty outside the horizon)"""
+        offset = self.day_offset(day)
+        if 0 <= offset < self.horizon_days:
+            return [self.labels[i] for i in self.days[offset]]
+        return []
+
+    def week_timetable(self, week_start):
+        """{day name: [tasks]} for the seven days from week_start"""
+        timetable = {}
+        for offset in range(7):
+            day = week_start + timedelta(days=offset)
+            tasks = self.tasks_for(day)
+            if tasks:
+                timetable[day.strftime('%A')] = tasks
+        return timetable
+
+class ScheduleCache:
+    """Bounded per-process cache of StudySchedule objects keyed by user id"""
+
+    def __init__(self, max_users=512):
+        self.max_users = max_users
+        self._schedules = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, user_id, key, build):
+        """Return the user's schedule if it was built for `key`, otherwise call build()"""
+        with self._lock:
+            cached = self._schedules.get(user_id)
+            if cached is not None and cached[0] == key:
+                self._schedules.move_to_end(user_id)
+                self.hits += 1
+                return cached[1]
+
+        schedule = build()
+        with self._lock:
+            self.builds += 1
+            self._schedules[user_id] = (key, schedule)
+            while len(self._schedules) > self.max_users:
+                self._schedules.popitem(last=False)
+        return schedule
+
+    def discard(self, user_id):
+        with self._lock:
+            self._schedules.pop(user_id, None)
+
+    def stats(self):
+        return {'users': len(self._schedules), 'hits': self.hits, 'builds': self.builds}
+
+# Shared per-process schedule cache
+schedule_cache = ScheduleCache()
@@ -0,0 +1,31 @@
+# SM-2 constants; ease is stored as an integer in thousandths (2500 == 2.5)
+DEFAULT_EASE = 2500
+MIN_EASE = 1300
+# Longest gap between reviews in days (keeps due dates and stored intervals in range)
+MAX_INTERVAL = 3650
+
+def quality_from_difficulty(difficulty):
+    """Map a logged difficulty (1 easy .. 5 hard) to an SM-2 recall quality (5 .. 1)"""
+    try:
+        difficulty = int(difficulty)
+    except (TypeError, ValueError):
+        difficulty = 3
+    return 6 - min(5, max(1, difficulty))
+
+def sm2_update(interval, ease, repetitions, quality, today):
+    """Apply one SM-2 review; returns (interval, ease, repetitions, due) with due as a date ordinal"""
+    if quality < 3:
+        # Failed recall: start the topic over tomorrow
+        repetitions = 0
+        interval = 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = min(MAX_INTERVAL, max(1, round(interval * ease / 1000)))
+    miss = 5 - quality
+    ease = max(MIN_EASE, ease + 100 - miss * (80 + miss * 20))
+    return interval, ease, repetitions, today.toordinal() + interval
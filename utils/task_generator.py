@@ -1,44 +1,39 @@
-import json
 import random
-from datetime import datetime
-import os
+from utils.curriculum import get_curriculum, get_curriculum_index
+from utils.sampler import TopicSampler
 
 def load_curriculum():
-    # Get the absolute path to the curriculum.json file
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    file_path = os.path.join(base_dir, 'static', 'data', 'curriculum.json')
-    
-    # Create directories if they don't exist
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-    try:
-        with open(file_path, 'r') as file:
-            return json.load(file)
-    except FileNotFoundError:
-        print(f"Error: Could not find curriculum.json at {file_path}")
-        # Return empty curriculum structure as fallback
-        return {
-            "Biology": {"Years": []},
-            "Chemistry": {"Modules": []},
-            "Psychology": {"Papers": []}
-        }
+    # Shared, cached curriculum (reparsed only when the file changes)
+    return get_curriculum()
 
-def generate_task_for_topic(subject, topic, duration_minutes):
-    task_templates = [
-        {"type": "Review", "template": "Review and create summary notes on {topic}", "min_duration": 30},
-        {"type": "Practice", "template": "Complete practice questions on {topic}", "min_duration": 45},
-        {"type": "Quiz", "template": "Create and answer quiz questions for {topic}", "min_duration": 20},
-        {"type": "Mind Map", "template": "Create a detailed mind map for {topic}", "min_duration": 25},
-        {"type": "Flash Cards", "template": "Make flash cards covering {topic}", "min_duration": 30},
-        {"type": "Essay Plan", "template": "Create essay plans related to {topic}", "min_duration": 40},
-        {"type": "Uplearn", "template": "Complete Uplearn session on {topic}", "min_duration": 45}
-    ]
-    
-    suitable_templates = [t for t in task_templates if t["min_duration"] <= duration_minutes]
+# Task wording used for generated tasks; every template ends with the topic title
+TASK_TEMPLATES = [
+    {"type": "Review", "template": "Review and create summary notes on {topic}", "min_duration": 30},
+    {"type": "Practice", "template": "Complete practice questions on {topic}", "min_duration": 45},
+    {"type": "Quiz", "template": "Create and answer quiz questions for {topic}", "min_duration": 20},
+    {"type": "Mind Map", "template": "Create a detailed mind map for {topic}", "min_duration": 25},
+    {"type": "Flash Cards", "template": "Make flash cards covering {topic}", "min_duration": 30},
+    {"type": "Essay Plan", "template": "Create essay plans related to {topic}", "min_duration": 40},
+    {"type": "Uplearn", "template": "Complete Uplearn session on {topic}", "min_duration": 45}
+]
+
+TASK_PREFIXES = tuple(t["template"].replace("{topic}", "") for t in TASK_TEMPLATES)
+
+def topic_from_task(task_text):
+    """Recover the topic title from a generated task description (None if it isn't one)"""
+    if not task_text:
+        return None
+    for prefix in TASK_PREFIXES:
+        if task_text.startswith(prefix):
+            return task_text[len(prefix):].strip() or None
+    return None
+
+def generate_task_for_topic(subject, topic, duration_minutes, rng=random):
+    suitable_templates = [t for t in TASK_TEMPLATES if t["min_duration"] <= duration_minutes]
     if not suitable_templates:
-        suitable_templates = task_templates
+        suitable_templates = TASK_TEMPLATES
     
-    template = random.choice(suitable_templates)
+    template = rng.choice(suitable_templates)
     return {
         "subject": subject,
         "task": template["template"].format(topic=topic["Title"]),
@@ -46,13 +41,25 @@ def generate_task_for_topic(subject, topic, duration_minutes):
         "type": template["type"]
     }
 
-def generate_daily_tasks(curriculum_data, user_subjects=None, uplearn_subjects=None):
-    total_daily_minutes = random.randint(180, 240)  # 3-4 hours
+def generate_daily_tasks(curriculum_data, user_subjects=None, uplearn_subjects=None, user_proficiencies=None,
+                         index=None, sampler=None, rng=random, daily_minutes=None, due_topics=None):
+    # Use the user's daily study hours when known, otherwise 3-4 hours
+    total_daily_minutes = daily_minutes or rng.randint(180, 240)
     minutes_remaining = total_daily_minutes
     tasks = []
     
-    # Get current date to determine exam proximity
-    today = datetime.now()
+    if index is None:
+        index = get_curriculum_index()
+    # Weighted topic selection (proficiency and preference) via precomputed alias tables
+    if sampler is None:
+        sampler = TopicSampler(user_proficiencies, index=index)
+    
+    # Topics due for spaced-repetition review (most overdue first) take priority over sampling
+    due_by_subject = {}
+    for topic_id in due_topics or ():
+        location = index.locations.get(topic_id)
+        if location:
+            due_by_subject.setdefault(location[0], []).append(location[1:])
     
     # Select subjects based on user preference or randomly
     if user_subjects and len(user_subjects) > 0:
@@ -64,7 +71,7 @@ def generate_daily_tasks(curriculum_data, user_subjects=None, uplearn_subjects=N
     else:
         # Otherwise, randomly select 2-3 subjects
         subjects = list(curriculum_data.keys())
-        daily_subjects = random.sample(subjects, min(random.randint(2, 3), len(subjects)))
+        daily_subjects = rng.sample(subjects, min(rng.randint(2, 3), len(subjects)))
     
     for subject in daily_subjects:
         # Allocate time based on remaining minutes
@@ -74,55 +81,63 @@ def generate_daily_tasks(curriculum_data, user_subjects=None, uplearn_subjects=N
         if subject not in curriculum_data:
             continue
             
-        subject_data = curriculum_data[subject]
+        groups = index.modules.get(subject, ())
+        due = due_by_subject.get(subject, [])
         
         # Determine if this subject should be Uplearn-oriented (90% chance if uplearn_subjects includes it)
         # Psychology is never uplearn oriented
         is_uplearn_task = False
-        if uplearn_subjects and subject in uplearn_subjects and subject != "Psychology" and random.random() < 0.9:
+        if uplearn_subjects and subject in uplearn_subjects and subject != "Psychology" and rng.random() < 0.9:
             is_uplearn_task = True
         
         if subject == "Biology":
-            # Handle Biology's special structure with Years
-            for year in subject_data["Years"]:
-                for module in year["Modules"]:
-                    if module["Topics"]:
-                        topic = random.choice(module["Topics"])
-                        # Force Uplearn task type if this is an uplearn subject
-                        if is_uplearn_task:
-                            task = {
-                                "subject": f"{subject} ({year['Name']})",
-                                "task": f"Complete Uplearn session on {topic['Title']}",
-                                "duration": subject_minutes // 2,
-                                "type": "Uplearn"
-                            }
-                        else:
-                            task = generate_task_for_topic(f"{subject} ({year['Name']})", 
-                                                        topic, 
-                                                        subject_minutes // 2)
-                        tasks.append(task)
-        else:
-            # Handle other subjects
-            if "Papers" in subject_data:  # Psychology
-                paper = random.choice(subject_data["Papers"])
-                topic = random.choice(paper["Topics"])
-                task = generate_task_for_topic(subject, topic, subject_minutes)
+            # Biology gets one task per module in each year
+            due_in_module = {}
+            for group_position, topic_position in due:
+                due_in_module.setdefault(group_position, topic_position)
+            for group_position, group in enumerate(groups):
+                if not group.topics:
+                    continue
+                if group_position in due_in_module:
+                    topic = group.topics[due_in_module[group_position]]
+                else:
+                    topic = sampler.draw_topic(group, rng)
+                # Force Uplearn task type if this is an uplearn subject
+                if is_uplearn_task:
+                    task = {
+                        "subject": f"{subject} ({group.year})",
+                        "task": f"Complete Uplearn session on {topic['Title']}",
+                        "duration": subject_minutes // 2,
+                        "type": "Uplearn"
+                    }
+                else:
+                    task = generate_task_for_topic(f"{subject} ({group.year})", 
+                                                topic, 
+                                                subject_minutes // 2,
+                                                rng)
                 tasks.append(task)
-            elif "Modules" in subject_data:  # Chemistry
-                module = random.choice(subject_data["Modules"])
-                if module["Topics"]:
-                    topic = random.choice(module["Topics"])
-                    # Force Uplearn task type if this is an uplearn subject
-                    if is_uplearn_task:
-                        task = {
-                            "subject": subject,
-                            "task": f"Complete Uplearn session on {topic['Title']}",
-                            "duration": subject_minutes,
-                            "type": "Uplearn"
-                        }
-                    else:
-                        task = generate_task_for_topic(subject, topic, subject_minutes)
-                    tasks.append(task)
+        elif groups:
+            # Chemistry picks one module, Psychology one paper
+            if due:
+                group_position, topic_position = due[0]
+                group = groups[group_position]
+                topic = group.topics[topic_position]
+            else:
+                group = sampler.draw_module(subject, rng)
+                if not group.topics:
+                    continue
+                topic = sampler.draw_topic(group, rng)
+            # Force Uplearn task type if this is an uplearn subject
+            if is_uplearn_task:
+                task = {
+                    "subject": subject,
+                    "task": f"Complete Uplearn session on {topic['Title']}",
+                    "duration": subject_minutes,
+                    "type": "Uplearn"
+                }
+            else:
+                task = generate_task_for_topic(subject, topic, subject_minutes, rng)
+            tasks.append(task)
     
     return tasks
 
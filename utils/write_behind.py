@@ -0,0 +1,164 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+class WriteBehindQueue:
+    """Bounded in-process queue of pending writes, flushed in batches by a background thread.
+
+    Request threads submit() a write and return without waiting for the
+    commit. The flush thread collects up to max_batch items, waiting at most
+    flush_interval seconds after the first one, and hands the batch to
+    flush(items), which writes it in a single transaction. These two knobs
+    bound how much work is lost if the process dies without a graceful
+    shutdown. If a batch fails, its items are retried one at a time so a
+    single bad write is dropped on its own, and on_drop(item) (if given) lets
+    the caller undo anything it did at submit time. When the queue is full
+    submit() returns False and the caller should write synchronously instead.
+
+    The thread starts on the first submit() in each process, so a queue
+    created before a gunicorn fork works in every worker. stop() (also
+    registered with atexit) drains everything still queued.
+    """
+
+    def __init__(self, flush, flush_interval=0.05, max_batch=200, max_size=10000, put_timeout=0.5, on_drop=None):
+        self.flush = flush
+        self.on_drop = on_drop
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._reset_stats()
+        atexit.register(self.stop)
+
+    def _reset_stats(self):
+        self.submitted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_seconds = 0.0
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: the parent's thread and queued items did not come along
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._stopping.clear()
+                self._reset_stats()
+                self._thread = None
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+
+    def submit(self, item):
+        """Queue a write; False if the queue stayed full for put_timeout seconds"""
+        if self._stopping.is_set():
+            return False
+        self._ensure_thread()
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _next_batch(self, wait):
+        """Block up to `wait` seconds for one item, then collect the rest of the batch"""
+        try:
+            batch = [self._queue.get(timeout=wait)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        flushed = failed = 0
+        try:
+            self.flush(batch)
+            flushed = len(batch)
+        except Exception as e:
+            print(f"Note: Write-behind batch of {len(batch)} failed ({e}), retrying one at a time")
+            for item in batch:
+                try:
+                    self.flush([item])
+                    flushed += 1
+                except Exception as item_error:
+                    print(f"Note: Dropping write-behind item {item!r}: {item_error}")
+                    failed += 1
+                    if self.on_drop is not None:
+                        self.on_drop(item)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.flushed += flushed
+            self.failed += failed
+            self.batches += 1
+            self.last_flush_ms = elapsed * 1000
+            self.max_flush_ms = max(self.max_flush_ms, elapsed * 1000)
+            self._flush_seconds += elapsed
+        for _ in batch:
+            self._queue.task_done()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._next_batch(wait=0.5)
+            if batch:
+                self._write(batch)
+        # Graceful shutdown: drain whatever is still queued
+        while True:
+            batch = self._next_batch(wait=0)
+            if not batch:
+                break
+            self._write(batch)
+
+    def drain(self):
+        """Block until every item submitted so far has been written (or dropped)"""
+        if self._thread is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def stop(self, timeout=30):
+        """Stop accepting writes and flush everything still queued"""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'depth': self._queue.qsize(),
+                'max_depth': self.max_depth,
+                'capacity': self._queue.maxsize,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'flushed': self.flushed,
+                'failed': self.failed,
+                'batches': self.batches,
+                'avg_batch': round(self.flushed / self.batches, 1) if self.batches else 0.0,
+                'last_flush_ms': round(self.last_flush_ms, 2),
+                'max_flush_ms': round(self.max_flush_ms, 2),
+                'avg_flush_ms': round(self._flush_seconds * 1000 / self.batches, 2) if self.batches else 0.0,
+                'flush_interval': self.flush_interval,
+                'max_batch': self.max_batch
+            }